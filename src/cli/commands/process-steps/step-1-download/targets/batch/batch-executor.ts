@@ -18,6 +18,8 @@ import type {
   ProcessCommand,
   RuntimeOptions
 } from '~/types'
+import { closeKittenTtsWorker } from '~/cli/commands/process-steps/step-4-tts/tts-local/kitten/kitten-tts-worker'
+import { closeReverbDiarizationWorker } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/reverb/reverb-diarization-worker'
 import { processSingleTarget } from '../single-target'
 import { processBatch } from './process-batch'
 
@@ -265,7 +267,7 @@ const executeExtractBatchPlan = async (
   }
 }
 
-export const executeBatchPlan = async (
+const executeBatchPlanItems = async (
   command: ProcessCommand,
   opts: RuntimeOptions,
   batchPlan: BatchExecutionPlan
@@ -305,3 +307,15 @@ export const executeBatchPlan = async (
     throw error
   }
 }
+
+export const executeBatchPlan = async (
+  command: ProcessCommand,
+  opts: RuntimeOptions,
+  batchPlan: BatchExecutionPlan
+): Promise<void> => {
+  try {
+    await executeBatchPlanItems(command, opts, batchPlan)
+  } finally {
+    await Promise.all([closeKittenTtsWorker(), closeReverbDiarizationWorker()])
+  }
+}
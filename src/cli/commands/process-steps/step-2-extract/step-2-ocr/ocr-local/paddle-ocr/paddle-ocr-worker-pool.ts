@@ -0,0 +1,266 @@
+import { readFile } from 'node:fs/promises'
+import { cpus, freemem, totalmem } from 'node:os'
+import * as l from '~/utils/logger'
+import { exec } from '~/utils/cli-utils'
+import {
+  startPaddleOcrWorker,
+  type PaddleModelProfile,
+  type PaddleOcrWorker,
+  type PaddleOcrWorkerResult
+} from './paddle-ocr-worker'
+
+const BYTES_PER_MB = 1024 * 1024
+const DEFAULT_WORKER_RSS_ESTIMATE_BYTES = 1536 * BYTES_PER_MB
+const DEFAULT_MEMORY_RESERVE_FRACTION = 0.1
+const MEMORY_SAMPLE_INTERVAL_MS = 1_000
+
+type PooledPaddleOcrWorker = {
+  worker: PaddleOcrWorker
+  busy: boolean
+  rssBytes: number
+  peakRssBytes: number
+  retireAfterRun: boolean
+}
+
+export type PaddleOcrWorkerPoolOptions = {
+  maxWorkers: number
+  memoryReserveBytes?: number | undefined
+  workerMaxRssBytes?: number | undefined
+  startWorker?: typeof startPaddleOcrWorker | undefined
+}
+
+export type PaddleOcrWorkerPool = {
+  maxWorkers: number
+  run: (
+    attempt: { modelProfile: PaddleModelProfile, maxImageSidePx: number },
+    imagePath: string
+  ) => Promise<PaddleOcrWorkerResult>
+  close: () => Promise<void>
+}
+
+const readPositiveIntegerEnv = (key: string): number | undefined => {
+  const value = Number.parseInt(process.env[key] ?? '', 10)
+  return Number.isFinite(value) && value > 0 ? value : undefined
+}
+
+const formatMb = (bytes: number): string => `${Math.round(bytes / BYTES_PER_MB)}MB`
+
+export const parseProcStatusRssBytes = (status: string): number | undefined => {
+  const match = status.match(/^VmRSS:\s+(\d+)\s+kB$/m)
+  return match ? Number(match[1]) * 1024 : undefined
+}
+
+export const readProcessRssBytes = async (pid: number): Promise<number | undefined> => {
+  try {
+    return parseProcStatusRssBytes(await readFile(`/proc/${pid}/status`, 'utf-8'))
+  } catch {}
+
+  const result = await exec('ps', ['-o', 'rss=', '-p', String(pid)])
+  const rssKb = Number.parseInt(result.stdout.trim(), 10)
+  return result.exitCode === 0 && Number.isFinite(rssKb) ? rssKb * 1024 : undefined
+}
+
+export const resolvePaddleOcrWorkerCount = (requested: number | undefined): number => {
+  const configured = requested ?? readPositiveIntegerEnv('AUTOSHOW_PADDLE_OCR_WORKERS')
+  return Math.max(1, Math.floor(configured ?? cpus().length / 2))
+}
+
+export const resolvePaddleOcrWorkerPoolOptions = (requestedWorkers: number | undefined): PaddleOcrWorkerPoolOptions => {
+  const reserveMb = readPositiveIntegerEnv('AUTOSHOW_PADDLE_OCR_MEMORY_RESERVE_MB')
+  const workerMaxMb = readPositiveIntegerEnv('AUTOSHOW_PADDLE_OCR_WORKER_MAX_MB')
+  return {
+    maxWorkers: resolvePaddleOcrWorkerCount(requestedWorkers),
+    memoryReserveBytes: reserveMb !== undefined ? reserveMb * BYTES_PER_MB : undefined,
+    workerMaxRssBytes: workerMaxMb !== undefined ? workerMaxMb * BYTES_PER_MB : undefined
+  }
+}
+
+export const createPaddleOcrWorkerPool = (options: PaddleOcrWorkerPoolOptions): PaddleOcrWorkerPool => {
+  const maxWorkers = Math.max(1, options.maxWorkers)
+  const reserveBytes = options.memoryReserveBytes ?? Math.floor(totalmem() * DEFAULT_MEMORY_RESERVE_FRACTION)
+  const cpuThreads = Math.max(1, Math.floor(cpus().length / maxWorkers))
+  const startWorker = options.startWorker ?? startPaddleOcrWorker
+  const entries: PooledPaddleOcrWorker[] = []
+  const waiters: Array<() => void> = []
+  let concurrencyLimit = maxWorkers
+  let sampler: ReturnType<typeof setInterval> | undefined
+  let sampling = false
+  let closed = false
+
+  const busyCount = (): number => entries.filter((entry) => entry.busy).length
+
+  const estimateWorkerRssBytes = (): number => {
+    const observed = Math.max(0, ...entries.map((entry) => entry.peakRssBytes))
+    return observed > 0 ? observed : DEFAULT_WORKER_RSS_ESTIMATE_BYTES
+  }
+
+  const wakeWaiters = (): void => {
+    for (const wake of waiters.splice(0)) {
+      wake()
+    }
+  }
+
+  const retire = (entry: PooledPaddleOcrWorker): void => {
+    const index = entries.indexOf(entry)
+    if (index >= 0) {
+      entries.splice(index, 1)
+    }
+    void entry.worker.close()
+  }
+
+  const dropDeadWorkers = (): void => {
+    for (const entry of [...entries]) {
+      if (!entry.busy && !entry.worker.isAlive()) {
+        retire(entry)
+      }
+    }
+  }
+
+  const shrink = (reason: string): void => {
+    const nextLimit = Math.max(1, Math.min(concurrencyLimit, busyCount()) - 1)
+    if (nextLimit >= concurrencyLimit) {
+      return
+    }
+
+    concurrencyLimit = nextLimit
+    l.warn(`PaddleOCR ${reason}; reducing worker concurrency to ${concurrencyLimit}`)
+    for (const entry of entries.filter((candidate) => !candidate.busy).slice(0, Math.max(0, entries.length - concurrencyLimit))) {
+      retire(entry)
+    }
+  }
+
+  const sampleMemory = async (): Promise<void> => {
+    if (sampling) {
+      return
+    }
+
+    sampling = true
+    try {
+      for (const entry of entries) {
+        const rssBytes = await readProcessRssBytes(entry.worker.pid)
+        if (rssBytes === undefined) {
+          continue
+        }
+
+        entry.rssBytes = rssBytes
+        entry.peakRssBytes = Math.max(entry.peakRssBytes, rssBytes)
+        if (options.workerMaxRssBytes !== undefined && rssBytes > options.workerMaxRssBytes && !entry.retireAfterRun) {
+          entry.retireAfterRun = true
+          l.debug(`PaddleOCR worker ${entry.worker.pid} RSS ${formatMb(rssBytes)} exceeds ${formatMb(options.workerMaxRssBytes)}; recycling after its current page`)
+        }
+      }
+
+      const freeBytes = freemem()
+      if (freeBytes < reserveBytes) {
+        shrink(`memory pressure (${formatMb(freeBytes)} available, reserve ${formatMb(reserveBytes)})`)
+      } else if (concurrencyLimit < maxWorkers && freeBytes - estimateWorkerRssBytes() * 2 > reserveBytes) {
+        concurrencyLimit++
+        wakeWaiters()
+      }
+    } finally {
+      sampling = false
+    }
+  }
+
+  const ensureSampler = (): void => {
+    if (sampler || closed) {
+      return
+    }
+
+    sampler = setInterval(() => {
+      void sampleMemory()
+    }, MEMORY_SAMPLE_INTERVAL_MS)
+    ;(sampler as { unref?: () => void }).unref?.()
+  }
+
+  const canSpawn = (): boolean =>
+    entries.length < concurrencyLimit
+    && (entries.length === 0 || freemem() - estimateWorkerRssBytes() > reserveBytes)
+
+  const assertOpen = (): void => {
+    if (closed) {
+      throw new Error('PaddleOCR worker pool is closed')
+    }
+  }
+
+  const spawn = (attempt: { modelProfile: PaddleModelProfile, maxImageSidePx: number }): PooledPaddleOcrWorker => {
+    assertOpen()
+    const entry: PooledPaddleOcrWorker = {
+      worker: startWorker({ ...attempt, cpuThreads }),
+      busy: true,
+      rssBytes: 0,
+      peakRssBytes: 0,
+      retireAfterRun: false
+    }
+    entries.push(entry)
+    ensureSampler()
+    return entry
+  }
+
+  const acquire = async (attempt: { modelProfile: PaddleModelProfile, maxImageSidePx: number }): Promise<PooledPaddleOcrWorker> => {
+    while (true) {
+      assertOpen()
+      dropDeadWorkers()
+
+      if (busyCount() < concurrencyLimit) {
+        const idle = entries.find((entry) => !entry.busy && entry.worker.modelProfile === attempt.modelProfile)
+        if (idle) {
+          idle.busy = true
+          return idle
+        }
+
+        if (canSpawn()) {
+          return spawn(attempt)
+        }
+
+        const idleOtherProfile = entries.find((entry) => !entry.busy)
+        if (idleOtherProfile) {
+          retire(idleOtherProfile)
+          continue
+        }
+      }
+
+      if (busyCount() === 0) {
+        return spawn(attempt)
+      }
+
+      await new Promise<void>((resolve) => {
+        waiters.push(resolve)
+      })
+    }
+  }
+
+  const run = async (
+    attempt: { modelProfile: PaddleModelProfile, maxImageSidePx: number },
+    imagePath: string
+  ): Promise<PaddleOcrWorkerResult> => {
+    const entry = await acquire(attempt)
+    try {
+      const result = await entry.worker.run(imagePath, attempt.maxImageSidePx)
+      if (!result.ok && !entry.worker.isAlive()) {
+        shrink(`worker exited with code ${result.failure.exitCode}`)
+      }
+      return result
+    } finally {
+      entry.busy = false
+      if (entry.retireAfterRun || !entry.worker.isAlive() || entries.length > concurrencyLimit) {
+        retire(entry)
+      }
+      wakeWaiters()
+    }
+  }
+
+  const close = async (): Promise<void> => {
+    closed = true
+    if (sampler) {
+      clearInterval(sampler)
+      sampler = undefined
+    }
+
+    const active = entries.splice(0)
+    wakeWaiters()
+    await Promise.all(active.map(async (entry) => await entry.worker.close()))
+  }
+
+  return { maxWorkers, run, close }
+}
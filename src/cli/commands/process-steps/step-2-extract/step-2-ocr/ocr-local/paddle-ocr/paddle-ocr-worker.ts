@@ -0,0 +1,133 @@
+import { join } from 'node:path'
+import * as v from 'valibot'
+import { paddleOcrUvEnvDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
+import { appendOutputTail, startJsonLinesWorker, type JsonLinesWorkerOutput } from '~/utils/json-lines-worker'
+import { stripAnsi } from '../../ocr-run-state'
+
+const SCRIPT_PATH = join(import.meta.dir, 'scripts/run-paddle-ocr.py')
+
+export type PaddleModelProfile = 'auto' | 'mobile' | 'tiered'
+
+export type PaddleOcrOutput = { text: string, confidence?: number }
+
+export type PaddleOcrFailure = { stdout: string, stderr: string, exitCode: number }
+
+export type PaddleOcrPreparedImage = {
+  sourceWidth: number
+  sourceHeight: number
+  width: number
+  height: number
+  tileSide?: number | undefined
+  tiles?: number | undefined
+}
+
+export type PaddleOcrEscalatedLine = {
+  line: number
+  mobileText: string
+  mobileScore: number
+  serverText: string
+  serverScore: number
+  replaced: boolean
+}
+
+export type PaddleOcrWorkerResult =
+  | { ok: true, output: PaddleOcrOutput, prepared?: PaddleOcrPreparedImage, escalated?: PaddleOcrEscalatedLine[] }
+  | { ok: false, failure: PaddleOcrFailure }
+
+export type PaddleOcrWorker = {
+  modelProfile: PaddleModelProfile
+  pid: number
+  isAlive: () => boolean
+  run: (imagePath: string, maxImageSidePx: number) => Promise<PaddleOcrWorkerResult>
+  close: () => Promise<void>
+}
+
+const PaddleOcrWorkerResponseSchema = v.object({
+  id: v.nullable(v.number()),
+  text: v.optional(v.string(), undefined),
+  confidence: v.optional(v.number(), undefined),
+  error: v.optional(v.string(), undefined),
+  prepared: v.optional(v.object({
+    sourceWidth: v.number(),
+    sourceHeight: v.number(),
+    width: v.number(),
+    height: v.number(),
+    tileSide: v.optional(v.number(), undefined),
+    tiles: v.optional(v.number(), undefined)
+  }), undefined),
+  escalated: v.optional(v.array(v.object({
+    line: v.number(),
+    mobileText: v.string(),
+    mobileScore: v.number(),
+    serverText: v.string(),
+    serverScore: v.number(),
+    replaced: v.boolean()
+  })), undefined)
+})
+
+export type PaddleOcrWorkerResponse = v.InferOutput<typeof PaddleOcrWorkerResponseSchema>
+
+export const parsePaddleOcrWorkerResponse = (line: string): PaddleOcrWorkerResponse | undefined => {
+  const trimmed = stripAnsi(line).trim()
+  if (!trimmed.startsWith('{') || !trimmed.endsWith('}')) {
+    return undefined
+  }
+
+  let parsed: unknown
+  try {
+    parsed = JSON.parse(trimmed)
+  } catch {
+    return undefined
+  }
+
+  const result = v.safeParse(PaddleOcrWorkerResponseSchema, parsed)
+  return result.success ? result.output : undefined
+}
+
+export const startPaddleOcrWorker = (options: {
+  modelProfile: PaddleModelProfile
+  maxImageSidePx: number
+  cpuThreads?: number | undefined
+}): PaddleOcrWorker => {
+  const { modelProfile, maxImageSidePx, cpuThreads } = options
+  const failure = (message: string, exitCode: number, output: JsonLinesWorkerOutput): PaddleOcrWorkerResult => ({
+    ok: false,
+    failure: { stdout: output.stdout, stderr: appendOutputTail(output.stderr, `${message}\n`), exitCode }
+  })
+
+  const worker = startJsonLinesWorker<{ image: string, maxSide: number }, PaddleOcrWorkerResponse, PaddleOcrWorkerResult>({
+    name: 'PaddleOCR worker',
+    command: [`${paddleOcrUvEnvDir}/bin/python`, SCRIPT_PATH, '--worker'],
+    env: {
+      ...process.env,
+      PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK: 'True',
+      AUTOSHOW_PADDLE_OCR_MAX_SIDE: String(maxImageSidePx),
+      AUTOSHOW_PADDLE_OCR_MODEL_PROFILE: modelProfile,
+      ...(cpuThreads !== undefined ? { AUTOSHOW_PADDLE_OCR_CPU_THREADS: String(cpuThreads) } : {})
+    },
+    parseResponse: parsePaddleOcrWorkerResponse,
+    toResult: (response, output) => {
+      if (response.error !== undefined || response.text === undefined) {
+        return failure(response.error ?? 'PaddleOCR worker returned no text', 1, output)
+      }
+
+      return {
+        ok: true,
+        output: response.confidence !== undefined
+          ? { text: response.text, confidence: response.confidence }
+          : { text: response.text },
+        ...(response.prepared ? { prepared: response.prepared } : {}),
+        ...(response.escalated ? { escalated: response.escalated } : {})
+      }
+    },
+    toFailure: failure
+  })
+
+  return {
+    modelProfile,
+    pid: worker.pid,
+    isAlive: worker.isAlive,
+    run: async (imagePath, requestMaxImageSidePx) => await worker.run({ image: imagePath, maxSide: requestMaxImageSidePx }),
+    close: worker.close
+  }
+}
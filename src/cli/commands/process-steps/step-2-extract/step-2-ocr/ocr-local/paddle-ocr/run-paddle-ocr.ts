@@ -1,53 +1,27 @@
-import { mkdtemp, rm } from 'node:fs/promises'
-import { tmpdir } from 'node:os'
-import { basename, extname, join, resolve } from 'node:path'
-import * as v from 'valibot'
-import { validateData } from '~/utils/validate/validation'
+import { basename, resolve } from 'node:path'
 import * as l from '~/utils/logger'
-import { commandExists, exec } from '~/utils/cli-utils'
-import type { ExtractionOptions, OcrFn } from '~/types'
-import { paddleOcrUvEnvDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
+import type { ExtractionOptions, OcrFnProvider } from '~/types'
 import { ensurePaddleOcrSetup } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-local/paddle-ocr/paddle-ocr'
 import { stripAnsi } from '../../ocr-run-state'
 import { logPaddleOcrPrepare } from '../../ocr-logging'
-import { readImageDimensionsWithBun } from '../../ocr-utils/bun-image-utils'
+import type { PaddleModelProfile, PaddleOcrFailure, PaddleOcrOutput } from './paddle-ocr-worker'
+import {
+  createPaddleOcrWorkerPool,
+  resolvePaddleOcrWorkerPoolOptions,
+  type PaddleOcrWorkerPool
+} from './paddle-ocr-worker-pool'
 
-const SCRIPT_PATH = join(import.meta.dir, 'scripts/run-paddle-ocr.py')
-type PaddleModelProfile = 'auto' | 'mobile'
 type PaddleRunAttempt = {
   maxImageSidePx: number
   modelProfile: PaddleModelProfile
 }
-const PADDLE_RUN_ATTEMPTS: PaddleRunAttempt[] = [
-  { maxImageSidePx: 1000, modelProfile: 'auto' },
-  { maxImageSidePx: 800, modelProfile: 'auto' },
-  { maxImageSidePx: 1000, modelProfile: 'mobile' },
+export const resolvePaddleRunAttempts = (
+  requestedProfile = process.env['AUTOSHOW_PADDLE_OCR_MODEL_PROFILE']
+): PaddleRunAttempt[] => [
+  { maxImageSidePx: 1000, modelProfile: requestedProfile?.trim().toLowerCase() === 'tiered' ? 'tiered' : 'auto' },
   { maxImageSidePx: 800, modelProfile: 'mobile' }
 ]
 
-const PaddleOcrOutputSchema = v.object({
-  text: v.string(),
-  confidence: v.optional(v.number(), undefined)
-})
-
-export const parsePaddleImageDimensions = (output: string): { width: number, height: number } | undefined => {
-  const match = output.trim().match(/^(\d+)\s+(\d+)$/)
-  if (!match) {
-    return undefined
-  }
-
-  const width = Number(match[1])
-  const height = Number(match[2])
-  if (!Number.isFinite(width) || !Number.isFinite(height) || width <= 0 || height <= 0) {
-    return undefined
-  }
-
-  return { width, height }
-}
-
-export const readPaddleImageDimensions = async (inputPath: string): Promise<{ width: number, height: number }> =>
-  await readImageDimensionsWithBun(inputPath)
-
 const signalNameForExitCode = (exitCode: number): string | undefined => {
   const signalNumber = exitCode - 128
   if (signalNumber <= 0) {
@@ -71,7 +45,7 @@ export const isPaddleNativeCrashExitCode = (exitCode: number): boolean => {
 
 export const summarizePaddleFailure = (
   imagePath: string,
-  result: { stdout: string, stderr: string, exitCode: number }
+  result: PaddleOcrFailure
 ): string => {
   const details = [
     stripAnsi(result.stderr).trim(),
@@ -88,93 +62,10 @@ export const summarizePaddleFailure = (
     : signalSummary
 }
 
-export const extractPaddleOcrJsonLine = (stdout: string): string | undefined => {
-  const lines = stripAnsi(stdout).trim().split('\n').map((line) => line.trim()).filter((line) => line.length > 0)
-  for (let index = lines.length - 1; index >= 0; index--) {
-    const line = lines[index]
-    if (line !== undefined && line.startsWith('{') && line.endsWith('}')) {
-      return line
-    }
-  }
-  return undefined
-}
-
-export const buildPaddlePreparedImagePath = (
-  inputPath: string,
-  workDir: string,
-  maxImageSidePx: number
-): string => {
-  const ext = extname(inputPath).toLowerCase()
-  return join(workDir, `${basename(inputPath, ext || undefined)}-paddle-${maxImageSidePx}.jpg`)
-}
-
-const preparePaddleImage = async (inputPath: string, workDir: string, maxImageSidePx: number): Promise<string> => {
-  if (!commandExists('convert')) {
-    l.warn('ImageMagick convert not found; using original image for PaddleOCR which may increase memory pressure')
-    return inputPath
-  }
-
-  let dimensions: { width: number, height: number }
-  try {
-    dimensions = await readPaddleImageDimensions(inputPath)
-  } catch (error) {
-    logPaddleOcrPrepare(l, {
-      status: 'inspect-failed',
-      input: basename(inputPath),
-      maxSide: maxImageSidePx,
-      detail: error instanceof Error ? error.message : String(error)
-    })
-    return inputPath
-  }
-
-  const maxSide = Math.max(dimensions.width, dimensions.height)
-  const ext = extname(inputPath).toLowerCase()
-  if (maxSide <= maxImageSidePx && ['.jpg', '.jpeg', '.png'].includes(ext)) {
-    return inputPath
-  }
-
-  const preparedPath = buildPaddlePreparedImagePath(inputPath, workDir, maxImageSidePx)
-  const imageFramePath = `${inputPath}[0]`
-  const resize = `${maxImageSidePx}x${maxImageSidePx}>`
-  const result = await exec('convert', [
-    imageFramePath,
-    '-auto-orient',
-    '-colorspace', 'RGB',
-    '-background', 'white',
-    '-alpha', 'remove',
-    '-alpha', 'off',
-    '-resize', resize,
-    '-quality', '92',
-    preparedPath
-  ])
-
-  if (result.exitCode !== 0) {
-    logPaddleOcrPrepare(l, {
-      status: 'failed',
-      input: basename(inputPath),
-      dimensions,
-      maxSide: maxImageSidePx,
-      detail: result.stderr || result.stdout || 'ImageMagick convert failed.'
-    })
-    return inputPath
-  }
-
-  if (maxSide > maxImageSidePx) {
-    logPaddleOcrPrepare(l, {
-      status: 'downsampled',
-      input: basename(inputPath),
-      dimensions,
-      maxSide: maxImageSidePx
-    })
-  }
-
-  return preparedPath
-}
-
 type PaddleAttemptFailure = {
   maxImageSidePx: number
   modelProfile: PaddleModelProfile
-  result: { stdout: string, stderr: string, exitCode: number }
+  result: PaddleOcrFailure
 }
 
 const summarizePaddleAttemptFailures = (imagePath: string, failures: PaddleAttemptFailure[]): string => {
@@ -190,66 +81,80 @@ const summarizePaddleAttemptFailures = (imagePath: string, failures: PaddleAttem
   ].join('\n')
 }
 
-const runScript = async (imagePath: string): Promise<{ text: string, confidence?: number }> => {
-  const pythonBin = `${paddleOcrUvEnvDir}/bin/python`
-  const workDir = await mkdtemp(join(tmpdir(), 'autoshow-paddle-ocr-'))
-  const failures: PaddleAttemptFailure[] = []
+type PaddleOcrRunner = {
+  concurrency: number
+  run: (imagePath: string) => Promise<PaddleOcrOutput>
+  close: () => Promise<void>
+}
 
-  try {
+const createPaddleOcrRunner = (pool: PaddleOcrWorkerPool): PaddleOcrRunner => {
+  const attempts = resolvePaddleRunAttempts()
+
+  const run = async (imagePath: string): Promise<PaddleOcrOutput> => {
+    const failures: PaddleAttemptFailure[] = []
     const resolvedImagePath = resolve(imagePath)
-    for (const [attemptIndex, attempt] of PADDLE_RUN_ATTEMPTS.entries()) {
+
+    for (const [attemptIndex, attempt] of attempts.entries()) {
       const { maxImageSidePx, modelProfile } = attempt
-      const preparedImagePath = await preparePaddleImage(resolvedImagePath, workDir, maxImageSidePx)
-      const result = await exec(pythonBin, [SCRIPT_PATH, preparedImagePath], {
-        env: {
-          PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK: 'True',
-          AUTOSHOW_PADDLE_OCR_MAX_SIDE: String(maxImageSidePx),
-          AUTOSHOW_PADDLE_OCR_MODEL_PROFILE: modelProfile
+      const result = await pool.run(attempt, resolvedImagePath)
+      if (result.ok) {
+        const { prepared, escalated } = result
+        if (escalated && escalated.length > 0) {
+          const replaced = escalated.filter((line) => line.replaced).map((line) => line.line + 1)
+          l.debug(`PaddleOCR escalated ${escalated.length} low-confidence line(s) in ${basename(resolvedImagePath)} to the server recognizer; replaced line(s): ${replaced.length > 0 ? replaced.join(', ') : 'none'}`)
         }
-      })
-      if (result.exitCode !== 0) {
-        failures.push({ maxImageSidePx, modelProfile, result })
-        if (isPaddleNativeCrashExitCode(result.exitCode) && attemptIndex < PADDLE_RUN_ATTEMPTS.length - 1) {
-          const nextAttempt = PADDLE_RUN_ATTEMPTS[attemptIndex + 1]
-          l.warn(`PaddleOCR exited with a native signal using ${modelProfile} at max ${maxImageSidePx}px; retrying with ${nextAttempt?.modelProfile ?? 'auto'} at max ${nextAttempt?.maxImageSidePx ?? maxImageSidePx}px`)
-          continue
+        if (prepared?.tiles !== undefined) {
+          logPaddleOcrPrepare(l, {
+            status: 'tiled',
+            input: basename(resolvedImagePath),
+            dimensions: { width: prepared.width, height: prepared.height },
+            maxSide: prepared.tileSide ?? maxImageSidePx,
+            detail: `${prepared.tiles} tile(s)`
+          })
+        } else if (prepared && Math.max(prepared.width, prepared.height) < Math.max(prepared.sourceWidth, prepared.sourceHeight)) {
+          logPaddleOcrPrepare(l, {
+            status: 'downsampled',
+            input: basename(resolvedImagePath),
+            dimensions: { width: prepared.sourceWidth, height: prepared.sourceHeight },
+            maxSide: Math.max(prepared.width, prepared.height)
+          })
         }
-        throw new Error(summarizePaddleAttemptFailures(imagePath, failures))
-      }
-      const jsonLine = extractPaddleOcrJsonLine(result.stdout)
-      if (!jsonLine) {
-        throw new Error(`PaddleOCR returned no JSON output for ${imagePath}: ${summarizePaddleFailure(imagePath, result)}`)
+        return result.output
       }
 
-      let parsed: unknown
-      try {
-        parsed = JSON.parse(jsonLine)
-      } catch (error) {
-        const detail = error instanceof Error ? error.message : String(error)
-        throw new Error(`PaddleOCR returned invalid JSON for ${imagePath}: ${detail}\n${summarizePaddleFailure(imagePath, result)}`)
+      failures.push({ maxImageSidePx, modelProfile, result: result.failure })
+      if (isPaddleNativeCrashExitCode(result.failure.exitCode) && attemptIndex < attempts.length - 1) {
+        const nextAttempt = attempts[attemptIndex + 1]
+        l.warn(`PaddleOCR exited with a native signal using ${modelProfile} at max ${maxImageSidePx}px; retrying with ${nextAttempt?.modelProfile ?? 'auto'} at max ${nextAttempt?.maxImageSidePx ?? maxImageSidePx}px`)
+        continue
       }
-
-      const validated = validateData(PaddleOcrOutputSchema, parsed, 'paddle-ocr output')
-      if (validated.confidence !== undefined) {
-        return { text: validated.text, confidence: validated.confidence }
-      }
-      return { text: validated.text }
+      throw new Error(summarizePaddleAttemptFailures(imagePath, failures))
     }
     throw new Error(summarizePaddleAttemptFailures(imagePath, failures))
-  } finally {
-    await rm(workDir, { recursive: true, force: true })
   }
+
+  return { concurrency: pool.maxWorkers, run, close: pool.close }
 }
 
-export const runPaddleOcrOnImage = async (imagePath: string): Promise<{ text: string, confidence?: number }> => {
+export const runPaddleOcrOnImage = async (imagePath: string): Promise<PaddleOcrOutput> => {
   await ensurePaddleOcrSetup()
   l.write('info', `Running PaddleOCR on ${imagePath}`)
-  return await runScript(imagePath)
+  const runner = createPaddleOcrRunner(createPaddleOcrWorkerPool({ maxWorkers: 1 }))
+  try {
+    return await runner.run(imagePath)
+  } finally {
+    await runner.close()
+  }
 }
 
-export const buildPaddleOcrPageFn = async (_opts: ExtractionOptions): Promise<OcrFn> => {
-  await ensurePaddleOcrSetup()
-  return async (imagePath: string) => {
-    return await runScript(imagePath)
+export const buildPaddleOcrPageProvider = (opts: ExtractionOptions): OcrFnProvider => {
+  const runner = createPaddleOcrRunner(createPaddleOcrWorkerPool(resolvePaddleOcrWorkerPoolOptions(opts.ocrConcurrency)))
+  return {
+    concurrency: runner.concurrency,
+    getOcrFn: async () => {
+      await ensurePaddleOcrSetup()
+      return async (imagePath: string) => await runner.run(imagePath)
+    },
+    dispose: async () => await runner.close()
   }
 }
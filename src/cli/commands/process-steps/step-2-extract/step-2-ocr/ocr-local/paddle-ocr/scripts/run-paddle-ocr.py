@@ -1,20 +1,41 @@
+import argparse
+import hashlib
+import io
 import sys
 import json
 import os
+import time
 
 os.environ.setdefault('PADDLE_PDX_LOGGING_LEVEL', 'WARNING')
 os.environ.setdefault('FLAGS_call_stack_level', '2')
 os.environ.setdefault('PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK', 'True')
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp')
+MIN_ADAPTIVE_SIDE = 640
+DET_BYTES_PER_PIXEL = 1200
+TILE_DUPLICATE_OVERLAP = 0.5
+# Pillow's default decompression-bomb limit, kept for untiled pages; tiled
+# pages are converted one tile at a time and may be larger.
+DEFAULT_MAX_IMAGE_PIXELS = 89_478_485
+TILED_MAX_IMAGE_PIXELS = 1_000_000_000
+CACHE_SCHEMA_VERSION = 1
+SERVER_REC_MODEL_NAME = 'PP-OCRv5_server_rec'
+ESCALATION_CROP_PADDING = 4
+CACHE_PRUNE_EVERY_WRITES = 64
+
 
 def official_model_exists(model_name):
     model_dir = os.path.expanduser(os.path.join('~', '.paddlex', 'official_models', model_name))
     return os.path.isdir(model_dir)
 
 
+def read_model_profile():
+    return os.environ.get('AUTOSHOW_PADDLE_OCR_MODEL_PROFILE', 'auto').strip().lower()
+
+
 def choose_model_name(mobile_model_name, server_model_name):
-    profile = os.environ.get('AUTOSHOW_PADDLE_OCR_MODEL_PROFILE', 'auto').strip().lower()
-    if profile == 'mobile':
+    profile = read_model_profile()
+    if profile in ('mobile', 'tiered'):
         return mobile_model_name
     if profile == 'server':
         return server_model_name
@@ -26,6 +47,13 @@ def choose_model_name(mobile_model_name, server_model_name):
     return mobile_model_name
 
 
+def choose_model_names():
+    return (
+        choose_model_name('PP-OCRv5_mobile_det', 'PP-OCRv5_server_det'),
+        choose_model_name('PP-OCRv5_mobile_rec', 'PP-OCRv5_server_rec')
+    )
+
+
 def parse_positive_int(value, default):
     try:
         parsed = int(value)
@@ -34,6 +62,20 @@ def parse_positive_int(value, default):
         return default
 
 
+def parse_positive_float(value, default):
+    try:
+        parsed = float(value)
+        return parsed if parsed > 0 else default
+    except Exception:
+        return default
+
+
+def read_escalation_threshold():
+    if read_model_profile() != 'tiered':
+        return None
+    return min(1.0, parse_positive_float(os.environ.get('AUTOSHOW_PADDLE_OCR_ESCALATE_BELOW'), 0.8))
+
+
 def get_value(result, key, default):
     if isinstance(result, dict):
         return result.get(key, default)
@@ -69,70 +111,650 @@ def box_sort_key(box):
     return (0.0, 0.0)
 
 
-def main():
-    if len(sys.argv) < 2:
-        print(json.dumps({"text": "", "confidence": 0.0}))
+def read_available_memory_bytes():
+    try:
+        with open('/proc/meminfo', 'r') as meminfo:
+            for line in meminfo:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except Exception:
+        return None
+
+
+def read_memory_pixel_budget():
+    available = read_available_memory_bytes()
+    if not available:
+        return None
+
+    fraction = parse_positive_float(os.environ.get('AUTOSHOW_PADDLE_OCR_MEMORY_FRACTION', '0.5'), 0.5)
+    return available * min(fraction, 1.0) / DET_BYTES_PER_PIXEL
+
+
+def choose_max_side(width, height, max_side_cap):
+    longest = max(width, height)
+    max_side = min(longest, max_side_cap)
+
+    max_pixels = read_memory_pixel_budget()
+    if max_pixels:
+        scale = (max_pixels / float(max(1, width * height))) ** 0.5
+        max_side = min(max_side, int(longest * scale))
+
+    return max(min(longest, MIN_ADAPTIVE_SIDE), max_side)
+
+
+def choose_tile_side(max_side_cap):
+    tile_side = max_side_cap
+    max_pixels = read_memory_pixel_budget()
+    if max_pixels:
+        tile_side = min(tile_side, int(max_pixels ** 0.5))
+    return max(MIN_ADAPTIVE_SIDE, tile_side)
+
+
+def read_tiling_mode():
+    return os.environ.get('AUTOSHOW_PADDLE_OCR_TILING', 'off').strip().lower()
+
+
+def should_tile(width, height, max_side):
+    mode = read_tiling_mode()
+    longest = max(width, height)
+    if mode == 'on':
+        return longest > max_side
+    if mode == 'auto':
+        return longest > max_side * 2
+    return False
+
+
+def read_tile_overlap(tile_side):
+    overlap = parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_TILE_OVERLAP'), max(64, tile_side // 8))
+    return min(overlap, tile_side // 2)
+
+
+def plan_image(width, height, max_side_cap):
+    # Resolves the working geometry from the source size and the memory
+    # available right now; the plan is part of the cache key so a page read
+    # under memory pressure is not served to a later full-quality run.
+    max_side = choose_max_side(width, height, max_side_cap)
+    if should_tile(width, height, max_side):
+        tile_side = choose_tile_side(max_side_cap)
+        return {"tileSide": tile_side, "tileOverlap": read_tile_overlap(tile_side)}
+    return {"maxSide": max_side}
+
+
+def read_image_size(image_bytes):
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = TILED_MAX_IMAGE_PIXELS if read_tiling_mode() != 'off' else DEFAULT_MAX_IMAGE_PIXELS
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        return source.size
+
+
+def flatten_to_rgb(image):
+    from PIL import Image
+
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        rgba = image.convert('RGBA')
+        flattened = Image.new('RGB', rgba.size, (255, 255, 255))
+        flattened.paste(rgba, mask=rgba.getchannel('A'))
+        return flattened
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def to_bgr_array(image):
+    import numpy as np
+
+    return np.ascontiguousarray(np.asarray(flatten_to_rgb(image))[:, :, ::-1])
+
+
+def exif_transpose_in_place(image):
+    from PIL import ImageOps
+
+    try:
+        ImageOps.exif_transpose(image, in_place=True)
+        return image
+    except TypeError:
+        return ImageOps.exif_transpose(image)
+
+
+def prepare_image(image_bytes, plan):
+    # Returns a PIL image. Untiled pages are downscaled and flattened to RGB
+    # here; tiled pages stay at source resolution in their source mode, and
+    # each tile or escalation crop is converted on its own, so only one
+    # decoded copy of a large page is ever held.
+    from PIL import Image
+
+    tile_side = plan.get('tileSide')
+    max_side = plan.get('maxSide')
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source_width, source_height = source.size
+        if tile_side is None and source_width * source_height > 2 * DEFAULT_MAX_IMAGE_PIXELS:
+            raise Image.DecompressionBombError(
+                f'Image size ({source_width * source_height} pixels) exceeds the untiled limit of {2 * DEFAULT_MAX_IMAGE_PIXELS} pixels; set AUTOSHOW_PADDLE_OCR_TILING=on to read it in tiles'
+            )
+        if tile_side is None and source.format == 'JPEG' and max(source_width, source_height) > max_side:
+            source.draft('RGB', (max_side, max_side))
+
+        source.load()
+        if tile_side is not None:
+            image = exif_transpose_in_place(source)
+        else:
+            from PIL import ImageOps
+
+            image = flatten_to_rgb(ImageOps.exif_transpose(source))
+            if max(image.size) > max_side:
+                image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    width, height = image.size
+    prepared = {
+        "sourceWidth": source_width,
+        "sourceHeight": source_height,
+        "width": width,
+        "height": height
+    }
+    if tile_side is not None:
+        prepared['tileSide'] = tile_side
+    return image, prepared
+
+
+def box_bounds(box):
+    if hasattr(box, 'tolist'):
+        box = box.tolist()
+
+    try:
+        if isinstance(box, (list, tuple)) and len(box) > 0 and isinstance(box[0], (list, tuple)):
+            xs = [to_float(point[0]) for point in box if len(point) > 1]
+            ys = [to_float(point[1]) for point in box if len(point) > 1]
+            if xs and ys:
+                return [min(xs), min(ys), max(xs), max(ys)]
+        elif isinstance(box, (list, tuple)) and len(box) >= 4:
+            return [to_float(box[0]), to_float(box[1]), to_float(box[2]), to_float(box[3])]
+    except Exception:
+        pass
+
+    return None
+
+
+def box_area(bounds):
+    return max(0.0, bounds[2] - bounds[0]) * max(0.0, bounds[3] - bounds[1])
+
+
+def overlap_ratio(first, second):
+    overlap_x = min(first[2], second[2]) - max(first[0], second[0])
+    overlap_y = min(first[3], second[3]) - max(first[1], second[1])
+    if overlap_x <= 0 or overlap_y <= 0:
+        return 0.0
+
+    smaller = min(box_area(first), box_area(second))
+    return (overlap_x * overlap_y) / smaller if smaller > 0 else 0.0
+
+
+def tile_origins(length, tile_side, overlap):
+    if length <= tile_side:
+        return [0]
+
+    step = max(1, tile_side - overlap)
+    origins = list(range(0, length - tile_side + 1, step))
+    if origins[-1] + tile_side < length:
+        origins.append(length - tile_side)
+    return origins
+
+
+def dedupe_tile_items(items, cell_side):
+    kept = []
+    cells = {}
+
+    for item in sorted(items, key=lambda x: box_area(x[0]), reverse=True):
+        bounds, tile_index = item[0], item[3]
+        keys = [
+            (column, row)
+            for column in range(int(bounds[0] // cell_side), int(bounds[2] // cell_side) + 1)
+            for row in range(int(bounds[1] // cell_side), int(bounds[3] // cell_side) + 1)
+        ]
+        duplicate = any(
+            other[3] != tile_index and overlap_ratio(bounds, other[0]) >= TILE_DUPLICATE_OVERLAP
+            for key in keys
+            for other in cells.get(key, ())
+        )
+        if duplicate:
+            continue
+
+        kept.append(item)
+        for key in keys:
+            cells.setdefault(key, []).append(item)
+
+    return kept
+
+
+def recognize_tiled(ocr, image, tile_side, overlap):
+    width, height = image.size
+
+    items = []
+    tile_count = 0
+    for top in tile_origins(height, tile_side, overlap):
+        for left in tile_origins(width, tile_side, overlap):
+            tile = to_bgr_array(image.crop((left, top, min(width, left + tile_side), min(height, top + tile_side))))
+            for page_result in ocr.predict(tile, text_det_limit_side_len=tile_side):
+                page, has_boxes = page_items(page_result)
+                for box, text, score in page:
+                    if not str(text).strip():
+                        continue
+                    bounds = box_bounds(box) if has_boxes else None
+                    if bounds is None:
+                        bounds = [0.0, 0.0, 0.0, 0.0]
+                    bounds = [bounds[0] + left, bounds[1] + top, bounds[2] + left, bounds[3] + top]
+                    items.append((bounds, text, score, tile_count))
+            tile_count += 1
+
+    merged = dedupe_tile_items(items, tile_side)
+    merged.sort(key=lambda x: box_sort_key(x[0]))
+    return [(bounds, text, score) for bounds, text, score, _ in merged], tile_count
+
+
+def lazy_ocr(text_det_limit_side_len, rec_batch_size):
+    state = {}
+
+    def get_ocr():
+        if 'ocr' not in state:
+            state['ocr'] = build_ocr(text_det_limit_side_len, rec_batch_size)
+        return state['ocr']
+
+    def get_server_rec():
+        if 'server_rec' not in state:
+            state['server_rec'] = build_server_rec()
+        return state['server_rec']
+
+    get_ocr.server_rec = get_server_rec
+    get_ocr.rec_batch_size = rec_batch_size
+    return get_ocr
+
+
+def crop_line(image, box):
+    bounds = box_bounds(box) if box is not None else None
+    if bounds is None:
+        return None
+
+    width, height = image.size
+    left = max(0, int(bounds[0]) - ESCALATION_CROP_PADDING)
+    top = max(0, int(bounds[1]) - ESCALATION_CROP_PADDING)
+    right = min(width, int(bounds[2] + 0.999) + ESCALATION_CROP_PADDING)
+    bottom = min(height, int(bounds[3] + 0.999) + ESCALATION_CROP_PADDING)
+    if right - left < 2 or bottom - top < 2:
+        return None
+    return to_bgr_array(image.crop((left, top, right, bottom)))
+
+
+def escalate_items(get_server_rec, image, items, threshold, rec_batch_size):
+    candidates = []
+    line_index = 0
+    for item_index, (box, text, score) in enumerate(items):
+        if not str(text).strip():
+            continue
+        if to_float(score) < threshold:
+            crop = crop_line(image, box)
+            if crop is not None:
+                candidates.append((item_index, line_index, crop))
+        line_index += 1
+
+    if not candidates:
+        return items, []
+
+    results = list(get_server_rec().predict([crop for _, _, crop in candidates], batch_size=rec_batch_size))
+    merged = list(items)
+    escalated = []
+    for (item_index, line_index, _), result in zip(candidates, results):
+        box, mobile_text, mobile_score = items[item_index]
+        server_text = str(get_value(result, 'rec_text', '') or '')
+        server_score = to_float(get_value(result, 'rec_score', 0.0))
+        replaced = bool(server_text.strip()) and server_score > to_float(mobile_score)
+        if replaced:
+            merged[item_index] = (box, server_text, server_score)
+        escalated.append({
+            "line": line_index,
+            "mobileText": str(mobile_text).strip(),
+            "mobileScore": round(to_float(mobile_score), 4),
+            "serverText": server_text.strip(),
+            "serverScore": round(server_score, 4),
+            "replaced": replaced
+        })
+
+    return merged, escalated
+
+
+def recognize(get_ocr, image_path, max_side_cap, cache=None):
+    with open(image_path, 'rb') as handle:
+        image_bytes = handle.read()
+
+    plan = plan_image(*read_image_size(image_bytes), max_side_cap)
+    cache_key = build_cache_key(cache, image_bytes, plan) if cache is not None else None
+    if cache_key is not None:
+        entry = read_cache_entry(cache, cache_key)
+        if entry is not None:
+            output = {"text": entry['text'], "confidence": entry['confidence'], "cached": True}
+            if entry.get('escalated') is not None:
+                output['escalated'] = entry['escalated']
+            return output, entry.get('prepared') or {}
+
+    image, prepared = prepare_image(image_bytes, plan)
+    del image_bytes
+
+    tile_side = prepared.get('tileSide')
+    if tile_side is not None:
+        items, prepared['tiles'] = recognize_tiled(get_ocr(), image, tile_side, plan['tileOverlap'])
+    else:
+        result = get_ocr().predict(to_bgr_array(image), text_det_limit_side_len=max(prepared['width'], prepared['height']))
+        items = collect_items(result)
+
+    threshold = read_escalation_threshold()
+    escalated = None
+    if threshold is not None:
+        items, escalated = escalate_items(get_ocr.server_rec, image, items, threshold, get_ocr.rec_batch_size)
+
+    output = summarize_items(items)
+    if escalated is not None:
+        output['escalated'] = escalated
+    if cache_key is not None:
+        write_cache_entry(cache, cache_key, output, items, prepared)
+    return output, prepared
+
+
+def paddleocr_version():
+    try:
+        from importlib.metadata import version
+
+        return version('paddleocr')
+    except Exception:
+        return 'unknown'
+
+
+def open_cache():
+    if os.environ.get('AUTOSHOW_PADDLE_OCR_CACHE', '1').strip().lower() in ('0', 'false', 'off', 'no'):
+        return None
+
+    root = os.environ.get('AUTOSHOW_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'autoshow-cli')
+    max_mb = parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_CACHE_MAX_MB', '256'), 256)
+    cache = {
+        "dir": os.path.join(root, 'paddle-ocr'),
+        "maxBytes": max_mb * 1024 * 1024,
+        "paddleocr": paddleocr_version(),
+        "writes": 0
+    }
+    prune_cache(cache)
+    return cache
+
+
+def build_cache_key(cache, image_bytes, plan):
+    det_model_name, rec_model_name = choose_model_names()
+    return {
+        "schema": CACHE_SCHEMA_VERSION,
+        "image": hashlib.sha256(image_bytes).hexdigest(),
+        "det": det_model_name,
+        "rec": rec_model_name,
+        "plan": plan,
+        "escalateBelow": read_escalation_threshold(),
+        "paddleocr": cache['paddleocr']
+    }
+
+
+def cache_entry_path(cache, cache_key):
+    digest = hashlib.sha256(json.dumps(cache_key, sort_keys=True).encode('utf-8')).hexdigest()
+    return os.path.join(cache['dir'], digest[:2], f'{digest}.json')
+
+
+def read_cache_entry(cache, cache_key):
+    path = cache_entry_path(cache, cache_key)
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            entry = json.load(handle)
+        os.utime(path, None)
+    except Exception:
+        return None
+
+    if not isinstance(entry.get('text'), str):
+        return None
+    return entry
+
+
+def write_cache_entry(cache, cache_key, output, items, prepared):
+    path = cache_entry_path(cache, cache_key)
+    lines = []
+    for box, text, score in items:
+        stripped = str(text).strip()
+        if stripped:
+            lines.append({"box": box_bounds(box) if box is not None else None, "text": stripped, "score": to_float(score)})
+
+    entry = {
+        "text": output['text'],
+        "confidence": output['confidence'],
+        "lines": lines,
+        "escalated": output.get('escalated'),
+        "prepared": prepared,
+        "key": cache_key,
+        "createdAt": time.time()
+    }
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(entry, handle)
+        os.replace(temp_path, path)
+    except Exception as error:
+        print(f'[paddle-ocr] cache write failed: {error}', file=sys.stderr)
         return
 
-    image_path = sys.argv[1]
-    text_det_limit_side_len = parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_MAX_SIDE', '3200'), 3200)
+    cache['writes'] += 1
+    if cache['writes'] % CACHE_PRUNE_EVERY_WRITES == 0:
+        prune_cache(cache)
+
+
+def prune_cache(cache):
+    entries = []
+    total_bytes = 0
+    for dir_path, _, file_names in os.walk(cache['dir']):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            try:
+                stats = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stats.st_mtime, stats.st_size, path))
+            total_bytes += stats.st_size
+
+    if total_bytes <= cache['maxBytes']:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        if total_bytes <= cache['maxBytes']:
+            break
+
+
+def cpu_thread_options():
+    cpu_threads = parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_CPU_THREADS'), None)
+    return {'cpu_threads': cpu_threads} if cpu_threads else {}
+
+
+def build_server_rec():
+    from paddleocr import TextRecognition
+
+    return TextRecognition(model_name=SERVER_REC_MODEL_NAME, **cpu_thread_options())
+
 
+def build_ocr(text_det_limit_side_len, rec_batch_size):
     from paddleocr import PaddleOCR
 
-    ocr = PaddleOCR(
-        text_detection_model_name=choose_model_name('PP-OCRv5_mobile_det', 'PP-OCRv5_server_det'),
-        text_recognition_model_name=choose_model_name('PP-OCRv5_mobile_rec', 'PP-OCRv5_server_rec'),
+    det_model_name, rec_model_name = choose_model_names()
+    return PaddleOCR(
+        text_detection_model_name=det_model_name,
+        text_recognition_model_name=rec_model_name,
         text_det_limit_side_len=text_det_limit_side_len,
         text_det_limit_type='max',
-        text_recognition_batch_size=1,
-        textline_orientation_batch_size=1,
+        text_recognition_batch_size=rec_batch_size,
+        textline_orientation_batch_size=rec_batch_size,
         use_doc_orientation_classify=False,
         use_doc_unwarping=False,
-        use_textline_orientation=False
+        use_textline_orientation=False,
+        **cpu_thread_options()
     )
 
-    result = ocr.predict(image_path)
 
+def page_items(page_result):
+    rec_texts = get_value(page_result, 'rec_texts', []) or []
+    rec_scores = get_value(page_result, 'rec_scores', []) or []
+    rec_boxes = get_value(page_result, 'rec_boxes', None)
+
+    if hasattr(rec_texts, 'tolist'):
+        rec_texts = rec_texts.tolist()
+    if hasattr(rec_scores, 'tolist'):
+        rec_scores = rec_scores.tolist()
+    if hasattr(rec_boxes, 'tolist'):
+        rec_boxes = rec_boxes.tolist()
+
+    if rec_boxes is not None and len(rec_boxes) == len(rec_texts):
+        return list(zip(rec_boxes, rec_texts, rec_scores)), True
+    return [(None, text, score) for text, score in zip(rec_texts, rec_scores)], False
+
+
+def summarize_items(items):
     texts = []
     confidences = []
 
-    for page_result in result:
-        rec_texts = get_value(page_result, 'rec_texts', []) or []
-        rec_scores = get_value(page_result, 'rec_scores', []) or []
-        rec_boxes = get_value(page_result, 'rec_boxes', None)
-
-        if hasattr(rec_texts, 'tolist'):
-            rec_texts = rec_texts.tolist()
-        if hasattr(rec_scores, 'tolist'):
-            rec_scores = rec_scores.tolist()
-        if hasattr(rec_boxes, 'tolist'):
-            rec_boxes = rec_boxes.tolist()
-
-        if rec_boxes is not None and len(rec_boxes) == len(rec_texts):
-            items = sorted(
-                zip(rec_boxes, rec_texts, rec_scores),
-                key=lambda x: box_sort_key(x[0])
-            )
-            for _, text, score in items:
-                stripped = str(text).strip()
-                if stripped:
-                    texts.append(stripped)
-                    confidences.append(to_float(score))
-        else:
-            for text, score in zip(rec_texts, rec_scores):
-                stripped = str(text).strip()
-                if stripped:
-                    texts.append(stripped)
-                    confidences.append(to_float(score))
+    for _, text, score in items:
+        stripped = str(text).strip()
+        if stripped:
+            texts.append(stripped)
+            confidences.append(to_float(score))
 
     combined_text = '\n'.join(texts)
     avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
 
-    output = {
+    return {
         "text": combined_text,
         "confidence": round(avg_confidence, 4)
     }
 
+
+def collect_items(result):
+    items = []
+    for page_result in result:
+        page, has_boxes = page_items(page_result)
+        items.extend(sorted(page, key=lambda x: box_sort_key(x[0])) if has_boxes else page)
+    return items
+
+
+def write_message(stream, message):
+    stream.write(json.dumps(message) + '\n')
+    stream.flush()
+
+
+def run_worker(text_det_limit_side_len, rec_batch_size):
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    get_ocr = lazy_ocr(text_det_limit_side_len, rec_batch_size)
+    cache = open_cache()
+
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except Exception as error:
+            write_message(protocol_out, {"id": None, "error": f"Invalid worker request: {error}"})
+            continue
+
+        request_id = request.get('id')
+        try:
+            max_side = parse_positive_int(request.get('maxSide'), text_det_limit_side_len)
+            output, prepared = recognize(get_ocr, request['image'], max_side, cache)
+            output['prepared'] = prepared
+        except Exception as error:
+            output = {"error": f"{type(error).__name__}: {error}"}
+
+        output['id'] = request_id
+        sys.stderr.flush()
+        write_message(protocol_out, output)
+
+
+def expand_batch_inputs(inputs):
+    image_paths = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            names = sorted(
+                name for name in os.listdir(input_path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            image_paths.extend(os.path.join(input_path, name) for name in names)
+        else:
+            image_paths.append(input_path)
+    return image_paths
+
+
+def run_batch(image_paths, text_det_limit_side_len, rec_batch_size):
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+
+    get_ocr = lazy_ocr(text_det_limit_side_len, rec_batch_size)
+    cache = open_cache()
+
+    for index, image_path in enumerate(image_paths):
+        try:
+            output, _ = recognize(get_ocr, image_path, text_det_limit_side_len, cache)
+        except Exception as error:
+            output = {"error": f"{type(error).__name__}: {error}"}
+
+        output['image'] = image_path
+        output['index'] = index
+        sys.stderr.flush()
+        write_message(protocol_out, output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PaddleOCR inference script")
+    parser.add_argument("inputs", nargs="*", help="Image paths or directories of rasterized pages")
+    parser.add_argument("--worker", action="store_true", help="Serve JSON-line page requests on stdin")
+    parser.add_argument("--batch", action="store_true", help="Stream one NDJSON result per input page")
+    parser.add_argument(
+        "--rec-batch-size",
+        type=int,
+        default=parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_REC_BATCH_SIZE', '6'), 6),
+        help="Text line crops recognized per inference batch"
+    )
+    args = parser.parse_args()
+
+    text_det_limit_side_len = parse_positive_int(os.environ.get('AUTOSHOW_PADDLE_OCR_MAX_SIDE', '3200'), 3200)
+    rec_batch_size = parse_positive_int(args.rec_batch_size, 6)
+
+    if args.worker:
+        run_worker(text_det_limit_side_len, rec_batch_size)
+        return
+
+    if not args.inputs:
+        print(json.dumps({"text": "", "confidence": 0.0}))
+        return
+
+    if args.batch or len(args.inputs) > 1 or os.path.isdir(args.inputs[0]):
+        run_batch(expand_batch_inputs(args.inputs), text_det_limit_side_len, rec_batch_size)
+        return
+
+    get_ocr = lazy_ocr(text_det_limit_side_len, rec_batch_size)
+    output, _ = recognize(get_ocr, args.inputs[0], text_det_limit_side_len, open_cache())
+
     sys.stderr.flush()
     print(json.dumps(output))
 
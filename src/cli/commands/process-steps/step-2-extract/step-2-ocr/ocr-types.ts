@@ -143,7 +143,7 @@ export type ZipXmlResult = {
 export type ZipXmlFormat = 'docx' | 'pptx' | 'xlsx' | 'odf'
 
 export type OcrFn = (imagePath: string) => Promise<{ text: string, confidence?: number }>
-export type OcrFnProvider = OcrFn | { getOcrFn: () => Promise<OcrFn> }
+export type OcrFnProvider = OcrFn | { getOcrFn: () => Promise<OcrFn>, dispose?: () => Promise<void>, concurrency?: number }
 
 export type HostedExtractOcrEngine = 'mistral-ocr' | 'glm-ocr' | 'kimi-ocr' | 'openai-ocr' | 'anthropic-ocr' | 'gemini-ocr' | 'deepinfra-ocr' | 'aws-textract' | 'gcloud-docai' | 'unstructured-ocr'
 export type LocalExtractOcrEngine = 'tesseract' | 'ocrmypdf' | 'paddle-ocr'
@@ -174,7 +174,8 @@ export const processPages = async (
   try {
     const cores = Math.max(1, cpus().length)
     const renderConcurrency = options.renderConcurrency ?? Math.min(cores, 4)
-    const ocrConcurrency = options.ocrConcurrency ?? Math.min(cores, 2)
+    const providerConcurrency = typeof ocrFnProvider === 'function' ? undefined : ocrFnProvider?.concurrency
+    const ocrConcurrency = options.ocrConcurrency ?? providerConcurrency ?? Math.min(cores, 2)
     const renderPool = createPool(renderConcurrency)
     const ocrPool = createPool(ocrConcurrency)
 
@@ -247,6 +248,9 @@ export const processPages = async (
     }
     return finalPages
   } finally {
+    if (ocrFnProvider && typeof ocrFnProvider !== 'function') {
+      await ocrFnProvider.dispose?.()
+    }
     await rm(tempDir, { recursive: true, force: true })
   }
 }
@@ -7,7 +7,7 @@ import { CLIUsageError } from '~/utils/error-handler'
 import * as l from '~/utils/logger'
 import { assertNever } from '~/utils/validate/assert-never'
 import { runOcrmypdf } from './ocr-local/ocrmypdf/run-ocrmypdf'
-import { buildPaddleOcrPageFn } from './ocr-local/paddle-ocr/run-paddle-ocr'
+import { buildPaddleOcrPageProvider } from './ocr-local/paddle-ocr/run-paddle-ocr'
 import { processPages } from './ocr-utils/page-processor'
 
 export const convertEpubToPdfForOcr = async (
@@ -126,9 +126,7 @@ export const runLocalPdfOcr = async (
       return await runOcrmypdfWithAutoPdf(filePath, step1Metadata, opts)
     }
     case 'paddle-ocr': {
-      const pages = await processPages(filePath, step1Metadata.pageCount, opts, {
-        getOcrFn: async () => await buildPaddleOcrPageFn(opts)
-      })
+      const pages = await processPages(filePath, step1Metadata.pageCount, opts, buildPaddleOcrPageProvider(opts))
       return { pages, extractionMethod: 'mutool+paddle-ocr' }
     }
     default:
@@ -152,9 +150,7 @@ export const runPdfOcr = async (
       return { pages: r.pages, extractionMethod: 'pdf+ocrmypdf' }
     }
     case 'paddle-ocr': {
-      const pages = await processPages(pdfPath, tempMeta.pageCount, opts, {
-        getOcrFn: async () => await buildPaddleOcrPageFn(opts)
-      })
+      const pages = await processPages(pdfPath, tempMeta.pageCount, opts, buildPaddleOcrPageProvider(opts))
       return { pages, extractionMethod: 'pdf+paddle-ocr' }
     }
     default:
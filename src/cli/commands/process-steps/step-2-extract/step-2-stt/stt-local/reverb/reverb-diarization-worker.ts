@@ -0,0 +1,143 @@
+import { join } from 'node:path'
+import * as v from 'valibot'
+import * as l from '~/utils/logger'
+import { reverbUvEnvDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
+import { appendOutputTail, createSharedJsonLinesWorker, startJsonLinesWorker, type JsonLinesWorker } from '~/utils/json-lines-worker'
+import type { ReverbDiarizationModel } from './run-reverb-diarization'
+
+const SCRIPT_PATH = join(import.meta.dir, 'scripts', 'reverb-diarization.py')
+
+export type ReverbDiarizationJob = {
+  audioPath: string
+  ctmPath: string
+  outputPath: string
+  format: 'json' | 'compact' | 'ndjson'
+}
+
+export type ReverbDiarizationWorkerResult =
+  | { ok: true, segments: number, speakers: number, cached: boolean }
+  | { ok: false, stderr: string, exitCode: number }
+
+export type ReverbDiarizationWorker = JsonLinesWorker<ReverbDiarizationJob, ReverbDiarizationWorkerResult>
+
+const ReverbDiarizationBatchResponseSchema = v.object({
+  id: v.nullable(v.number()),
+  rttmPath: v.optional(v.string(), undefined),
+  outputPath: v.optional(v.string(), undefined),
+  segments: v.optional(v.number(), undefined),
+  speakers: v.optional(v.number(), undefined),
+  cached: v.optional(v.boolean(), undefined),
+  error: v.optional(v.string(), undefined)
+})
+
+export type ReverbDiarizationBatchResponse = v.InferOutput<typeof ReverbDiarizationBatchResponseSchema>
+
+export const parseReverbDiarizationBatchResponse = (line: string): ReverbDiarizationBatchResponse | undefined => {
+  const trimmed = line.trim()
+  if (!trimmed.startsWith('{') || !trimmed.endsWith('}')) {
+    return undefined
+  }
+
+  let parsed: unknown
+  try {
+    parsed = JSON.parse(trimmed)
+  } catch {
+    return undefined
+  }
+
+  const result = v.safeParse(ReverbDiarizationBatchResponseSchema, parsed)
+  return result.success ? result.output : undefined
+}
+
+const readPositiveSeconds = (name: string): number | undefined => {
+  const value = Number.parseFloat(process.env[name] ?? '')
+  return Number.isFinite(value) && value > 0 ? value : undefined
+}
+
+export const reverbDiarizationWindowArgs = (): string[] => {
+  const windowSeconds = readPositiveSeconds('AUTOSHOW_REVERB_DIARIZATION_WINDOW_SECONDS')
+  if (windowSeconds === undefined) {
+    return []
+  }
+
+  const overlapSeconds = readPositiveSeconds('AUTOSHOW_REVERB_DIARIZATION_WINDOW_OVERLAP_SECONDS')
+  return [
+    '--window-seconds', String(windowSeconds),
+    ...(overlapSeconds !== undefined ? ['--window-overlap-seconds', String(overlapSeconds)] : [])
+  ]
+}
+
+const readPositiveInteger = (name: string): number | undefined => {
+  const value = Number.parseInt(process.env[name] ?? '', 10)
+  return Number.isFinite(value) && value > 0 ? value : undefined
+}
+
+export const reverbDiarizationProfileArgs = (): string[] => {
+  const profile = (process.env['AUTOSHOW_REVERB_DIARIZATION_PROFILE'] ?? '').trim().toLowerCase()
+  const quantize = (process.env['AUTOSHOW_REVERB_DIARIZATION_QUANTIZE'] ?? '').trim().toLowerCase()
+  const cpuThreads = readPositiveInteger('AUTOSHOW_REVERB_DIARIZATION_CPU_THREADS')
+  const interopThreads = readPositiveInteger('AUTOSHOW_REVERB_DIARIZATION_INTEROP_THREADS')
+  const embeddingBatchSize = readPositiveInteger('AUTOSHOW_REVERB_DIARIZATION_EMBEDDING_BATCH_SIZE')
+  return [
+    ...(profile === 'cpu' ? ['--profile', 'cpu'] : []),
+    ...(cpuThreads !== undefined ? ['--cpu-threads', String(cpuThreads)] : []),
+    ...(interopThreads !== undefined ? ['--interop-threads', String(interopThreads)] : []),
+    ...(['1', 'true', 'on', 'yes'].includes(quantize) ? ['--quantize'] : []),
+    ...(['0', 'false', 'off', 'no'].includes(quantize) ? ['--no-quantize'] : []),
+    ...(embeddingBatchSize !== undefined ? ['--embedding-batch-size', String(embeddingBatchSize)] : [])
+  ]
+}
+
+export const reverbDiarizationArgs = (): string[] => [
+  ...reverbDiarizationWindowArgs(),
+  ...reverbDiarizationProfileArgs()
+]
+
+export const isReverbDiarizationWorkerEnabled = (): boolean =>
+  !['0', 'false', 'off', 'no'].includes((process.env['AUTOSHOW_REVERB_DIARIZATION_WORKER'] ?? '').trim().toLowerCase())
+
+export const startReverbDiarizationWorker = (model: ReverbDiarizationModel): ReverbDiarizationWorker =>
+  startJsonLinesWorker<ReverbDiarizationJob, ReverbDiarizationBatchResponse, ReverbDiarizationWorkerResult>({
+    name: 'Reverb diarization worker',
+    command: [
+      `${reverbUvEnvDir}/bin/python`, SCRIPT_PATH, '--batch',
+      '--hf-token', model.hfToken ?? '',
+      '--model', model.modelName,
+      ...reverbDiarizationArgs()
+    ],
+    unref: true,
+    parseResponse: parseReverbDiarizationBatchResponse,
+    toResult: (response, output) => {
+      if (response.error !== undefined) {
+        return { ok: false, stderr: appendOutputTail(output.stdout + output.stderr, `[DIARIZATION ERROR] ${response.error}\n`), exitCode: 1 }
+      }
+
+      return { ok: true, segments: response.segments ?? 0, speakers: response.speakers ?? 0, cached: response.cached ?? false }
+    },
+    toFailure: (message, exitCode, output) => ({
+      ok: false,
+      stderr: appendOutputTail(output.stdout + output.stderr, `${message}\n`),
+      exitCode
+    }),
+    onStderrLine: (line) => {
+      if (!line.startsWith('[DIARIZATION]')) {
+        return false
+      }
+      l.debug(line)
+      return true
+    }
+  })
+
+const sharedWorker = createSharedJsonLinesWorker<ReverbDiarizationJob, ReverbDiarizationWorkerResult>('AUTOSHOW_REVERB_DIARIZATION_WORKER_IDLE_MS')
+
+export const runReverbDiarizationJob = async (
+  model: ReverbDiarizationModel,
+  job: ReverbDiarizationJob
+): Promise<ReverbDiarizationWorkerResult> => {
+  const key = [model.modelName, model.hfToken ?? '', ...reverbDiarizationArgs()].join('\n')
+  return await sharedWorker.run(key, () => startReverbDiarizationWorker(model), job)
+}
+
+export const closeReverbDiarizationWorker = async (): Promise<void> => {
+  await sharedWorker.close()
+}
@@ -1,10 +1,14 @@
 import { readdir } from 'node:fs/promises'
+import * as v from 'valibot'
 import * as l from '~/utils/logger'
+import { ReverbCompactSegmentSchema } from '~/types'
 import { exec } from '~/utils/cli-utils'
+import { readStreamLines } from '~/utils/json-lines-worker'
 import { readEnv } from '~/utils/validate/env-utils'
 import { dirname, join } from 'path'
 import { fileURLToPath } from 'url'
 import { requireUvCommand, reverbDiarizationDir, reverbUvEnvDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
+import { isReverbDiarizationWorkerEnabled, reverbDiarizationArgs, runReverbDiarizationJob } from './reverb-diarization-worker'
 
 const REVERB_SCRIPTS_DIR = join(
   dirname(fileURLToPath(import.meta.url)),
@@ -58,74 +62,135 @@ export const resolveDiarizationModel = async (): Promise<ReverbDiarizationModel
   }
 }
 
-export const runDiarization = async (
-  audioPath: string,
-  diarizationModel: ReverbDiarizationModel,
-  outputDir: string
-): Promise<string | null> => {
-  const uvEnvDir = reverbUvEnvDir
-  const scriptPath = join(REVERB_SCRIPTS_DIR, 'reverb-diarization.py')
-  const rttmPath = `${outputDir}/diarization.rttm`
+const logDiarizationFailure = (stderr: string, exitCode: number): void => {
+  const stderrLines = stderr.split('\n').filter((line: string) => line.trim())
+  stderrLines.forEach((line: string) => {
+    if (line.includes('[DIARIZATION ERROR]') || line.toLowerCase().includes('error') || line.toLowerCase().includes('traceback')) {
+      l.error(line)
+    }
+  })
+  l.error(`Diarization script exited with code ${exitCode}`)
+}
+
+type DiarizedWord = {
+  start: number
+  end: number
+  word: string
+  speaker: string
+}
+
+type DiarizedSegment = {
+  start: number
+  end: number
+  text: string
+  speaker: string
+  words: DiarizedWord[]
+}
+
+export type DiarizedTranscript = {
+  segments: DiarizedSegment[]
+  text: string
+  speakers: string[]
+}
+
+export const parseCompactDiarizedSegment = (line: string): DiarizedSegment | undefined => {
+  const trimmed = line.trim()
+  if (!trimmed.startsWith('{') || !trimmed.endsWith('}')) {
+    return undefined
+  }
+
+  let parsed: unknown
   try {
-    const uvCommand = await requireUvCommand()
-    const result = await exec(uvCommand, [
-      'run', '-p', `${uvEnvDir}/bin/python`,
-      scriptPath,
-      audioPath,
-      diarizationModel.hfToken ?? '',
-      diarizationModel.modelName
-    ])
-    if (result.stderr && result.exitCode !== 0) {
-      const stderrLines = result.stderr.split('\n').filter((line: string) => line.trim())
-      stderrLines.forEach((line: string) => {
-        if (line.includes('[DIARIZATION ERROR]') || line.toLowerCase().includes('error') || line.toLowerCase().includes('traceback')) {
-          l.error(line)
-        }
-      })
+    parsed = JSON.parse(trimmed)
+  } catch {
+    return undefined
+  }
+
+  const result = v.safeParse(ReverbCompactSegmentSchema, parsed)
+  if (!result.success) {
+    return undefined
+  }
+
+  const { start, end, speaker, starts, ends, words } = result.output
+  if (starts.length !== words.length || ends.length !== words.length) {
+    return undefined
+  }
+
+  return {
+    start,
+    end,
+    text: words.join(' '),
+    speaker,
+    words: words.map((word, index) => ({ start: starts[index]!, end: ends[index]!, word, speaker }))
+  }
+}
+
+export const collectDiarizedTranscript = async (lines: AsyncIterable<string>): Promise<DiarizedTranscript> => {
+  const segments: DiarizedSegment[] = []
+  const speakers = new Set<string>()
+  for await (const line of lines) {
+    if (line.trim().length === 0) {
+      continue
     }
-    if (result.exitCode !== 0) {
-      l.error(`Diarization script exited with code ${result.exitCode}`)
-      return null
+    const segment = parseCompactDiarizedSegment(line)
+    if (!segment) {
+      throw new Error(`Invalid diarized segment line: ${line.slice(0, 200)}`)
     }
-    if (!result.stdout || result.stdout.trim().length === 0) {
-      l.error(`Diarization produced no RTTM output`)
-      return null
+    segments.push(segment)
+    if (segment.speaker !== 'UNKNOWN') {
+      speakers.add(segment.speaker)
     }
-    await Bun.write(rttmPath, result.stdout)
-    return rttmPath
-  } catch (error) {
-    l.error(`Failed to run diarization`, error)
-    return null
+  }
+
+  return {
+    segments,
+    text: segments.map((segment) => segment.text).join(' '),
+    speakers: [...speakers]
   }
 }
 
-export const mergeASRWithDiarization = async (ctmPath: string, rttmPath: string, outputPath: string): Promise<unknown> => {
+const readFileLines = (path: string): AsyncGenerator<string> => readStreamLines(Bun.file(path).stream())
+
+export const runDiarizationWithSpeakers = async (
+  audioPath: string,
+  diarizationModel: ReverbDiarizationModel,
+  ctmPath: string,
+  outputPath: string
+): Promise<DiarizedTranscript | null> => {
   const uvEnvDir = reverbUvEnvDir
-  const scriptPath = join(REVERB_SCRIPTS_DIR, 'assign-words-to-speakers.py')
+  const scriptPath = join(REVERB_SCRIPTS_DIR, 'reverb-diarization.py')
   try {
+    if (isReverbDiarizationWorkerEnabled()) {
+      const result = await runReverbDiarizationJob(diarizationModel, { audioPath, ctmPath, outputPath, format: 'ndjson' })
+      if (!result.ok) {
+        logDiarizationFailure(result.stderr, result.exitCode)
+        return null
+      }
+      if (result.cached) {
+        l.debug(`Reused cached Reverb diarization for ${audioPath}`)
+      }
+      return await collectDiarizedTranscript(readFileLines(outputPath))
+    }
+
     const uvCommand = await requireUvCommand()
     const result = await exec(uvCommand, [
       'run', '-p', `${uvEnvDir}/bin/python`,
       scriptPath,
-      rttmPath,
-      ctmPath,
-      outputPath
+      audioPath,
+      diarizationModel.hfToken ?? '',
+      diarizationModel.modelName,
+      '--ctm', ctmPath,
+      '--output', outputPath,
+      '--format', 'ndjson',
+      ...reverbDiarizationArgs()
     ])
     if (result.exitCode !== 0) {
-      const stderrLines = result.stderr.split('\n').filter((line: string) => line.trim())
-      stderrLines.forEach((line: string) => {
-        if (line.toLowerCase().includes('error')) {
-          l.error(line)
-        }
-      })
-      l.error(`Failed to merge ASR with diarization (exit code ${result.exitCode})`)
+      logDiarizationFailure(result.stderr, result.exitCode)
       return null
     }
-    const jsonContent = await Bun.file(outputPath).text()
-    const data = JSON.parse(jsonContent)
-    return data
+    return await collectDiarizedTranscript(readFileLines(outputPath))
   } catch (error) {
-    l.error(`Failed to merge ASR with diarization`, error)
+    l.error(`Failed to run diarization`, error)
     return null
   }
 }
@@ -11,7 +11,7 @@ import {
 import { countTokens, formatTranscriptText } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-utils/stt-utils'
 import { parseReverbWithSpeakers, parseReverbTextOutput } from './parse-reverb-output'
 import { exec } from '~/utils/cli-utils'
-import { resolveDiarizationModel, runDiarization, mergeASRWithDiarization, findCTMFile } from './run-reverb-diarization'
+import { resolveDiarizationModel, runDiarizationWithSpeakers, findCTMFile } from './run-reverb-diarization'
 import { requireUvCommand, reverbUvEnvDir, reverbModelDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
 import { pollUntil } from '~/utils/retries'
 import { prepareLocalSttInput } from '../local-audio-normalize'
@@ -232,67 +232,45 @@ export const runReverbTranscribe = async (
     if (diarizationModel) {
       ctmPath = await findCTMFile(resultDir)
       if (ctmPath) {
-        const rttmPath = await runDiarization(preparedInput.audioPath, diarizationModel, resultDir)
-        if (rttmPath) {
-          const jsonOutputPath = `${outputDir}/transcription${segmentSuffix}.json`
-          const diarizedData = await mergeASRWithDiarization(ctmPath, rttmPath, jsonOutputPath)
-          if (diarizedData && typeof diarizedData === 'object' && diarizedData !== null) {
-            logSttDiarizationConfig(l, {
-              provider: 'reverb',
-              model: version,
-              enabled: true,
-              detail: 'completed'
-            }, 'success')
-            const rawSegments = Array.isArray((diarizedData as Record<string, unknown>)['segments'])
-              ? (diarizedData as Record<string, unknown>)['segments'] as Array<Record<string, unknown>>
-              : []
-            const evidenceWords = rawSegments.flatMap((segment) => {
-              const segmentSpeaker = typeof segment['speaker'] === 'string' && segment['speaker'] !== 'UNKNOWN'
-                ? segment['speaker']
-                : undefined
-              const segmentWords = Array.isArray(segment['words']) ? segment['words'] : []
-              return segmentWords.flatMap((word) => {
-                if (typeof word !== 'object' || word === null) {
-                  return []
-                }
+        const segmentsOutputPath = `${outputDir}/transcription${segmentSuffix}.ndjson`
+        const diarizedData = await runDiarizationWithSpeakers(preparedInput.audioPath, diarizationModel, ctmPath, segmentsOutputPath)
+        await rm(segmentsOutputPath, { force: true })
+        if (diarizedData) {
+          logSttDiarizationConfig(l, {
+            provider: 'reverb',
+            model: version,
+            enabled: true,
+            detail: 'completed'
+          }, 'success')
+          const evidenceWords = diarizedData.segments.flatMap((segment) => {
+            const segmentSpeaker = segment.speaker !== 'UNKNOWN' ? segment.speaker : undefined
+            return segment.words.flatMap((word) => {
+              const text = word.word.trim()
+              if (text.length === 0) {
+                return []
+              }
 
-                const token = word as Record<string, unknown>
-                if (typeof token['start'] !== 'number' || typeof token['end'] !== 'number' || typeof token['word'] !== 'string') {
-                  return []
-                }
-
-                const text = token['word'].trim()
-                if (text.length === 0) {
-                  return []
-                }
-
-                return [{
-                  startSeconds: token['start'],
-                  endSeconds: token['end'],
-                  text,
-                  normalized: text.toLowerCase(),
-                  ...(segmentSpeaker ? { speaker: segmentSpeaker } : {}),
-                  timingSource: 'native' as const
-                }]
-              })
+              return [{
+                startSeconds: word.start,
+                endSeconds: word.end,
+                text,
+                normalized: text.toLowerCase(),
+                ...(segmentSpeaker ? { speaker: segmentSpeaker } : {}),
+                timingSource: 'native' as const
+              }]
             })
-            await Bun.$`rm -f ${jsonOutputPath}`.quiet()
-            logSttCleanupArtifacts(l, 'Reverb Cleanup', [{ artifact: 'json', path: jsonOutputPath }], 'success')
-            transcription = parseReverbWithSpeakers(diarizedData, segmentOffset)
-            evidence = {
-              ...(evidenceWords.length > 0 ? { words: evidenceWords } : {}),
-              capabilities: {
-                hasNativeWordTiming: evidenceWords.length > 0,
-                hasConfidence: false,
-                hasSpeakerLabels: transcription.segments.some((segment) => segment.speaker !== undefined)
-              },
-              timingQuality: evidenceWords.length > 0 ? 'native_word' : 'segment_interpolated',
-              rawResponse: diarizedData
-            }
-          } else {
-            const textContent = await findAndReadOutputFile(resultDir)
-            if (!textContent) throw new Error('Reverb transcription produced no readable output')
-            transcription = parseReverbTextOutput(textContent, segmentOffset)
+          })
+          logSttCleanupArtifacts(l, 'Reverb Cleanup', [{ artifact: 'ndjson', path: segmentsOutputPath }], 'success')
+          transcription = parseReverbWithSpeakers(diarizedData, segmentOffset)
+          evidence = {
+            ...(evidenceWords.length > 0 ? { words: evidenceWords } : {}),
+            capabilities: {
+              hasNativeWordTiming: evidenceWords.length > 0,
+              hasConfidence: false,
+              hasSpeakerLabels: transcription.segments.some((segment) => segment.speaker !== undefined)
+            },
+            timingQuality: evidenceWords.length > 0 ? 'native_word' : 'segment_interpolated',
+            rawResponse: diarizedData
           }
         } else {
           const textContent = await findAndReadOutputFile(resultDir)
@@ -1,126 +1,353 @@
 #!/usr/bin/env python3
+import os
 import sys
 import json
+import argparse
+from array import array
+
+UNKNOWN_SPEAKER = 'UNKNOWN'
+OUTPUT_FORMATS = ('json', 'compact', 'ndjson')
+COMPACT_SEPARATORS = (',', ':')
+STATE_VERSION = 1
+
+# Segments and words are held column-wise: float64 start/end arrays plus int32
+# codes into string tables, so a long transcript costs a few dozen bytes per
+# word instead of one dict per word. Dicts are only built when writing output.
+
+def build_segments(rows):
+    starts = array('d')
+    ends = array('d')
+    codes = array('i')
+    speakers = []
+    speaker_codes = {}
+    for start, duration, speaker in rows:
+        starts.append(start)
+        ends.append(start + duration)
+        code = speaker_codes.get(speaker)
+        if code is None:
+            code = speaker_codes[speaker] = len(speakers)
+            speakers.append(speaker)
+        codes.append(code)
+
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    return {
+        'starts': array('d', (starts[index] for index in order)),
+        'ends': array('d', (ends[index] for index in order)),
+        'codes': array('i', (codes[index] for index in order)),
+        'speakers': speakers,
+    }
+
+def iter_rttm_rows(f):
+    for line in f:
+        parts = line.split()
+        if len(parts) >= 8 and parts[0] == "SPEAKER":
+            yield float(parts[3]), float(parts[4]), parts[7]
 
 def parse_rttm(rttm_file):
-    segments = []
     with open(rttm_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 8 and parts[0] == "SPEAKER":
-                start = float(parts[3])
-                duration = float(parts[4])
-                end = start + duration
-                speaker = parts[7]
-                segments.append({
-                    'start': start,
-                    'end': end,
-                    'speaker': speaker
-                })
-    return sorted(segments, key=lambda x: x['start'])
+        return build_segments(iter_rttm_rows(f))
+
+def build_words(rows):
+    starts = array('d')
+    ends = array('d')
+    indexes = array('i')
+    table = []
+    table_indexes = {}
+    for start, end, word in rows:
+        starts.append(start)
+        ends.append(end)
+        index = table_indexes.get(word)
+        if index is None:
+            index = table_indexes[word] = len(table)
+            table.append(word)
+        indexes.append(index)
+    return {'starts': starts, 'ends': ends, 'indexes': indexes, 'table': table}
+
+def iter_ctm_rows(f):
+    for line in f:
+        parts = line.split()
+        if len(parts) >= 5:
+            start = float(parts[2])
+            duration = float(parts[3])
+            word = parts[4]
+            if word != "'":
+                yield start, start + duration, word
 
 def parse_ctm(ctm_file):
-    words = []
     with open(ctm_file, 'r') as f:
-        for line in f:
-            parts = line.strip().split()
-            if len(parts) >= 5:
-                start = float(parts[2])
-                duration = float(parts[3])
-                word = parts[4]
-                if word != "'":
-                    words.append({
-                        'start': start,
-                        'end': start + duration,
-                        'word': word
-                    })
-    return words
+        return build_words(iter_ctm_rows(f))
 
 def assign_speakers(words, segments):
-    for word in words:
-        word_mid = (word['start'] + word['end']) / 2
+    # Sweep words in midpoint order over start-sorted segments, keeping only the
+    # segments that can still contain a later midpoint. Ties keep the earliest
+    # segment, as the former full scan did.
+    word_starts = words['starts']
+    word_ends = words['ends']
+    segment_starts = segments['starts']
+    segment_ends = segments['ends']
+    segment_codes = segments['codes']
+    mids = array('d', ((start + end) / 2 for start, end in zip(word_starts, word_ends)))
+    speaker_codes = array('i', [-1]) * len(mids)
+    active = []
+    next_segment = 0
+    in_order = all(mids[index - 1] <= mids[index] for index in range(1, len(mids)))
+
+    for index in range(len(mids)) if in_order else sorted(range(len(mids)), key=mids.__getitem__):
+        word_mid = mids[index]
+        while next_segment < len(segment_starts) and segment_starts[next_segment] <= word_mid:
+            active.append(next_segment)
+            next_segment += 1
+        active = [candidate for candidate in active if segment_ends[candidate] >= word_mid]
+
         best_overlap = 0
-        best_speaker = None
-        
-        for segment in segments:
-            if segment['start'] <= word_mid <= segment['end']:
-                overlap = min(word['end'], segment['end']) - max(word['start'], segment['start'])
-                if overlap > best_overlap:
-                    best_overlap = overlap
-                    best_speaker = segment['speaker']
-        
-        word['speaker'] = best_speaker if best_speaker else 'UNKNOWN'
-    
-    return words
-
-def create_segments(words, max_words=100):
-    segments = []
-    current_segment = []
-    current_speaker = None
-    
-    for word in words:
-        if not current_segment:
-            current_segment = [word]
-            current_speaker = word['speaker']
-        elif word['speaker'] != current_speaker or len(current_segment) >= max_words:
-            segments.append({
-                'start': current_segment[0]['start'],
-                'end': current_segment[-1]['end'],
-                'text': ' '.join([w['word'] for w in current_segment]),
-                'speaker': current_speaker,
-                'words': current_segment
-            })
-            current_segment = [word]
-            current_speaker = word['speaker']
+        for candidate in active:
+            overlap = min(word_ends[index], segment_ends[candidate]) - max(word_starts[index], segment_starts[candidate])
+            if overlap > best_overlap:
+                best_overlap = overlap
+                speaker_codes[index] = segment_codes[candidate]
+
+    return speaker_codes
+
+def create_segments(speaker_codes, max_words=100):
+    bounds = array('i')
+    first = 0
+    for index in range(1, len(speaker_codes) + 1):
+        if index == len(speaker_codes) or speaker_codes[index] != speaker_codes[first] or index - first >= max_words:
+            bounds.append(first)
+            first = index
+    if len(speaker_codes) > 0:
+        bounds.append(len(speaker_codes))
+    return bounds
+
+def speaker_name(speakers, code):
+    return speakers[code] if code >= 0 else UNKNOWN_SPEAKER
+
+def build_segment(words, speaker_codes, speakers, first, last):
+    table = words['table']
+    indexes = words['indexes']
+    speaker = speaker_name(speakers, speaker_codes[first])
+    segment_words = [
+        {
+            'start': words['starts'][index],
+            'end': words['ends'][index],
+            'word': table[indexes[index]],
+            'speaker': speaker,
+        }
+        for index in range(first, last)
+    ]
+    return {
+        'start': words['starts'][first],
+        'end': words['ends'][last - 1],
+        'text': ' '.join([word['word'] for word in segment_words]),
+        'speaker': speaker,
+        'words': segment_words,
+    }
+
+def iter_segments(words, speaker_codes, speakers, bounds):
+    for first, last in zip(bounds, bounds[1:]):
+        yield build_segment(words, speaker_codes, speakers, first, last)
+
+def indent_json(value, prefix):
+    return json.dumps(value, indent=2).replace('\n', '\n' + prefix)
+
+def build_compact_segment(words, speaker_codes, speakers, first, last):
+    table = words['table']
+    indexes = words['indexes']
+    return {
+        'start': words['starts'][first],
+        'end': words['ends'][last - 1],
+        'speaker': speaker_name(speakers, speaker_codes[first]),
+        'starts': words['starts'][first:last].tolist(),
+        'ends': words['ends'][first:last].tolist(),
+        'words': [table[indexes[index]] for index in range(first, last)],
+    }
+
+def iter_compact_segments(words, speaker_codes, speakers, bounds):
+    for first, last in zip(bounds, bounds[1:]):
+        yield build_compact_segment(words, speaker_codes, speakers, first, last)
+
+def compact_json(value):
+    return json.dumps(value, separators=COMPACT_SEPARATORS)
+
+def write_json(f, words, speaker_codes, speakers, bounds, segment_speakers):
+    f.write('{\n  "segments": [')
+    for index, segment in enumerate(iter_segments(words, speaker_codes, speakers, bounds)):
+        f.write(',\n    ' if index else '\n    ')
+        f.write(indent_json(segment, '    '))
+    f.write('\n  ],\n' if len(bounds) > 1 else '],\n')
+    text = ' '.join(words['table'][index] for index in words['indexes'])
+    f.write(f'  "text": {json.dumps(text)},\n')
+    f.write(f'  "speakers": {indent_json(list(segment_speakers), "  ")}\n}}')
+
+def write_compact(f, words, speaker_codes, speakers, bounds, segment_speakers):
+    f.write('{"segments":[')
+    for index, segment in enumerate(iter_compact_segments(words, speaker_codes, speakers, bounds)):
+        if index:
+            f.write(',')
+        f.write(compact_json(segment))
+    f.write(f'],"speakers":{compact_json(sorted(segment_speakers))}}}')
+
+def write_ndjson(f, words, speaker_codes, speakers, bounds):
+    for segment in iter_compact_segments(words, speaker_codes, speakers, bounds):
+        f.write(compact_json(segment))
+        f.write('\n')
+        f.flush()
+
+def write_output(output_file, words, speaker_codes, speakers, bounds, output_format='json'):
+    segment_speakers = set(speaker_name(speakers, speaker_codes[first]) for first in bounds[:-1])
+    segment_speakers.discard(UNKNOWN_SPEAKER)
+    with open(output_file, 'w') as f:
+        if output_format == 'compact':
+            write_compact(f, words, speaker_codes, speakers, bounds, segment_speakers)
+        elif output_format == 'ndjson':
+            write_ndjson(f, words, speaker_codes, speakers, bounds)
         else:
-            current_segment.append(word)
-    
-    if current_segment:
-        segments.append({
-            'start': current_segment[0]['start'],
-            'end': current_segment[-1]['end'],
-            'text': ' '.join([w['word'] for w in current_segment]),
-            'speaker': current_speaker,
-            'words': current_segment
-        })
-    
-    return segments
+            write_json(f, words, speaker_codes, speakers, bounds, segment_speakers)
+    return len(bounds) - 1 if len(bounds) > 1 else 0, len(segment_speakers)
+
+# Incremental mode keeps a state file next to a growing RTTM/CTM pair: the byte
+# offsets already read, the RTTM rows that can still cover upcoming words, and
+# the words of the open segments. Each run reads only the complete lines
+# appended since then. A segment stays open while it is the last one, since
+# more words of the same speaker can still join it, or while it holds a word
+# past the end of the diarization seen so far. Every run re-emits all open
+# segments, so consumers replace their segments from the first emitted index
+# onward.
+
+def empty_state():
+    return {
+        'version': STATE_VERSION,
+        'rttmOffset': 0,
+        'ctmOffset': 0,
+        'segmentCount': 0,
+        'assignedUntil': 0.0,
+        'coveredUntil': 0.0,
+        'rows': [],
+        'open': [],
+    }
+
+def load_state(state_file):
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return empty_state()
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f"Unsupported state file version in {state_file}")
+    return state
+
+def save_state(state_file, state):
+    temp_file = f"{state_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
+        f.write(compact_json(state))
+    os.replace(temp_file, state_file)
+
+def read_appended_lines(path, offset):
+    # Stop at the last newline so a line that is still being written is read
+    # on the next run instead of half now.
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() < offset:
+            raise ValueError(f"{path} is shorter than its state offset; start a new state file")
+        f.seek(offset)
+        data = f.read()
+    complete = data.rfind(b'\n') + 1
+    return data[:complete].decode('utf-8').splitlines(), offset + complete
+
+def word_mid(words, index):
+    return (words['starts'][index] + words['ends'][index]) / 2
+
+def assign_incremental(rttm_file, ctm_file, output_file, state_file, max_words=100):
+    state = load_state(state_file)
+    rttm_lines, rttm_offset = read_appended_lines(rttm_file, state['rttmOffset'])
+    ctm_lines, ctm_offset = read_appended_lines(ctm_file, state['ctmOffset'])
+    new_rows = list(iter_rttm_rows(rttm_lines))
+    new_words = list(iter_ctm_rows(ctm_lines))
+    first_index = state['segmentCount']
+    if not new_rows and not new_words:
+        open(output_file, 'w').close()
+        return first_index, 0, len(state['open'])
+
+    rows = [tuple(row) for row in state['rows']] + new_rows
+    covered_until = max([state['coveredUntil']] + [start + duration for start, duration, _ in new_rows])
+    segments = build_segments(rows)
+    words = build_words([tuple(word) for word in state['open']] + new_words)
+    speaker_codes = assign_speakers(words, segments)
+    bounds = create_segments(speaker_codes, max_words)
+    group_count = len(bounds) - 1 if len(bounds) > 1 else 0
+
+    open_group = max(group_count - 1, 0)
+    for group in range(open_group):
+        if any(word_mid(words, index) > covered_until for index in range(bounds[group], bounds[group + 1])):
+            open_group = group
+            break
+
+    speakers = segments['speakers']
+    with open(output_file, 'w') as f:
+        for group in range(group_count):
+            segment = build_compact_segment(words, speaker_codes, speakers, bounds[group], bounds[group + 1])
+            f.write(compact_json({'index': first_index + group, **segment}))
+            f.write('\n')
+            f.flush()
+
+    first_open_word = bounds[open_group] if group_count else 0
+    if first_open_word > 0:
+        state['assignedUntil'] = word_mid(words, first_open_word - 1)
+    open_words = range(first_open_word, len(words['starts']))
+    keep_from = min((word_mid(words, index) for index in open_words), default=state['assignedUntil'])
+    state.update({
+        'rttmOffset': rttm_offset,
+        'ctmOffset': ctm_offset,
+        'segmentCount': first_index + open_group,
+        'coveredUntil': covered_until,
+        'rows': [row for row in rows if row[0] + row[1] >= keep_from],
+        'open': [[words['starts'][index], words['ends'][index], words['table'][words['indexes'][index]]] for index in open_words],
+    })
+    save_state(state_file, state)
+    return first_index, group_count, len(state['open'])
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: assign-words-to-speakers.py <rttm_file> <ctm_file> <output_json>", file=sys.stderr)
-        sys.exit(1)
-    
-    rttm_file = sys.argv[1]
-    ctm_file = sys.argv[2]
-    output_file = sys.argv[3]
-    
+    parser = argparse.ArgumentParser(description="Assign CTM words to RTTM speakers")
+    parser.add_argument("rttm_file")
+    parser.add_argument("ctm_file")
+    parser.add_argument("output_json")
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default='json',
+        help="json: indented document with word objects; compact: one-line document with per-segment word arrays; ndjson: one compact segment per line",
+    )
+    parser.add_argument(
+        "--state",
+        help="incremental mode: read only what was appended to the RTTM and CTM files since the last run with this state file, and write the new or amended segments as ndjson with their index",
+    )
+    args = parser.parse_args()
+
+    if args.state and args.format != 'ndjson':
+        parser.error("--state requires --format ndjson")
+
     try:
-        diarization_segments = parse_rttm(rttm_file)
-        print(f"Parsed {len(diarization_segments)} diarization segments", file=sys.stderr)
-        
-        words = parse_ctm(ctm_file)
-        print(f"Parsed {len(words)} words from CTM", file=sys.stderr)
-        
-        words_with_speakers = assign_speakers(words, diarization_segments)
-        
-        segments = create_segments(words_with_speakers)
-        
-        speakers = set([s['speaker'] for s in segments if s['speaker'] != 'UNKNOWN'])
-        print(f"Created {len(segments)} segments with {len(speakers)} speakers", file=sys.stderr)
-        
-        output = {
-            'segments': segments,
-            'text': ' '.join([w['word'] for w in words_with_speakers]),
-            'speakers': list(speakers)
-        }
-        
-        with open(output_file, 'w') as f:
-            json.dump(output, f, indent=2)
-        
-        print(f"Output saved to {output_file}", file=sys.stderr)
+        if args.state:
+            first_index, segment_count, open_words = assign_incremental(args.rttm_file, args.ctm_file, args.output_json, args.state)
+            print(f"Emitted {segment_count} segments from index {first_index}; {open_words} words still open", file=sys.stderr)
+            sys.exit(0)
+
+        diarization_segments = parse_rttm(args.rttm_file)
+        print(f"Parsed {len(diarization_segments['starts'])} diarization segments", file=sys.stderr)
+
+        words = parse_ctm(args.ctm_file)
+        print(f"Parsed {len(words['starts'])} words from CTM", file=sys.stderr)
+
+        speaker_codes = assign_speakers(words, diarization_segments)
+
+        bounds = create_segments(speaker_codes)
+
+        segment_count, speaker_count = write_output(args.output_json, words, speaker_codes, diarization_segments['speakers'], bounds, args.format)
+        print(f"Created {segment_count} segments with {speaker_count} speakers", file=sys.stderr)
+
+        print(f"Output saved to {args.output_json}", file=sys.stderr)
         sys.exit(0)
-        
+
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
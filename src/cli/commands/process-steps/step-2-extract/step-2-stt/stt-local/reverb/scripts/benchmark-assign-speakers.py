@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+CASES = [(1_000, 200), (5_000, 1_000), (30_000, 5_000)]
+
+def load_assign_script():
+    path = Path(__file__).with_name("assign-words-to-speakers.py")
+    spec = importlib.util.spec_from_file_location("assign_words_to_speakers", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_merge(rttm_file, ctm_file, output_file):
+    segments = []
+    with open(rttm_file, 'r') as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) >= 8 and parts[0] == "SPEAKER":
+                start = float(parts[3])
+                segments.append({'start': start, 'end': start + float(parts[4]), 'speaker': parts[7]})
+    segments.sort(key=lambda x: x['start'])
+
+    words = []
+    with open(ctm_file, 'r') as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) >= 5 and parts[4] != "'":
+                start = float(parts[2])
+                words.append({'start': start, 'end': start + float(parts[3]), 'word': parts[4]})
+
+    for word in words:
+        word_mid = (word['start'] + word['end']) / 2
+        best_overlap = 0
+        best_speaker = None
+        for segment in segments:
+            if segment['start'] <= word_mid <= segment['end']:
+                overlap = min(word['end'], segment['end']) - max(word['start'], segment['start'])
+                if overlap > best_overlap:
+                    best_overlap = overlap
+                    best_speaker = segment['speaker']
+        word['speaker'] = best_speaker if best_speaker else 'UNKNOWN'
+
+    output_segments = []
+    current = []
+    for word in words:
+        if current and (word['speaker'] != current[0]['speaker'] or len(current) >= 100):
+            output_segments.append(current)
+            current = []
+        current.append(word)
+    if current:
+        output_segments.append(current)
+
+    output = {
+        'segments': [
+            {
+                'start': group[0]['start'],
+                'end': group[-1]['end'],
+                'text': ' '.join([w['word'] for w in group]),
+                'speaker': group[0]['speaker'],
+                'words': group,
+            }
+            for group in output_segments
+        ],
+        'text': ' '.join([w['word'] for w in words]),
+        'speakers': sorted(set(group[0]['speaker'] for group in output_segments) - {'UNKNOWN'}),
+    }
+    with open(output_file, 'w') as f:
+        json.dump(output, f, indent=2)
+
+def columnar_merge(assign, rttm_file, ctm_file, output_file, output_format='json'):
+    segments = assign.parse_rttm(rttm_file)
+    words = assign.parse_ctm(ctm_file)
+    speaker_codes = assign.assign_speakers(words, segments)
+    bounds = assign.create_segments(speaker_codes)
+    assign.write_output(output_file, words, speaker_codes, segments['speakers'], bounds, output_format)
+
+def incremental_merge(assign, rttm_file, ctm_file, directory, appends):
+    # Replay the inputs as a growing recording: each step appends the next
+    # slice of CTM words plus every RTTM row starting before its last word,
+    # then applies the emitted segments from their first index onward.
+    ctm_lines = Path(ctm_file).read_text().splitlines(keepends=True)
+    rttm_lines = Path(rttm_file).read_text().splitlines(keepends=True)
+    growing_rttm = Path(directory) / "growing.rttm"
+    growing_ctm = Path(directory) / "growing.ctm"
+    state_file = Path(directory) / "growing.state.json"
+    delta_file = Path(directory) / "growing.ndjson"
+    for path in (growing_rttm, growing_ctm, state_file):
+        path.unlink(missing_ok=True)
+    growing_rttm.touch()
+    growing_ctm.touch()
+
+    segments = []
+    rttm_index = 0
+    step = max(1, -(-len(ctm_lines) // appends))
+    seconds = 0.0
+    for first in range(0, len(ctm_lines), step):
+        chunk = ctm_lines[first:first + step]
+        chunk_end = max(float(line.split()[2]) + float(line.split()[3]) for line in chunk)
+        rows = []
+        while rttm_index < len(rttm_lines) and float(rttm_lines[rttm_index].split()[3]) <= chunk_end:
+            rows.append(rttm_lines[rttm_index])
+            rttm_index += 1
+        if first + step >= len(ctm_lines):
+            rows.extend(rttm_lines[rttm_index:])
+        with open(growing_rttm, 'a') as f:
+            f.writelines(rows)
+        with open(growing_ctm, 'a') as f:
+            f.writelines(chunk)
+
+        started = time.perf_counter()
+        assign.assign_incremental(growing_rttm, growing_ctm, delta_file, state_file)
+        seconds += time.perf_counter() - started
+        for line in delta_file.read_text().splitlines():
+            segment = json.loads(line)
+            del segments[segment.pop('index'):]
+            segments.append(segment)
+    return segments, seconds
+
+def write_inputs(directory, word_count, segment_count, seed):
+    rng = random.Random(seed)
+    duration = word_count * 0.36
+    mean_length = duration / segment_count
+    cursor = 0.0
+    rttm_file = Path(directory) / "input.rttm"
+    with open(rttm_file, 'w') as f:
+        for _ in range(segment_count):
+            start = max(0.0, cursor - rng.uniform(0, mean_length * 0.3))
+            length = rng.uniform(mean_length * 0.5, mean_length * 1.5)
+            f.write(f"SPEAKER input 1 {start:.3f} {length:.3f} <NA> <NA> SPEAKER_{rng.randrange(6):02d} <NA> <NA>\n")
+            cursor = start + length + rng.uniform(0, mean_length * 0.2)
+
+    cursor = 0.0
+    ctm_file = Path(directory) / "input.ctm"
+    with open(ctm_file, 'w') as f:
+        for index in range(word_count):
+            start = cursor + rng.uniform(0, 0.08)
+            length = 0.0 if index % 50 == 0 else rng.uniform(0.05, 0.6)
+            f.write(f"input 1 {start:.2f} {length:.2f} word{rng.randrange(2_000)} 0.95\n")
+            cursor = start + length
+    return rttm_file, ctm_file
+
+def measure(fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def normalized_output(path):
+    data = json.loads(Path(path).read_text())
+    data['speakers'] = sorted(data['speakers'])
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RTTM/CTM speaker assignment against the dict-based full-scan implementation")
+    parser.add_argument("--cases", default=",".join(f"{words}x{segments}" for words, segments in CASES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--appends", type=int, default=20, help="number of appends replayed through the incremental mode")
+    args = parser.parse_args()
+
+    assign = load_assign_script()
+    identical = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for case in args.cases.split(","):
+            word_count, segment_count = (int(value) for value in case.split("x"))
+            rttm_file, ctm_file = write_inputs(tmp, word_count, segment_count, args.seed)
+            legacy_file = Path(tmp) / "legacy.json"
+            columnar_file = Path(tmp) / "columnar.json"
+            legacy_seconds, legacy_peak = measure(lambda: legacy_merge(rttm_file, ctm_file, legacy_file))
+            columnar_seconds, columnar_peak = measure(lambda: columnar_merge(assign, rttm_file, ctm_file, columnar_file))
+            same = normalized_output(legacy_file) == normalized_output(columnar_file)
+            identical = identical and same
+            full_file = Path(tmp) / "columnar.ndjson"
+            columnar_merge(assign, rttm_file, ctm_file, full_file, 'ndjson')
+            incremental_segments, incremental_seconds = incremental_merge(assign, rttm_file, ctm_file, tmp, args.appends)
+            incremental_same = incremental_segments == [json.loads(line) for line in full_file.read_text().splitlines()]
+            identical = identical and incremental_same
+            format_bytes = {}
+            for output_format in assign.OUTPUT_FORMATS:
+                format_file = Path(tmp) / f"columnar.{output_format}"
+                columnar_merge(assign, rttm_file, ctm_file, format_file, output_format)
+                format_bytes[f"{output_format}Bytes"] = format_file.stat().st_size
+            print(json.dumps({
+                'words': word_count,
+                'segments': segment_count,
+                'identical': same,
+                'legacySeconds': round(legacy_seconds, 4),
+                'columnarSeconds': round(columnar_seconds, 4),
+                'legacyPeakBytes': legacy_peak,
+                'columnarPeakBytes': columnar_peak,
+                **format_bytes,
+                'incrementalIdentical': incremental_same,
+                'incrementalAppends': args.appends,
+                'incrementalSeconds': round(incremental_seconds, 4),
+            }), flush=True)
+
+    if not identical:
+        raise SystemExit("columnar or incremental speaker assignment differs from the dict-based implementation")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.m4a', '.ogg')
+
+def load_diarization_script():
+    path = Path(__file__).with_name("reverb-diarization.py")
+    spec = importlib.util.spec_from_file_location("reverb_diarization", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def find_sample_audio():
+    for parent in Path(__file__).resolve().parents:
+        samples = parent / "input" / "examples" / "audio"
+        if samples.is_dir():
+            return sorted(str(path) for path in samples.iterdir() if path.suffix.lower() in AUDIO_EXTENSIONS)
+    return []
+
+def audio_seconds(path):
+    import torchaudio
+
+    waveform, sample_rate = torchaudio.load(path)
+    return waveform.shape[1] / sample_rate
+
+def run_profile(request):
+    # Runs in its own process: torch inter-op threads can only be set once per
+    # process, and each profile must start from a cold pipeline.
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    diarization = load_diarization_script()
+    session = diarization.open_session(request["model"], request["hfToken"], **request["options"])
+    session["cache"] = None
+
+    started = time.perf_counter()
+    diarization.ensure_pipeline(session)
+    load_seconds = time.perf_counter() - started
+
+    files = []
+    for audio_path in request["audioPaths"]:
+        duration = audio_seconds(audio_path)
+        started = time.perf_counter()
+        rows = diarization.rttm_rows(diarization.diarize_in_session(session, audio_path))
+        files.append({
+            'audioPath': audio_path,
+            'audioSeconds': duration,
+            'seconds': time.perf_counter() - started,
+            'rows': rows,
+        })
+
+    protocol_out.write(json.dumps({'loadSeconds': load_seconds, 'files': files}) + "\n")
+    protocol_out.flush()
+
+def spawn_profile(model, hf_token, audio_paths, options):
+    request = {'model': model, 'hfToken': hf_token, 'audioPaths': audio_paths, 'options': options}
+    result = subprocess.run(
+        [sys.executable, __file__, "--run-profile", json.dumps(request)],
+        stdout=subprocess.PIPE,
+        text=True,
+        env={**os.environ, 'AUTOSHOW_REVERB_DIARIZATION_CACHE': '0'},
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"profile {json.dumps(options)} failed with exit code {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def to_annotation(rows):
+    from pyannote.core import Annotation, Segment
+
+    annotation = Annotation()
+    for index, (start, duration, speaker) in enumerate(rows):
+        annotation[Segment(start, start + duration), index] = speaker
+    return annotation
+
+def main():
+    diarization = load_diarization_script()
+    parser = argparse.ArgumentParser(
+        description="Benchmark a Reverb diarization inference profile against the default fp32 pipeline: real-time factor, and diarization error rate taking the fp32 output as reference"
+    )
+    parser.add_argument("audio_paths", nargs="*", help="defaults to the bundled input/examples/audio samples")
+    parser.add_argument("--model", default=diarization.DEFAULT_MODEL_NAME)
+    parser.add_argument("--hf-token", default=os.environ.get("HUGGINGFACE_TOKEN", ""))
+    diarization.add_profile_arguments(parser)
+    parser.set_defaults(profile="cpu")
+    args = parser.parse_args()
+
+    from pyannote.metrics.diarization import DiarizationErrorRate
+
+    audio_paths = args.audio_paths or find_sample_audio()
+    if not audio_paths:
+        raise SystemExit("no audio to benchmark: pass audio paths or run from the repository checkout")
+
+    candidate_options = diarization.profile_options_from_args(args)
+    profiles = {
+        'fp32': dict(diarization.PROFILES['default'], device=candidate_options['device']),
+        args.profile: candidate_options,
+    }
+    results = {name: spawn_profile(args.model, args.hf_token, audio_paths, options) for name, options in profiles.items()}
+    reference = {entry['audioPath']: to_annotation(entry['rows']) for entry in results['fp32']['files']}
+
+    summaries = []
+    for name, result in results.items():
+        metric = DiarizationErrorRate()
+        total_audio = 0.0
+        total_seconds = 0.0
+        for entry in result['files']:
+            der = metric(reference[entry['audioPath']], to_annotation(entry['rows']))
+            total_audio += entry['audioSeconds']
+            total_seconds += entry['seconds']
+            print(json.dumps({
+                'profile': name,
+                'audio': Path(entry['audioPath']).name,
+                'audioSeconds': round(entry['audioSeconds'], 2),
+                'seconds': round(entry['seconds'], 3),
+                'rtf': round(entry['seconds'] / entry['audioSeconds'], 4),
+                'der': round(der, 4),
+                'segments': len(entry['rows']),
+            }), flush=True)
+        summaries.append({
+            'profile': name,
+            'options': profiles[name],
+            'loadSeconds': round(result['loadSeconds'], 3),
+            'rtf': round(total_seconds / total_audio, 4),
+            'der': round(abs(metric), 4),
+        })
+
+    baseline_rtf = summaries[0]['rtf']
+    for summary in summaries:
+        summary['speedup'] = round(baseline_rtf / summary['rtf'], 2) if summary['rtf'] > 0 else None
+        print(json.dumps(summary), flush=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--run-profile":
+        run_profile(json.loads(sys.argv[2]))
+    else:
+        main()
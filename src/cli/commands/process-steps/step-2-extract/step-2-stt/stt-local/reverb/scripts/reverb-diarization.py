@@ -1,190 +1,748 @@
 #!/usr/bin/env python3
 import sys
 import os
-from pyannote.audio import Pipeline
-import torch
-import torchaudio
-
-
-def run_diarization(audio_path, hf_token, model_name="Revai/reverb-diarization-v2"):
-    try:
-        print(f"[DIARIZATION] Loading diarization model: {model_name}", file=sys.stderr)
-
-        pipeline_kwargs = {"token": hf_token} if hf_token else {}
-        pipeline = Pipeline.from_pretrained(model_name, **pipeline_kwargs)
-
-        if pipeline is None:
+import json
+import time
+import hashlib
+import argparse
+import importlib.util
+import inspect
+from pathlib import Path
+import numpy as np
+import soundfile
+
+# torch, torchaudio and pyannote are imported where the pipeline runs, so a
+# diarization cache hit never loads them.
+
+DEFAULT_MODEL_NAME = "Revai/reverb-diarization-v2"
+DEFAULT_WINDOW_OVERLAP_SECONDS = 30.0
+MIN_WINDOW_SECONDS = 1.0
+DEFAULT_LINK_THRESHOLD = 0.5
+CACHE_SCHEMA_VERSION = 1
+CACHE_PRUNE_EVERY_WRITES = 64
+AUDIO_HASH_BLOCK_FRAMES = 1 << 20
+QUANTIZABLE_MODELS = ("segmentation", "embedding")
+
+# Inference profiles. "cpu" skips the CUDA probe, pins torch to one intra-op
+# thread per core with a single inter-op thread, and runs the segmentation and
+# embedding models with dynamic int8 weights. Zero keeps the torch or pipeline
+# default. Individual flags override the chosen profile.
+PROFILES = {
+    "default": {
+        "device": "auto",
+        "cpu_threads": 0,
+        "interop_threads": 0,
+        "quantize": False,
+        "embedding_batch_size": 0,
+    },
+    "cpu": {
+        "device": "cpu",
+        "cpu_threads": os.cpu_count() or 1,
+        "interop_threads": 1,
+        "quantize": True,
+        "embedding_batch_size": 0,
+    },
+}
+
+
+class DiarizationError(Exception):
+    pass
+
+
+def load_assign_module():
+    path = Path(__file__).with_name("assign-words-to-speakers.py")
+    spec = importlib.util.spec_from_file_location("assign_words_to_speakers", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_pipeline(model_name, hf_token, device):
+    from pyannote.audio import Pipeline
+
+    print(f"[DIARIZATION] Loading diarization model: {model_name}", file=sys.stderr)
+
+    pipeline_kwargs = {"token": hf_token} if hf_token else {}
+    pipeline = Pipeline.from_pretrained(model_name, **pipeline_kwargs)
+
+    if pipeline is None:
+        raise DiarizationError(f"Failed to load pipeline from {model_name}")
+
+    print(f"[DIARIZATION] Pipeline loaded successfully", file=sys.stderr)
+    print(f"[DIARIZATION] Pipeline type: {type(pipeline)}", file=sys.stderr)
+    print(
+        f"[DIARIZATION] Pipeline class: {pipeline.__class__.__name__}",
+        file=sys.stderr,
+    )
+    print(f"[DIARIZATION] Using device: {device}", file=sys.stderr)
+
+    if hasattr(pipeline, "to"):
+        pipeline = pipeline.to(device)
+        print(f"[DIARIZATION] Pipeline moved to device", file=sys.stderr)
+    elif hasattr(pipeline, "_segmentation") and hasattr(
+        pipeline._segmentation, "model"
+    ):
+        if hasattr(pipeline._segmentation.model, "to"):
+            pipeline._segmentation.model = pipeline._segmentation.model.to(device)
             print(
-                f"[DIARIZATION ERROR] Failed to load pipeline from {model_name}",
-                file=sys.stderr,
+                f"[DIARIZATION] Segmentation model moved to device", file=sys.stderr
+            )
+    elif hasattr(pipeline, "segmentation") and hasattr(
+        pipeline.segmentation, "model"
+    ):
+        if hasattr(pipeline.segmentation.model, "to"):
+            pipeline.segmentation.model = pipeline.segmentation.model.to(device)
+            print(
+                f"[DIARIZATION] Segmentation model moved to device", file=sys.stderr
             )
-            return 1
-
-        print(f"[DIARIZATION] Pipeline loaded successfully", file=sys.stderr)
-        print(f"[DIARIZATION] Pipeline type: {type(pipeline)}", file=sys.stderr)
-        print(
-            f"[DIARIZATION] Pipeline class: {pipeline.__class__.__name__}",
-            file=sys.stderr,
-        )
 
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"[DIARIZATION] Using device: {device}", file=sys.stderr)
-
-        if hasattr(pipeline, "to"):
-            pipeline = pipeline.to(device)
-            print(f"[DIARIZATION] Pipeline moved to device", file=sys.stderr)
-        elif hasattr(pipeline, "_segmentation") and hasattr(
-            pipeline._segmentation, "model"
-        ):
-            if hasattr(pipeline._segmentation.model, "to"):
-                pipeline._segmentation.model = pipeline._segmentation.model.to(device)
-                print(
-                    f"[DIARIZATION] Segmentation model moved to device", file=sys.stderr
-                )
-        elif hasattr(pipeline, "segmentation") and hasattr(
-            pipeline.segmentation, "model"
-        ):
-            if hasattr(pipeline.segmentation.model, "to"):
-                pipeline.segmentation.model = pipeline.segmentation.model.to(device)
+    return pipeline
+
+
+def find_annotation(diarization):
+    if hasattr(diarization, "speaker_diarization"):
+        print(f"[DIARIZATION] Using speaker_diarization attribute", file=sys.stderr)
+        annotation = diarization.speaker_diarization
+    elif hasattr(diarization, "annotation"):
+        print(f"[DIARIZATION] Using annotation attribute", file=sys.stderr)
+        annotation = diarization.annotation
+    elif hasattr(diarization, "segments"):
+        print(f"[DIARIZATION] Using segments attribute", file=sys.stderr)
+        annotation = diarization.segments
+    else:
+        print(f"[DIARIZATION] Using diarization object directly", file=sys.stderr)
+        annotation = diarization
+
+    if annotation is None:
+        raise DiarizationError("Could not find annotation data")
+
+    print(f"[DIARIZATION] Annotation object type: {type(annotation)}", file=sys.stderr)
+    return annotation
+
+
+def collect_tracks(annotation):
+    tracks = []
+    if hasattr(annotation, "itertracks"):
+        print(f"[DIARIZATION] Using itertracks method", file=sys.stderr)
+        for segment, track, speaker in annotation.itertracks(yield_label=True):
+            tracks.append((segment, speaker))
+            if len(tracks) % 10 == 0:
                 print(
-                    f"[DIARIZATION] Segmentation model moved to device", file=sys.stderr
+                    f"[DIARIZATION] Processed {len(tracks)} segments",
+                    file=sys.stderr,
                 )
-
-        print(f"[DIARIZATION] Loading audio file: {audio_path}", file=sys.stderr)
-        waveform, sample_rate = torchaudio.load(audio_path)
-
+    else:
         print(
-            f"[DIARIZATION] Audio loaded: sample_rate={sample_rate}, shape={waveform.shape}",
+            f"[DIARIZATION] No itertracks method, trying direct iteration",
             file=sys.stderr,
         )
+        try:
+            for item in annotation:
+                if hasattr(item, "__len__") and len(item) >= 3:
+                    segment, track, speaker = item[0], item[1], item[2]
+                else:
+                    segment, track, speaker = item
+                tracks.append((segment, speaker))
+        except TypeError as e:
+            print(f"[DIARIZATION] Annotation dir: {dir(annotation)}", file=sys.stderr)
+            raise DiarizationError(f"Cannot iterate annotation: {e}")
+
+    print(f"[DIARIZATION] Total segments processed: {len(tracks)}", file=sys.stderr)
+    return tracks
+
+
+def diarize(pipeline, audio_path):
+    import torchaudio
+
+    print(f"[DIARIZATION] Loading audio file: {audio_path}", file=sys.stderr)
+    waveform, sample_rate = torchaudio.load(audio_path)
+
+    print(
+        f"[DIARIZATION] Audio loaded: sample_rate={sample_rate}, shape={waveform.shape}",
+        file=sys.stderr,
+    )
+    print(
+        f"[DIARIZATION] Audio duration: {waveform.shape[1] / sample_rate:.2f} seconds",
+        file=sys.stderr,
+    )
+
+    print(f"[DIARIZATION] Running diarization pipeline", file=sys.stderr)
+    diarization = pipeline({"waveform": waveform, "sample_rate": sample_rate})
+
+    if diarization is None:
+        raise DiarizationError("Diarization returned no results")
+
+    print(f"[DIARIZATION] Diarization completed", file=sys.stderr)
+    print(
+        f"[DIARIZATION] Output class: {diarization.__class__.__name__}",
+        file=sys.stderr,
+    )
+
+    tracks = collect_tracks(find_annotation(diarization))
+    if len(tracks) == 0:
+        raise DiarizationError("No RTTM lines generated")
+
+    speakers_seen = set(speaker for _, speaker in tracks)
+    print(
+        f"[DIARIZATION] Diarization complete: {len(tracks)} segments, {len(speakers_seen)} speakers",
+        file=sys.stderr,
+    )
+    print(
+        f"[DIARIZATION] Speakers identified: {sorted(speakers_seen)}",
+        file=sys.stderr,
+    )
+    return tracks
+
+
+def iter_windows(total_frames, window_frames, hop_frames):
+    start = 0
+    while True:
+        end = min(start + window_frames, total_frames)
+        yield start, end
+        if end >= total_frames:
+            return
+        start += hop_frames
+
+
+def run_window_pipeline(pipeline, waveform, sample_rate):
+    audio = {"waveform": waveform, "sample_rate": sample_rate}
+    apply = getattr(pipeline, "apply", None)
+    if apply is not None and "return_embeddings" in inspect.signature(apply).parameters:
+        output = pipeline(audio, return_embeddings=True)
+    else:
+        output = pipeline(audio)
+    if output is None:
+        raise DiarizationError("Diarization returned no results")
+
+    embeddings = None
+    if isinstance(output, tuple):
+        output, embeddings = output
+    elif getattr(output, "speaker_embeddings", None) is not None:
+        embeddings = output.speaker_embeddings
+
+    annotation = find_annotation(output)
+    tracks = collect_tracks(annotation)
+    labels = annotation.labels() if hasattr(annotation, "labels") else sorted(set(speaker for _, speaker in tracks))
+    vectors = {}
+    if embeddings is not None and len(embeddings) == len(labels):
+        for label, embedding in zip(labels, np.asarray(embeddings, dtype=np.float64)):
+            norm = np.linalg.norm(embedding)
+            if np.isfinite(norm) and norm > 0:
+                vectors[label] = embedding / norm
+    return tracks, labels, vectors
+
+
+def link_window_speakers(linker, labels, vectors, previous_tracks, window_tracks):
+    # Match this window's local labels to global speakers one-to-one, most
+    # similar centroid first. Labels left unmatched fall back to the global
+    # speaker they overlap most with in the previous window's shared audio.
+    mapping = {}
+    taken = set()
+    pairs = []
+    for label, vector in vectors.items():
+        for index, centroid in enumerate(linker["centroids"]):
+            if centroid is None:
+                continue
+            similarity = float(np.dot(vector, centroid / np.linalg.norm(centroid)))
+            if similarity >= linker["threshold"]:
+                pairs.append((similarity, label, index))
+    for similarity, label, index in sorted(pairs, key=lambda pair: -pair[0]):
+        if label not in mapping and index not in taken:
+            mapping[label] = index
+            taken.add(index)
+
+    for label in labels:
+        if label in mapping:
+            continue
+        overlaps = {}
+        for start, end, local in window_tracks:
+            if local != label:
+                continue
+            for previous_start, previous_end, index in previous_tracks:
+                overlap = min(end, previous_end) - max(start, previous_start)
+                if overlap > 0 and index not in taken:
+                    overlaps[index] = overlaps.get(index, 0.0) + overlap
+        if overlaps:
+            index = max(overlaps, key=overlaps.get)
+            mapping[label] = index
+            taken.add(index)
+
+    for label in labels:
+        if label not in mapping:
+            mapping[label] = len(linker["centroids"])
+            linker["centroids"].append(None)
+        vector = vectors.get(label)
+        if vector is not None:
+            index = mapping[label]
+            centroid = linker["centroids"][index]
+            linker["centroids"][index] = vector.copy() if centroid is None else centroid + vector
+    return mapping
+
+
+def diarize_windowed(pipeline, audio_path, window_seconds, overlap_seconds, link_threshold):
+    import torch
+    from pyannote.core import Segment
+
+    info = soundfile.info(audio_path)
+    sample_rate = info.samplerate
+    total_frames = info.frames
+    window_frames = int(window_seconds * sample_rate)
+    overlap_frames = min(int(overlap_seconds * sample_rate), window_frames // 2)
+    hop_frames = window_frames - overlap_frames
+    if window_frames < sample_rate or hop_frames <= 0:
+        raise DiarizationError(f"Diarization window must be at least {MIN_WINDOW_SECONDS:g}s, got {window_seconds:g}s")
+    print(
+        f"[DIARIZATION] Windowed diarization: {total_frames / sample_rate:.2f} seconds in {window_seconds:g}s windows with {overlap_frames / sample_rate:g}s overlap",
+        file=sys.stderr,
+    )
+
+    # Each window keeps the part of its result closest to its own centre: the
+    # cut between two windows is the middle of their overlap.
+    linker = {"centroids": [], "threshold": link_threshold}
+    tracks = []
+    tails = {}
+    previous_tracks = []
+    windows = list(iter_windows(total_frames, window_frames, hop_frames))
+    for number, (start_frame, end_frame) in enumerate(windows, start=1):
         print(
-            f"[DIARIZATION] Audio duration: {waveform.shape[1] / sample_rate:.2f} seconds",
+            f"[DIARIZATION] Window {number}/{len(windows)}: {start_frame / sample_rate:.2f}-{end_frame / sample_rate:.2f}s",
             file=sys.stderr,
         )
+        samples, _ = soundfile.read(audio_path, start=start_frame, stop=end_frame, dtype="float32", always_2d=True)
+        waveform = torch.from_numpy(samples.mean(axis=1, dtype=np.float32)[np.newaxis, :])
+        del samples
+        local_tracks, labels, vectors = run_window_pipeline(pipeline, waveform, sample_rate)
+        del waveform
+
+        offset = start_frame / sample_rate
+        window_tracks = [(offset + segment.start, offset + segment.end, label) for segment, label in local_tracks]
+        mapping = link_window_speakers(linker, labels, vectors, previous_tracks, window_tracks)
+        previous_tracks = [(start, end, mapping[label]) for start, end, label in window_tracks]
+
+        keep_from = (start_frame + overlap_frames / 2) / sample_rate if number > 1 else 0.0
+        keep_until = (end_frame - overlap_frames / 2) / sample_rate if number < len(windows) else end_frame / sample_rate
+        next_tails = {}
+        for start, end, label in sorted(window_tracks):
+            start = max(start, keep_from)
+            end = min(end, keep_until)
+            if end <= start:
+                continue
+            index = mapping[label]
+            tail = tails.get(index)
+            if start == keep_from and tail is not None:
+                tracks[tail][1] = end
+                position = tail
+            else:
+                tracks.append([start, end, index])
+                position = len(tracks) - 1
+            if end == keep_until:
+                next_tails[index] = position
+        tails = next_tails
+
+    if len(tracks) == 0:
+        raise DiarizationError("No RTTM lines generated")
+
+    print(f"[DIARIZATION] Linked {len(linker['centroids'])} speakers across {len(windows)} windows", file=sys.stderr)
+    tracks.sort(key=lambda track: track[0])
+    return [(Segment(start, end), f"SPEAKER_{index:02d}") for start, end, index in tracks]
+
+
+def rttm_rows(tracks):
+    # Round exactly as the RTTM text does so fresh and cached results, and the
+    # fused path, assign words the same way as diarization.rttm followed by
+    # assign-words-to-speakers.py.
+    return [
+        (float(f"{segment.start:.3f}"), float(f"{segment.duration:.3f}"), speaker)
+        for segment, speaker in tracks
+    ]
+
+
+def format_rttm(audio_path, rows):
+    name = os.path.basename(audio_path)
+    return "\n".join(
+        f"SPEAKER {name} 1 {start:.3f} {duration:.3f} <NA> <NA> {speaker} <NA> <NA>"
+        for start, duration, speaker in rows
+    )
+
+
+def write_assigned_words(rows, ctm_path, output_path, output_format):
+    assign = load_assign_module()
+    segments = assign.build_segments(rows)
+    words = assign.parse_ctm(ctm_path)
+    print(f"[DIARIZATION] Parsed {len(words['starts'])} words from CTM", file=sys.stderr)
+
+    speaker_codes = assign.assign_speakers(words, segments)
+    bounds = assign.create_segments(speaker_codes)
+    segment_count, speaker_count = assign.write_output(
+        output_path, words, speaker_codes, segments["speakers"], bounds, output_format
+    )
+    print(
+        f"[DIARIZATION] Wrote {segment_count} segments with {speaker_count} speakers to {output_path}",
+        file=sys.stderr,
+    )
+    return segment_count, speaker_count
+
+
+def read_positive_float(name, default):
+    try:
+        value = float(os.environ.get(name, ""))
+    except ValueError:
+        return default
+    return value if value > 0 else default
 
-        audio_dict = {"waveform": waveform, "sample_rate": sample_rate}
 
-        print(f"[DIARIZATION] Running diarization pipeline", file=sys.stderr)
+def pyannote_version():
+    try:
+        from importlib.metadata import version
 
-        diarization = pipeline(audio_dict)
+        return version("pyannote.audio")
+    except Exception:
+        return "unknown"
 
-        if diarization is None:
-            print(
-                "[DIARIZATION ERROR] Diarization returned no results", file=sys.stderr
-            )
-            return 1
 
-        print(f"[DIARIZATION] Diarization completed", file=sys.stderr)
-        print(f"[DIARIZATION] Output type: {type(diarization)}", file=sys.stderr)
-        print(
-            f"[DIARIZATION] Output class: {diarization.__class__.__name__}",
-            file=sys.stderr,
-        )
+def model_revision(model_name):
+    # Setup downloads the local snapshot without a revision file, so a local
+    # model is identified by its file list, sizes and modification times.
+    if not os.path.isdir(model_name):
+        return model_name
 
-        if hasattr(diarization, "__dict__"):
-            print(
-                f"[DIARIZATION] Output attributes: {list(diarization.__dict__.keys())}",
-                file=sys.stderr,
-            )
+    digest = hashlib.sha256()
+    for dir_path, dir_names, file_names in os.walk(model_name):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            path = os.path.join(dir_path, file_name)
+            try:
+                stats = os.stat(path)
+            except OSError:
+                continue
+            relative_path = os.path.relpath(path, model_name)
+            digest.update(f"{relative_path}\0{stats.st_size}\0{stats.st_mtime_ns}\n".encode("utf-8"))
+    return f"snapshot:{digest.hexdigest()}"
+
+
+def audio_digest(audio_path):
+    # Hash decoded samples so a re-muxed or re-tagged copy of the same audio
+    # still hits. Formats libsndfile cannot read fall back to the file bytes.
+    digest = hashlib.sha256()
+    try:
+        with soundfile.SoundFile(audio_path) as f:
+            digest.update(f"pcm:{f.samplerate}:{f.channels}\n".encode("utf-8"))
+            for block in f.blocks(blocksize=AUDIO_HASH_BLOCK_FRAMES, dtype="float32"):
+                digest.update(block.tobytes())
+        return digest.hexdigest()
+    except RuntimeError:
+        pass
+
+    digest = hashlib.sha256(b"file\n")
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(AUDIO_HASH_BLOCK_FRAMES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def open_cache():
+    if os.environ.get("AUTOSHOW_REVERB_DIARIZATION_CACHE", "1").strip().lower() in ("0", "false", "off", "no"):
+        return None
+
+    root = os.environ.get("AUTOSHOW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "autoshow-cli")
+    max_mb = read_positive_float("AUTOSHOW_REVERB_DIARIZATION_CACHE_MAX_MB", 64)
+    max_age_days = read_positive_float("AUTOSHOW_REVERB_DIARIZATION_CACHE_MAX_AGE_DAYS", 30)
+    cache = {
+        "dir": os.path.join(root, "reverb-diarization"),
+        "maxBytes": int(max_mb * 1024 * 1024),
+        "maxAgeSeconds": max_age_days * 24 * 60 * 60,
+        "pyannote": pyannote_version(),
+        "revisions": {},
+        "writes": 0,
+    }
+    prune_cache(cache)
+    return cache
+
+
+def resolve_device_type(session):
+    # Explicit devices resolve without torch so a cache hit stays cheap; "auto"
+    # needs the CUDA probe.
+    if session["device"] is not None:
+        return session["device"].type
+    if session["requested_device"] != "auto":
+        return session["requested_device"]
+
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def applied_precision(session):
+    # Once the pipeline is prepared the key records what was actually applied;
+    # before that it records what prepare_pipeline will apply on this device.
+    if session["pipeline"] is not None:
+        return {"device": session["device"].type, "quantized": session["quantized"]}
+    device_type = resolve_device_type(session)
+    quantized = list(QUANTIZABLE_MODELS) if session["quantize"] and device_type == "cpu" else []
+    return {"device": device_type, "quantized": quantized}
+
+
+def build_cache_key(cache, session, audio_path):
+    model_name = session["model_name"]
+    if model_name not in cache["revisions"]:
+        cache["revisions"][model_name] = model_revision(model_name)
+    window_seconds = session["window_seconds"]
+    return {
+        "schema": CACHE_SCHEMA_VERSION,
+        "audio": audio_digest(audio_path),
+        "model": cache["revisions"][model_name],
+        "pyannote": cache["pyannote"],
+        "window": [window_seconds, session["window_overlap_seconds"], session["link_threshold"]] if window_seconds > 0 else None,
+        **applied_precision(session),
+    }
+
+
+def cache_entry_path(cache, cache_key):
+    digest = hashlib.sha256(json.dumps(cache_key, sort_keys=True).encode("utf-8")).hexdigest()
+    return os.path.join(cache["dir"], digest[:2], f"{digest}.json")
+
+
+def read_cache_entry(cache, cache_key):
+    path = cache_entry_path(cache, cache_key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        os.utime(path, None)
+    except Exception:
+        return None
 
-        rttm_lines = []
-        speakers_seen = set()
-
-        annotation = None
-
-        if hasattr(diarization, "speaker_diarization"):
-            print(f"[DIARIZATION] Using speaker_diarization attribute", file=sys.stderr)
-            annotation = diarization.speaker_diarization
-            print(f"[DIARIZATION] Annotation type: {type(annotation)}", file=sys.stderr)
-        elif hasattr(diarization, "annotation"):
-            print(f"[DIARIZATION] Using annotation attribute", file=sys.stderr)
-            annotation = diarization.annotation
-            print(f"[DIARIZATION] Annotation type: {type(annotation)}", file=sys.stderr)
-        elif hasattr(diarization, "segments"):
-            print(f"[DIARIZATION] Using segments attribute", file=sys.stderr)
-            annotation = diarization.segments
-            print(f"[DIARIZATION] Segments type: {type(annotation)}", file=sys.stderr)
-        else:
-            print(f"[DIARIZATION] Using diarization object directly", file=sys.stderr)
-            annotation = diarization
+    if not isinstance(entry.get("rttm"), str):
+        return None
+    rows = list(load_assign_module().iter_rttm_rows(entry["rttm"].splitlines()))
+    return rows if rows else None
 
-        if annotation is None:
-            print("[DIARIZATION ERROR] Could not find annotation data", file=sys.stderr)
-            return 1
 
-        print(
-            f"[DIARIZATION] Annotation object type: {type(annotation)}", file=sys.stderr
+def write_cache_entry(cache, cache_key, rttm):
+    path = cache_entry_path(cache, cache_key)
+    entry = {"rttm": rttm, "key": cache_key, "createdAt": time.time()}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+    except Exception as error:
+        print(f"[DIARIZATION] Cache write failed: {error}", file=sys.stderr)
+        return
+
+    cache["writes"] += 1
+    if cache["writes"] % CACHE_PRUNE_EVERY_WRITES == 0:
+        prune_cache(cache)
+
+
+def prune_cache(cache):
+    # Entries are touched on every hit, so mtime is the last use: drop entries
+    # unused for longer than the age limit, then the least recently used ones
+    # until the cache fits its size limit.
+    expires_before = time.time() - cache["maxAgeSeconds"]
+    entries = []
+    total_bytes = 0
+    for dir_path, _, file_names in os.walk(cache["dir"]):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            try:
+                stats = os.stat(path)
+                if stats.st_mtime < expires_before:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stats.st_mtime, stats.st_size, path))
+            total_bytes += stats.st_size
+
+    if total_bytes <= cache["maxBytes"]:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        if total_bytes <= cache["maxBytes"]:
+            break
+
+
+def open_session(
+    model_name,
+    hf_token,
+    window_seconds=0.0,
+    window_overlap_seconds=DEFAULT_WINDOW_OVERLAP_SECONDS,
+    link_threshold=DEFAULT_LINK_THRESHOLD,
+    device="auto",
+    cpu_threads=0,
+    interop_threads=0,
+    quantize=False,
+    embedding_batch_size=0,
+):
+    return {
+        "model_name": model_name,
+        "hf_token": hf_token,
+        "device": None,
+        "pipeline": None,
+        "cache": open_cache(),
+        "window_seconds": window_seconds,
+        "window_overlap_seconds": window_overlap_seconds,
+        "link_threshold": link_threshold,
+        "requested_device": device,
+        "cpu_threads": cpu_threads,
+        "interop_threads": interop_threads,
+        "quantize": quantize,
+        "quantized": [],
+        "embedding_batch_size": embedding_batch_size,
+    }
+
+
+def configure_torch(session):
+    import torch
+
+    if session["cpu_threads"] > 0:
+        torch.set_num_threads(session["cpu_threads"])
+    if session["interop_threads"] > 0:
+        try:
+            torch.set_num_interop_threads(session["interop_threads"])
+        except RuntimeError as e:
+            print(f"[DIARIZATION] Inter-op threads already fixed: {e}", file=sys.stderr)
+    print(
+        f"[DIARIZATION] Torch threads: intra-op={torch.get_num_threads()}, inter-op={torch.get_num_interop_threads()}",
+        file=sys.stderr,
+    )
+
+    requested = session["requested_device"]
+    if requested == "auto":
+        requested = "cuda" if torch.cuda.is_available() else "cpu"
+    return torch.device(requested)
+
+
+def quantize_pipeline(pipeline):
+    # Dynamic quantization converts Linear and LSTM weights to int8 and
+    # quantizes activations on the fly, so it needs no calibration data.
+    # Convolutions stay fp32.
+    import torch
+
+    quantized = []
+    owners = {
+        "segmentation": (getattr(pipeline, "_segmentation", None), "model"),
+        "embedding": (getattr(pipeline, "_embedding", None), "model_"),
+    }
+    for name in QUANTIZABLE_MODELS:
+        owner, attribute = owners[name]
+        model = getattr(owner, attribute, None)
+        if not isinstance(model, torch.nn.Module):
+            continue
+        model.eval()
+        setattr(
+            owner,
+            attribute,
+            torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear, torch.nn.LSTM}, dtype=torch.qint8),
         )
-        print(f"[DIARIZATION] Checking for itertracks method", file=sys.stderr)
-
-        if hasattr(annotation, "itertracks"):
-            print(f"[DIARIZATION] Using itertracks method", file=sys.stderr)
-            track_count = 0
-            for segment, track, speaker in annotation.itertracks(yield_label=True):
-                speakers_seen.add(speaker)
-                rttm_line = f"SPEAKER {os.path.basename(audio_path)} 1 {segment.start:.3f} {segment.duration:.3f} <NA> <NA> {speaker} <NA> <NA>"
-                rttm_lines.append(rttm_line)
-                track_count += 1
-                if track_count % 10 == 0:
-                    print(
-                        f"[DIARIZATION] Processed {track_count} segments",
-                        file=sys.stderr,
-                    )
-
-            print(
-                f"[DIARIZATION] Total segments processed: {track_count}",
-                file=sys.stderr,
-            )
+        quantized.append(name)
+
+    print(
+        f"[DIARIZATION] Dynamic int8 quantization: {', '.join(quantized) if quantized else 'no supported models found'}",
+        file=sys.stderr,
+    )
+    return quantized
+
+
+def prepare_pipeline(session):
+    pipeline = load_pipeline(session["model_name"], session["hf_token"], session["device"])
+    if session["embedding_batch_size"] > 0 and hasattr(pipeline, "embedding_batch_size"):
+        pipeline.embedding_batch_size = session["embedding_batch_size"]
+        print(f"[DIARIZATION] Embedding batch size: {pipeline.embedding_batch_size}", file=sys.stderr)
+    session["quantized"] = []
+    if session["quantize"]:
+        if session["device"].type == "cpu":
+            session["quantized"] = quantize_pipeline(pipeline)
         else:
-            print(
-                f"[DIARIZATION] No itertracks method, trying direct iteration",
-                file=sys.stderr,
-            )
-            try:
-                segment_count = 0
-                for item in annotation:
-                    print(f"[DIARIZATION] Item type: {type(item)}", file=sys.stderr)
-                    if hasattr(item, "__len__") and len(item) >= 3:
-                        segment, track, speaker = item[0], item[1], item[2]
-                    else:
-                        segment, track, speaker = item
-
-                    speakers_seen.add(speaker)
-                    rttm_line = f"SPEAKER {os.path.basename(audio_path)} 1 {segment.start:.3f} {segment.duration:.3f} <NA> <NA> {speaker} <NA> <NA>"
-                    rttm_lines.append(rttm_line)
-                    segment_count += 1
+            print(f"[DIARIZATION] Skipping int8 quantization on {session['device']}", file=sys.stderr)
+    return pipeline
+
+
+def ensure_pipeline(session):
+    if session["device"] is None:
+        session["device"] = configure_torch(session)
+    if session["pipeline"] is None:
+        session["pipeline"] = prepare_pipeline(session)
+    return session["pipeline"]
+
+
+def diarize_with_pipeline(session, audio_path):
+    if session["window_seconds"] > 0:
+        return diarize_windowed(
+            session["pipeline"],
+            audio_path,
+            session["window_seconds"],
+            session["window_overlap_seconds"],
+            session["link_threshold"],
+        )
+    return diarize(session["pipeline"], audio_path)
 
-                print(
-                    f"[DIARIZATION] Total segments processed: {segment_count}",
-                    file=sys.stderr,
-                )
-            except TypeError as e:
-                print(
-                    f"[DIARIZATION ERROR] Cannot iterate annotation: {e}",
-                    file=sys.stderr,
-                )
-                print(
-                    f"[DIARIZATION] Annotation dir: {dir(annotation)}", file=sys.stderr
-                )
-                return 1
 
-        if len(rttm_lines) == 0:
-            print("[DIARIZATION ERROR] No RTTM lines generated", file=sys.stderr)
-            return 1
+def diarize_in_session(session, audio_path):
+    import torch
 
-        speaker_count = len(speakers_seen)
-        print(
-            f"[DIARIZATION] Diarization complete: {len(rttm_lines)} segments, {speaker_count} speakers",
-            file=sys.stderr,
-        )
+    ensure_pipeline(session)
+    try:
+        with torch.inference_mode():
+            return diarize_with_pipeline(session, audio_path)
+    except RuntimeError as e:
+        if "CUDA" not in str(e) or session["device"].type == "cpu":
+            raise
         print(
-            f"[DIARIZATION] Speakers identified: {sorted(speakers_seen)}",
+            f"[DIARIZATION ERROR] CUDA error, falling back to CPU: {e}",
             file=sys.stderr,
         )
+        session["device"] = torch.device("cpu")
+        session["pipeline"] = prepare_pipeline(session)
+        with torch.inference_mode():
+            return diarize_with_pipeline(session, audio_path)
+
+
+def diarize_cached(session, audio_path):
+    cache = session["cache"]
+    cache_key = build_cache_key(cache, session, audio_path) if cache is not None else None
+    if cache_key is not None:
+        rows = read_cache_entry(cache, cache_key)
+        if rows is not None:
+            print(f"[DIARIZATION] Cache hit: {len(rows)} segments for {audio_path}", file=sys.stderr)
+            return rows, True
+
+    rows = rttm_rows(diarize_in_session(session, audio_path))
+    if cache_key is not None:
+        # A CUDA fallback or a model without quantizable layers changes what
+        # was applied, so the entry is stored under the precision that ran.
+        cache_key = {**cache_key, **applied_precision(session)}
+        write_cache_entry(cache, cache_key, format_rttm(audio_path, rows))
+    return rows, False
+
+
+def run_diarization(
+    audio_path,
+    hf_token,
+    model_name=DEFAULT_MODEL_NAME,
+    ctm_path=None,
+    output_path=None,
+    output_format="json",
+    session_options=None,
+):
+    try:
+        rows, _ = diarize_cached(open_session(model_name, hf_token, **(session_options or {})), audio_path)
 
-        print("\n".join(rttm_lines))
+        if ctm_path:
+            write_assigned_words(rows, ctm_path, output_path, output_format)
+        else:
+            print(format_rttm(audio_path, rows))
         return 0
 
+    except DiarizationError as e:
+        print(f"[DIARIZATION ERROR] {e}", file=sys.stderr)
+        return 1
     except ImportError as e:
         print(f"[DIARIZATION ERROR] Import error: {e}", file=sys.stderr)
         print(
@@ -193,52 +751,8 @@ def run_diarization(audio_path, hf_token, model_name="Revai/reverb-diarization-v
         )
         return 1
     except RuntimeError as e:
-        if "CUDA" in str(e):
-            print(
-                f"[DIARIZATION ERROR] CUDA error, falling back to CPU: {e}",
-                file=sys.stderr,
-            )
-            try:
-                pipeline = Pipeline.from_pretrained(model_name, **pipeline_kwargs)
-                device = torch.device("cpu")
-
-                if hasattr(pipeline, "to"):
-                    pipeline = pipeline.to(device)
-
-                waveform, sample_rate = torchaudio.load(audio_path)
-                audio_dict = {"waveform": waveform, "sample_rate": sample_rate}
-
-                diarization = pipeline(audio_dict)
-
-                rttm_lines = []
-                annotation = (
-                    diarization.speaker_diarization
-                    if hasattr(diarization, "speaker_diarization")
-                    else diarization
-                )
-
-                if hasattr(annotation, "itertracks"):
-                    for segment, track, speaker in annotation.itertracks(
-                        yield_label=True
-                    ):
-                        rttm_line = f"SPEAKER {os.path.basename(audio_path)} 1 {segment.start:.3f} {segment.duration:.3f} <NA> <NA> {speaker} <NA> <NA>"
-                        rttm_lines.append(rttm_line)
-
-                print("\n".join(rttm_lines))
-                print(
-                    f"[DIARIZATION] Diarization complete with CPU: {len(rttm_lines)} segments",
-                    file=sys.stderr,
-                )
-                return 0
-            except Exception as cpu_e:
-                print(
-                    f"[DIARIZATION ERROR] CPU fallback also failed: {cpu_e}",
-                    file=sys.stderr,
-                )
-                return 1
-        else:
-            print(f"[DIARIZATION ERROR] Runtime error: {e}", file=sys.stderr)
-            return 1
+        print(f"[DIARIZATION ERROR] Runtime error: {e}", file=sys.stderr)
+        return 1
     except Exception as e:
         print(f"[DIARIZATION ERROR] Diarization failed: {e}", file=sys.stderr)
         import traceback
@@ -247,16 +761,178 @@ def run_diarization(audio_path, hf_token, model_name="Revai/reverb-diarization-v
         return 1
 
 
-if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print(
-            "Usage: reverb-diarization.py <audio_path> <hf_token> [model_name]",
-            file=sys.stderr,
+def default_rttm_path(audio_path, rttm_dir):
+    name = f"{Path(audio_path).stem}.rttm"
+    return str(Path(rttm_dir) / name) if rttm_dir else str(Path(audio_path).with_name(name))
+
+
+def handle_batch_request(session, request, rttm_dir):
+    audio_path = request["audioPath"]
+    rows, cached = diarize_cached(session, audio_path)
+    if request.get("ctmPath"):
+        output_path = request["outputPath"]
+        segment_count, speaker_count = write_assigned_words(
+            rows, request["ctmPath"], output_path, request.get("format") or "json"
         )
-        sys.exit(1)
+        return {"outputPath": output_path, "segments": segment_count, "speakers": speaker_count, "cached": cached}
+
+    rttm_path = request.get("rttmPath") or default_rttm_path(audio_path, rttm_dir)
+    with open(rttm_path, "w") as f:
+        f.write(format_rttm(audio_path, rows))
+        f.write("\n")
+    return {
+        "rttmPath": rttm_path,
+        "segments": len(rows),
+        "speakers": len(set(speaker for _, _, speaker in rows)),
+        "cached": cached,
+    }
+
+
+def iter_stdin_requests(protocol_out):
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except Exception as error:
+            write_message(protocol_out, {"id": None, "error": f"Invalid batch request: {error}"})
+
+
+def write_message(out, message):
+    out.write(json.dumps(message) + "\n")
+    out.flush()
+
+
+def run_batch(hf_token, model_name, audio_paths, rttm_dir, session_options=None):
+    # Responses own stdout; pipeline and progress output goes to stderr.
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    session = open_session(model_name, hf_token, **(session_options or {}))
+    requests = (
+        ({"id": index, "audioPath": path} for index, path in enumerate(audio_paths))
+        if audio_paths
+        else iter_stdin_requests(protocol_out)
+    )
+
+    failures = 0
+    for request in requests:
+        request_id = request.get("id")
+        try:
+            output = handle_batch_request(session, request, rttm_dir)
+        except Exception as error:
+            failures += 1
+            output = {"error": f"{type(error).__name__}: {error}"}
+
+        output["id"] = request_id
+        sys.stderr.flush()
+        write_message(protocol_out, output)
+
+    return 1 if audio_paths and failures else 0
+
+
+def window_seconds_argument(value):
+    seconds = float(value)
+    if seconds != 0 and seconds < MIN_WINDOW_SECONDS:
+        raise argparse.ArgumentTypeError(f"must be 0 (whole file) or at least {MIN_WINDOW_SECONDS:g} seconds, got {value}")
+    return seconds
+
+
+def add_window_arguments(parser):
+    parser.add_argument(
+        "--window-seconds",
+        type=window_seconds_argument,
+        default=0.0,
+        help="diarize overlapping windows of this length read from disk and link speakers across them (default: whole file)",
+    )
+    parser.add_argument("--window-overlap-seconds", type=float, default=DEFAULT_WINDOW_OVERLAP_SECONDS)
+    parser.add_argument(
+        "--link-threshold",
+        type=float,
+        default=DEFAULT_LINK_THRESHOLD,
+        help="minimum cosine similarity for a window speaker to join an existing global speaker",
+    )
+
+
+def add_profile_arguments(parser):
+    parser.add_argument(
+        "--profile",
+        choices=tuple(PROFILES),
+        default="default",
+        help="cpu: force CPU, one intra-op thread per core, one inter-op thread, and int8 dynamic quantization",
+    )
+    parser.add_argument("--device", choices=("auto", "cpu", "cuda"))
+    parser.add_argument("--cpu-threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--interop-threads", type=int, help="torch inter-op threads")
+    parser.add_argument(
+        "--quantize",
+        action=argparse.BooleanOptionalAction,
+        help="dynamic int8 quantization of the segmentation and embedding models (CPU only)",
+    )
+    parser.add_argument("--embedding-batch-size", type=int, help="speaker embedding batch size")
+
+
+def profile_options_from_args(args):
+    options = dict(PROFILES[args.profile])
+    for key in options:
+        value = getattr(args, key)
+        if value is not None:
+            options[key] = value
+    return options
+
+
+def session_options_from_args(args):
+    return {
+        "window_seconds": args.window_seconds,
+        "window_overlap_seconds": args.window_overlap_seconds,
+        "link_threshold": args.link_threshold,
+        **profile_options_from_args(args),
+    }
+
+
+def main_batch(argv):
+    parser = argparse.ArgumentParser(
+        prog="reverb-diarization.py --batch",
+        description="Load the diarization pipeline once and diarize many files. Without audio paths, reads JSON-lines requests from stdin.",
+    )
+    parser.add_argument("audio_paths", nargs="*")
+    parser.add_argument("--hf-token", default="")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--rttm-dir", help="write <stem>.rttm here instead of next to each audio file")
+    add_window_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    return run_batch(args.hf_token, args.model, args.audio_paths, args.rttm_dir, session_options_from_args(args))
 
-    audio_path = sys.argv[1]
-    hf_token = sys.argv[2]
-    model_name = sys.argv[3] if len(sys.argv) > 3 else "Revai/reverb-diarization-v2"
 
-    sys.exit(run_diarization(audio_path, hf_token, model_name))
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(main_batch(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(
+        description="Diarize audio with pyannote and print RTTM, or assign CTM words to speakers directly"
+    )
+    parser.add_argument("audio_path")
+    parser.add_argument("hf_token")
+    parser.add_argument("model_name", nargs="?", default=DEFAULT_MODEL_NAME)
+    parser.add_argument("--ctm", help="assign the words in this CTM file to speakers instead of printing RTTM")
+    parser.add_argument("--output", help="speaker-assigned transcript path (required with --ctm)")
+    parser.add_argument("--format", choices=("json", "compact", "ndjson"), default="json")
+    add_window_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.ctm and not args.output:
+        parser.error("--output is required with --ctm")
+
+    sys.exit(
+        run_diarization(
+            args.audio_path,
+            args.hf_token,
+            args.model_name,
+            ctm_path=args.ctm,
+            output_path=args.output,
+            output_format=args.format,
+            session_options=session_options_from_args(args),
+        )
+    )
@@ -1,14 +1,27 @@
 #!/usr/bin/env python3
 import argparse
+import copy
+import hashlib
+import json
 import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from importlib.util import find_spec
+import multiprocessing
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import whisper
-import coremltools as ct
 from pathlib import Path
 
+TARGETS = ("coreml", "onnx", "torchscript")
+MEL_FRAMES_PER_SECOND = 100
+PARITY_SEED = 0
+PARITY_MIN_COSINE = {False: 0.9999, True: 0.99}
+MANIFEST_VERSION = 1
+
 class AudioEncoder(nn.Module):
     def __init__(self, whisper_model):
         super().__init__()
@@ -36,23 +49,28 @@ class AudioEncoder(nn.Module):
         x = self.ln_post(x)
         return x
 
-def convert_encoder_to_coreml(model_name, models_dir):
-    print(f"Loading Whisper model: {model_name}")
-    model = whisper.load_model(model_name, download_root=models_dir)
-    model.eval()
-    
-    wrapper = AudioEncoder(model)
-    wrapper.eval()
-    
+def encoder_input_shape(model_name, n_mels):
     if model_name in ["tiny", "tiny.en", "base", "base.en"]:
         n_frames = 1500
     else:
         n_frames = 3000
+    return (1, n_mels, n_frames)
+
+def load_encoder(model_name, models_dir):
+    print(f"Loading Whisper model: {model_name}")
+    model = whisper.load_model(model_name, download_root=models_dir, device="cpu")
+    model.eval()
     
-    n_mels = model.dims.n_mels
-    mel_input = torch.randn(1, n_mels, n_frames)
+    wrapper = AudioEncoder(model)
+    wrapper.eval()
     
+    mel_input = torch.randn(encoder_input_shape(model_name, model.dims.n_mels))
     print(f"Model input shape: {mel_input.shape}")
+    return wrapper, mel_input
+
+def convert_encoder_to_coreml(wrapper, mel_input, model_name, models_dir):
+    import coremltools as ct
+    
     print("Tracing encoder model")
     
     with torch.no_grad():
@@ -71,13 +89,310 @@ def convert_encoder_to_coreml(model_name, models_dir):
     output_path = Path(models_dir) / f"coreml-encoder-{model_name}.mlpackage"
     print(f"Saving CoreML model to {output_path}")
     coreml_model.save(str(output_path))
-    print("CoreML conversion complete")
+    write_manifest(models_dir, model_name, build_manifest(model_name, list(mel_input.shape)))
+    print(f"CoreML conversion complete for {model_name}")
+
+# setup compiles coreml-encoder-<model>.mlpackage into ggml-<model>-encoder.mlmodelc
+# (or keeps it as ggml-<model>-encoder.mlpackage); the manifest sits beside
+# either one and records what produced it.
+
+def manifest_path(models_dir, model_name):
+    return Path(models_dir) / f"ggml-{model_name}-encoder.manifest.json"
+
+def coreml_artifact_exists(models_dir, model_name):
+    return any(
+        (Path(models_dir) / f"ggml-{model_name}-encoder.{suffix}").exists()
+        for suffix in ("mlmodelc", "mlpackage")
+    )
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def checkpoint_sha256(model_name):
+    # Official checkpoint URLs embed their SHA-256, and whisper.load_model
+    # verifies the downloaded file against it.
+    url = whisper._MODELS.get(model_name)
+    if url:
+        return url.split("/")[-2]
+    return file_sha256(model_name)
+
+def package_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+def build_manifest(model_name, input_shape=None):
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "model": model_name,
+        "checkpointSha256": checkpoint_sha256(model_name),
+        "torch": torch.__version__,
+        "coremltools": package_version("coremltools"),
+        "converterSha256": file_sha256(__file__),
+    }
+    if input_shape is not None:
+        manifest["inputShape"] = input_shape
+    return manifest
+
+def read_manifest(models_dir, model_name):
+    try:
+        with open(manifest_path(models_dir, model_name), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(models_dir, model_name, manifest):
+    path = manifest_path(models_dir, model_name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    os.replace(temp_path, path)
+
+def coreml_is_current(models_dir, model_name):
+    # The input shape follows from the checkpoint and the converter, so it is
+    # recorded but not needed to decide whether to convert again.
+    if not coreml_artifact_exists(models_dir, model_name):
+        return False
+    manifest = read_manifest(models_dir, model_name)
+    if manifest is None:
+        return False
+    manifest.pop("inputShape", None)
+    return manifest == build_manifest(model_name)
+
+def with_plain_linear(module):
+    # Whisper's Linear subclass casts weights per call, and torch's dynamic
+    # quantization only swaps exact nn.Linear modules.
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+            plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            with_plain_linear(child)
+    return module
+
+def export_onnx(wrapper, mel_input, output_path):
+    print(f"Exporting ONNX encoder to {output_path}")
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            mel_input,
+            str(output_path),
+            input_names=["logmel_data"],
+            output_names=["output"],
+            opset_version=17,
+            do_constant_folding=True
+        )
+
+def quantize_onnx(input_path, output_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    
+    print(f"Quantizing ONNX encoder weights to int8: {output_path}")
+    quantize_dynamic(str(input_path), str(output_path), weight_type=QuantType.QInt8)
+
+def export_torchscript(wrapper, mel_input, output_path, int8=False):
+    module = wrapper
+    if int8:
+        module = torch.ao.quantization.quantize_dynamic(
+            with_plain_linear(copy.deepcopy(wrapper)), {nn.Linear}, dtype=torch.qint8
+        )
+    
+    print(f"Exporting TorchScript encoder to {output_path}")
+    with torch.no_grad():
+        traced = torch.jit.trace(module, mel_input, check_trace=False)
+        optimized = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+    torch.jit.save(optimized, str(output_path))
+
+def missing_target_packages(targets):
+    # The ONNX export needs onnx, and both int8 quantization and the parity
+    # check run through onnxruntime; neither ships in the CoreML environment.
+    if "onnx" not in targets:
+        return []
+    return [name for name in ("onnx", "onnxruntime") if find_spec(name) is None]
+
+def onnx_runner(path, threads):
+    import onnxruntime as ort
+    
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+    session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+    return lambda mel: torch.from_numpy(session.run(None, {"logmel_data": mel.numpy()})[0])
+
+def torchscript_runner(path):
+    module = torch.jit.load(str(path))
+    module.eval()
+    return module
+
+def compare_outputs(reference, output):
+    reference = reference.reshape(-1).double()
+    output = output.reshape(-1).double()
+    return {
+        "maxAbsDiff": (reference - output).abs().max().item(),
+        "cosine": F.cosine_similarity(reference, output, dim=0).item()
+    }
+
+def measure_throughput(run, mel_input, iterations, warmup=2):
+    with torch.inference_mode():
+        for _ in range(warmup):
+            run(mel_input)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            run(mel_input)
+        elapsed = time.perf_counter() - started
+    seconds = elapsed / iterations
+    return {
+        "msPerEncode": round(seconds * 1000, 2),
+        "audioSecondsPerSecond": round(mel_input.shape[-1] / MEL_FRAMES_PER_SECOND / seconds, 2)
+    }
+
+def export_cpu_encoders(wrapper, mel_input, model_name, models_dir, targets, int8, iterations, threads):
+    # Artifacts are traced with mel_input; parity uses its own seeded mel batch,
+    # so a trace that only holds for its tracing input shows up as a mismatch.
+    generator = torch.Generator().manual_seed(PARITY_SEED)
+    parity_input = torch.randn(encoder_input_shape(model_name, wrapper.n_mels), generator=generator)
+    with torch.inference_mode():
+        reference = wrapper(parity_input)
+    
+    artifacts = []
+    for quantized in ([False, True] if int8 else [False]):
+        suffix = "-int8" if quantized else ""
+        if "onnx" in targets:
+            path = Path(models_dir) / f"cpu-encoder-{model_name}{suffix}.onnx"
+            if quantized:
+                quantize_onnx(Path(models_dir) / f"cpu-encoder-{model_name}.onnx", path)
+            else:
+                export_onnx(wrapper, mel_input, path)
+            artifacts.append(("onnx", quantized, path, onnx_runner(path, threads)))
+        if "torchscript" in targets:
+            path = Path(models_dir) / f"cpu-encoder-{model_name}{suffix}.pt"
+            export_torchscript(wrapper, mel_input, path, quantized)
+            artifacts.append(("torchscript", quantized, path, torchscript_runner(path)))
+    
+    baseline = measure_throughput(wrapper, mel_input, iterations) if iterations > 0 else None
+    if baseline:
+        print(json.dumps({"model": model_name, "target": "pytorch", "int8": False, **baseline}), flush=True)
+    
+    passed = True
+    for target, quantized, path, run in artifacts:
+        with torch.inference_mode():
+            parity = compare_outputs(reference, run(parity_input))
+        parity["parity"] = parity["cosine"] >= PARITY_MIN_COSINE[quantized]
+        passed = passed and parity["parity"]
+        report = {"model": model_name, "target": target, "int8": quantized, "path": str(path), **parity}
+        if baseline:
+            throughput = measure_throughput(run, mel_input, iterations)
+            report.update(throughput)
+            report["speedup"] = round(baseline["msPerEncode"] / throughput["msPerEncode"], 2)
+        print(json.dumps(report), flush=True)
+    return passed
+
+# Per-model outcome reported by convert_models: "skipped" (no openai-whisper
+# checkpoint), "current" (CoreML manifest matched, nothing else requested),
+# "converted" or "failed".
+
+def convert_model(model_name, models_dir, targets, int8=False, iterations=10, threads=0, force=False):
+    if model_name not in whisper.available_models() and not os.path.isfile(model_name):
+        print(f"Skipping {model_name}: not an openai-whisper model")
+        return "skipped"
+    
+    if threads:
+        torch.set_num_threads(threads)
+    
+    if "coreml" in targets and not force and coreml_is_current(models_dir, model_name):
+        print(f"CoreML encoder for {model_name} is up to date")
+        targets = [target for target in targets if target != "coreml"]
+    if not targets:
+        return "current"
+    
+    wrapper, mel_input = load_encoder(model_name, models_dir)
+    if "coreml" in targets:
+        convert_encoder_to_coreml(wrapper, mel_input, model_name, models_dir)
+    if "onnx" in targets or "torchscript" in targets:
+        if not export_cpu_encoders(wrapper, mel_input, model_name, models_dir, targets, int8, iterations, threads):
+            print(f"CPU encoder parity check failed for {model_name}", file=sys.stderr)
+            return "failed"
+    return "converted"
+
+def run_conversion(model_name, models_dir, targets, int8, iterations, threads, force):
+    try:
+        return convert_model(model_name, models_dir, targets, int8, iterations, threads, force)
+    except Exception as error:
+        print(f"Conversion failed for {model_name}: {error}", file=sys.stderr)
+        return "failed"
+
+def convert_models(model_names, models_dir, targets, int8, iterations, threads, force, workers):
+    if workers <= 1 or len(model_names) <= 1:
+        return {
+            model_name: run_conversion(model_name, models_dir, targets, int8, iterations, threads, force)
+            for model_name in model_names
+        }
+    
+    # Each worker is a fresh spawned process with its own share of the cores,
+    # so parallel conversions do not oversubscribe torch's thread pool.
+    worker_threads = threads or max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {
+            model_name: pool.submit(run_conversion, model_name, models_dir, targets, int8, iterations, worker_threads, force)
+            for model_name in model_names
+        }
+        return {model_name: future.result() for model_name, future in futures.items()}
+
+def write_status(path, statuses):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(statuses, f, indent=2)
+        f.write("\n")
+    os.replace(temp_path, path)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--model", required=True)
+    parser.add_argument("--model", action="append", required=True, help="repeatable; models are converted one after another unless --workers is above 1")
     parser.add_argument("--models-dir", required=True)
     parser.add_argument("--encoder-only", default="true")
+    parser.add_argument(
+        "--target",
+        action="append",
+        choices=TARGETS,
+        help="artifact to build; repeatable (default: coreml). onnx and torchscript write cpu-encoder-<model>.onnx / .pt for CPU inference",
+    )
+    parser.add_argument("--int8", action="store_true", help="also write dynamically quantized int8 variants of the CPU artifacts")
+    parser.add_argument("--benchmark-iterations", type=int, default=10, help="timed encoder runs per CPU artifact; 0 skips the benchmark")
+    parser.add_argument("--threads", type=int, default=0, help="torch and onnxruntime intra-op threads (default: library default)")
+    parser.add_argument("--workers", type=int, default=1, help="convert this many models at once in separate processes")
+    parser.add_argument("--force", action="store_true", help="convert even when the CoreML manifest matches")
+    parser.add_argument("--status-file", help="write a JSON object mapping each model to skipped, current, converted or failed")
     args = parser.parse_args()
+    targets = args.target or ["coreml"]
+    
+    missing = missing_target_packages(targets)
+    if missing:
+        print(
+            f"--target onnx needs {' and '.join(missing)}; install with: uv pip install -p {sys.executable} {' '.join(missing)}",
+            file=sys.stderr,
+        )
+        if args.status_file:
+            write_status(args.status_file, {model_name: "failed" for model_name in args.model})
+        sys.exit(2)
     
-    convert_encoder_to_coreml(args.model, args.models_dir)
\ No newline at end of file
+    statuses = convert_models(
+        args.model,
+        args.models_dir,
+        targets,
+        args.int8,
+        args.benchmark_iterations,
+        args.threads,
+        args.force,
+        args.workers,
+    )
+    if args.status_file:
+        write_status(args.status_file, statuses)
+    sys.exit(1 if "failed" in statuses.values() else 0)
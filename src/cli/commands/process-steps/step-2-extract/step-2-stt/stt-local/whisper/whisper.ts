@@ -1,6 +1,7 @@
-import { copyFile, mkdir, readdir, rename, rm } from 'node:fs/promises'
+import { copyFile, mkdir, readdir, readFile, rename, rm } from 'node:fs/promises'
 import { dirname, join } from 'node:path'
 import { fileURLToPath } from 'node:url'
+import * as v from 'valibot'
 import { pathExists, runCapture, runInherit, runUvCapture, runUvInherit, detectPlatform, supportsCoreML, setupUv, whisperBinaryPath, whisperBuildDir, whisperCoremlEnvDir, whisperLibDir, whisperModelsDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
 import * as l from '~/utils/logger'
 import { downloadFile } from '~/cli/commands/setup-and-utilities/setup/setup-download/download'
@@ -228,33 +229,86 @@ const compileCoremlPackage = async (modelName: string): Promise<void> => {
   }
 }
 
-export const coremlConvert = async (modelName: string): Promise<void> => {
-  if (!await detectCoremlSupport()) {
-    l.warn('CoreML not supported on this host')
-    return
-  }
+const hasCoremlEncoder = async (modelName: string): Promise<boolean> => {
+  return await fileExists(`${whisperModelsDir}/ggml-${modelName}-encoder.mlmodelc`)
+    || await fileExists(`${whisperModelsDir}/ggml-${modelName}-encoder.mlpackage`)
+}
 
-  const mlmodelcPath = `${whisperModelsDir}/ggml-${modelName}-encoder.mlmodelc`
-  const mlpackagePath = `${whisperModelsDir}/ggml-${modelName}-encoder.mlpackage`
+const readCoremlWorkers = (modelCount: number): number => {
+  const value = Number.parseInt(process.env['AUTOSHOW_WHISPER_COREML_WORKERS'] ?? '', 10)
+  return Number.isFinite(value) && value > 0 ? value : Math.min(modelCount, 2)
+}
 
-  if (await fileExists(mlmodelcPath) || await fileExists(mlpackagePath)) {
-    return
+const CoremlConversionStatusSchema = v.record(v.string(), v.picklist(['skipped', 'current', 'converted', 'failed']))
+
+const readCoremlConversionStatus = async (statusPath: string): Promise<v.InferOutput<typeof CoremlConversionStatusSchema>> => {
+  try {
+    const result = v.safeParse(CoremlConversionStatusSchema, JSON.parse(await readFile(statusPath, 'utf-8')))
+    return result.success ? result.output : {}
+  } catch {
+    return {}
   }
+}
 
+const convertCoremlModels = async (modelNames: string[]): Promise<void> => {
   await setupUv()
-  l.write('info', `Converting ${modelName} to CoreML format`)
+  l.write('info', `Preparing CoreML encoders for ${modelNames.join(', ')}`)
 
   await ensureCoremlEnvironment()
 
   const convertScript = join(whisperScriptsDir, 'convert-whisper-to-coreml.py')
+  const statusPath = `${whisperModelsDir}/tmp-coreml-status-${Date.now()}.json`
   await runInherit(`${whisperCoremlEnvDir}/bin/python`, [
     convertScript,
-    '--model', modelName,
+    ...modelNames.flatMap((modelName) => ['--model', modelName]),
     '--models-dir', whisperModelsDir,
-    '--encoder-only', 'true'
-  ])
+    '--encoder-only', 'true',
+    '--workers', String(readCoremlWorkers(modelNames.length)),
+    '--status-file', statusPath
+  ], { allowFailure: true })
+  const statuses = await readCoremlConversionStatus(statusPath)
+  await cleanupPath(statusPath)
+
+  for (const modelName of modelNames) {
+    // Skipped models have no openai-whisper checkpoint, and current ones keep their encoder.
+    // Only a fresh conversion is compiled, so a stale package left by an interrupted run never is.
+    const status = statuses[modelName]
+    if (status === 'converted') {
+      await compileCoremlPackage(modelName)
+    } else if (status === 'failed') {
+      l.warn(`CoreML encoder conversion failed for ${modelName}`)
+    } else if (status === undefined) {
+      l.warn(`CoreML encoder conversion reported no status for ${modelName}; leaving its encoder unchanged`)
+    }
+  }
+}
 
-  await compileCoremlPackage(modelName)
+export const coremlConvert = async (modelName: string): Promise<void> => {
+  if (!await detectCoremlSupport()) {
+    l.warn('CoreML not supported on this host')
+    return
+  }
+
+  if (await hasCoremlEncoder(modelName)) {
+    return
+  }
+
+  await convertCoremlModels([modelName])
+}
+
+export const refreshCoremlEncoders = async (): Promise<void> => {
+  if (!await detectCoremlSupport() || !await fileExists(whisperModelsDir)) {
+    return
+  }
+
+  const modelNames = (await readdir(whisperModelsDir))
+    .map((entry) => /^ggml-(.+)\.bin$/.exec(entry)?.[1])
+    .filter((modelName): modelName is string => modelName !== undefined)
+    .sort()
+
+  if (modelNames.length > 0) {
+    await convertCoremlModels(modelNames)
+  }
 }
 
 export const downloadWhisperModel = async (modelName: string): Promise<void> => {
@@ -0,0 +1,128 @@
+import { resolve } from 'node:path'
+import * as v from 'valibot'
+import * as l from '~/utils/logger'
+import { kittenTtsUvEnvDir } from '~/cli/commands/setup-and-utilities/setup/run-complete-setup'
+import { appendOutputTail, createSharedJsonLinesWorker, startJsonLinesWorker, type JsonLinesWorker } from '~/utils/json-lines-worker'
+
+const SCRIPT_PATH = resolve(import.meta.dir, 'scripts/run-kitten-tts.py')
+
+export type KittenTtsJob = {
+  model: string
+  input: string
+  output: string
+  voice: string
+  dialogue?: boolean
+  speakerVoices?: Record<string, string>
+  turnGapSeconds?: number
+  format?: 'auto' | 'wav' | 'flac' | 'opus'
+}
+
+export type KittenTtsWorkerResult =
+  | { ok: true, stdout: string }
+  | { ok: false, stderr: string, exitCode: number }
+
+export type KittenTtsWorker = JsonLinesWorker<KittenTtsJob, KittenTtsWorkerResult>
+
+const KittenTtsServerResponseSchema = v.object({
+  id: v.nullable(v.number()),
+  format: v.optional(v.string(), undefined),
+  event: v.optional(v.literal('chunk'), undefined),
+  chunk: v.optional(v.number(), undefined),
+  sampleRate: v.optional(v.number(), undefined),
+  chunkCount: v.optional(v.number(), undefined),
+  durationSeconds: v.optional(v.number(), undefined),
+  cacheHits: v.optional(v.number(), undefined),
+  cacheMisses: v.optional(v.number(), undefined),
+  turnCount: v.optional(v.number(), undefined),
+  timingsPath: v.optional(v.string(), undefined),
+  error: v.optional(v.string(), undefined)
+})
+
+export type KittenTtsServerResponse = v.InferOutput<typeof KittenTtsServerResponseSchema>
+
+export const parseKittenTtsServerResponse = (line: string): KittenTtsServerResponse | undefined => {
+  const trimmed = line.trim()
+  if (!trimmed.startsWith('{') || !trimmed.endsWith('}')) {
+    return undefined
+  }
+
+  let parsed: unknown
+  try {
+    parsed = JSON.parse(trimmed)
+  } catch {
+    return undefined
+  }
+
+  const result = v.safeParse(KittenTtsServerResponseSchema, parsed)
+  return result.success ? result.output : undefined
+}
+
+const KittenTtsChunkProgressSchema = v.object({
+  event: v.literal('chunk'),
+  chunk: v.number(),
+  chunkCount: v.number(),
+  durationSeconds: v.number()
+})
+
+export const parseKittenTtsChunkProgress = (line: string): v.InferOutput<typeof KittenTtsChunkProgressSchema> | undefined => {
+  const trimmed = line.trim()
+  if (!trimmed.startsWith('{"event"')) {
+    return undefined
+  }
+
+  try {
+    const result = v.safeParse(KittenTtsChunkProgressSchema, JSON.parse(trimmed))
+    return result.success ? result.output : undefined
+  } catch {
+    return undefined
+  }
+}
+
+export const logKittenTtsChunkProgress = (progress: Pick<KittenTtsServerResponse, 'chunk' | 'chunkCount' | 'durationSeconds'>): void => {
+  l.debug(`Kitten TTS chunk ${progress.chunk ?? '?'}/${progress.chunkCount ?? '?'} written (${progress.durationSeconds ?? 0}s of audio)`)
+}
+
+export const isKittenTtsWorkerEnabled = (): boolean =>
+  !['0', 'false', 'off', 'no'].includes((process.env['AUTOSHOW_KITTEN_TTS_WORKER'] ?? '').trim().toLowerCase())
+
+export const startKittenTtsWorker = (): KittenTtsWorker =>
+  startJsonLinesWorker<KittenTtsJob, KittenTtsServerResponse, KittenTtsWorkerResult>({
+    name: 'Kitten TTS server',
+    command: [`${kittenTtsUvEnvDir}/bin/python`, SCRIPT_PATH, '--server'],
+    unref: true,
+    parseResponse: parseKittenTtsServerResponse,
+    toResult: (response, output) => {
+      if (response.event === 'chunk') {
+        logKittenTtsChunkProgress(response)
+        return undefined
+      }
+
+      if (response.error !== undefined) {
+        return { ok: false, stderr: appendOutputTail(output.stdout + output.stderr, `${response.error}\n`), exitCode: 1 }
+      }
+
+      const { id: _id, error: _error, event: _event, chunk: _chunk, ...result } = response
+      return { ok: true, stdout: JSON.stringify(result) }
+    },
+    toFailure: (message, exitCode, output) => ({
+      ok: false,
+      stderr: appendOutputTail(output.stdout + output.stderr, `${message}\n`),
+      exitCode
+    }),
+    onStderrLine: (line) => {
+      if (!line.startsWith('[kitten-tts]')) {
+        return false
+      }
+      l.debug(line)
+      return true
+    }
+  })
+
+const sharedWorker = createSharedJsonLinesWorker<KittenTtsJob, KittenTtsWorkerResult>('AUTOSHOW_KITTEN_TTS_WORKER_IDLE_MS')
+
+export const runKittenTtsJob = async (job: KittenTtsJob): Promise<KittenTtsWorkerResult> =>
+  await sharedWorker.run('', startKittenTtsWorker, job)
+
+export const closeKittenTtsWorker = async (): Promise<void> => {
+  await sharedWorker.close()
+}
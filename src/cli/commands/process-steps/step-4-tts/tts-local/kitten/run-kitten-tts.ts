@@ -12,9 +12,24 @@ import type { KittenTtsModel } from '~/types'
 import {
   resolveKittenTtsModelId
 } from '~/cli/commands/setup-and-utilities/models/model-options'
+import {
+  isKittenTtsWorkerEnabled,
+  logKittenTtsChunkProgress,
+  parseKittenTtsChunkProgress,
+  runKittenTtsJob
+} from './kitten-tts-worker'
 
 const SCRIPT_PATH = resolve(import.meta.dir, 'scripts/run-kitten-tts.py')
 
+const runKittenTtsServerJob = async (
+  job: Parameters<typeof runKittenTtsJob>[0]
+): Promise<{ stdout: string, stderr: string, exitCode: number }> => {
+  const result = await runKittenTtsJob(job)
+  return result.ok
+    ? { stdout: result.stdout, stderr: '', exitCode: 0 }
+    : { stdout: '', stderr: result.stderr, exitCode: result.exitCode }
+}
+
 export const runKittenTts = async (
   text: string,
   outputDir: string,
@@ -41,13 +56,22 @@ export const runKittenTts = async (
     status: 'started',
     detail: `speaker: ${options.speaker}`
   })
-  const result = await exec(pythonPath, [
-    SCRIPT_PATH,
-    '--model', hfModelId,
-    '--input', textPath,
-    '--output', audioPath,
-    '--voice', options.speaker
-  ])
+  const result = isKittenTtsWorkerEnabled()
+    ? await runKittenTtsServerJob({ model: hfModelId, input: textPath, output: audioPath, voice: options.speaker })
+    : await exec(pythonPath, [
+        SCRIPT_PATH,
+        '--model', hfModelId,
+        '--input', textPath,
+        '--output', audioPath,
+        '--voice', options.speaker
+      ], {
+        onStdoutLine: (line) => {
+          const progress = parseKittenTtsChunkProgress(line)
+          if (progress) {
+            logKittenTtsChunkProgress(progress)
+          }
+        }
+      })
 
   if (result.stderr) {
     const stderrLines = result.stderr.split('\n').filter((line: string) => line.trim())
@@ -85,11 +109,16 @@ export const runKittenTts = async (
 
   const lastLine = result.stdout.trim().split('\n').pop() ?? ''
   let chunkCount = 1
+  let chunkCache: { chunkCacheHits?: number, chunkCacheMisses?: number } = {}
   if (lastLine.startsWith('{')) {
     try {
       const scriptOutput = validateData(TtsScriptOutputSchema, JSON.parse(lastLine), 'TTS script output')
       chunkCount = scriptOutput.chunkCount
       l.debug(`Generated ${scriptOutput.durationSeconds}s of audio in ${scriptOutput.chunkCount} chunk(s)`)
+      if (scriptOutput.cacheHits !== undefined && scriptOutput.cacheMisses !== undefined) {
+        chunkCache = { chunkCacheHits: scriptOutput.cacheHits, chunkCacheMisses: scriptOutput.cacheMisses }
+        l.debug(`Kitten TTS chunk cache: ${scriptOutput.cacheHits} hit(s), ${scriptOutput.cacheMisses} miss(es)`)
+      }
     } catch {
       l.warn('Could not parse Kitten TTS script metadata from stdout')
     }
@@ -101,6 +130,7 @@ export const runKittenTts = async (
     speaker: options.speaker,
     audioPath,
     chunkCount,
+    ...chunkCache,
     startTime
   })
 }
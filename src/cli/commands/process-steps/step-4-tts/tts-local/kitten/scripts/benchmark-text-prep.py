@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+WORDS = "the quick brown fox jumps over a lazy dog while narrators read show notes aloud".split()
+
+def load_kitten_script():
+    path = Path(__file__).with_name("run-kitten-tts.py")
+    spec = importlib.util.spec_from_file_location("run_kitten_tts", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def legacy_strip_markdown(text: str) -> str:
+    text = re.sub(r"```[\s\S]*?```", "", text)
+    text = re.sub(r"`[^`]+`", "", text)
+    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\*{1,3}([^*]+)\*{1,3}", r"\1", text)
+    text = re.sub(r"_{1,3}([^_]+)_{1,3}", r"\1", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    text = re.sub(r"https?://\S+", "", text)
+    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^>\s*", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^[\s]*[-*+]\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"^[\s]*\d+\.\s+", "", text, flags=re.MULTILINE)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+def legacy_chunk_text(text: str, max_chars: int) -> list[str]:
+    paragraphs = [p.strip() for p in re.split(r"\n{2,}", text) if p.strip()]
+    chunks: list[str] = []
+    for para in paragraphs:
+        if len(para) <= max_chars:
+            chunks.append(para)
+            continue
+        current = ""
+        for sent in re.split(r"(?<=[.!?])\s+", para):
+            sent = sent.strip()
+            if not sent:
+                continue
+            if len(current) + len(sent) + 1 <= max_chars:
+                current = f"{current} {sent}".strip() if current else sent
+            else:
+                if current:
+                    chunks.append(current)
+                current = sent
+        if current:
+            chunks.append(current)
+    return [c for c in chunks if c]
+
+def sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 18))
+    if rng.random() < 0.3:
+        index = rng.randrange(len(words))
+        words[index] = f"**{words[index]}**"
+    if rng.random() < 0.15:
+        words.append(f"[{rng.choice(WORDS)}](https://example.com/{rng.choice(WORDS)})")
+    return " ".join(words).capitalize() + rng.choice(".!?")
+
+def block(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.1:
+        return f"## {sentence(rng)[:-1]}"
+    if kind < 0.3:
+        return "\n".join(f"- {sentence(rng)}" for _ in range(rng.randint(2, 5)))
+    if kind < 0.4:
+        return "\n".join(f"{index}. {sentence(rng)}" for index in range(1, rng.randint(3, 6)))
+    if kind < 0.45:
+        return "```\nconst value = `example`\n```"
+    if kind < 0.5:
+        return f"> {sentence(rng)}"
+    return " ".join(sentence(rng) for _ in range(rng.randint(2, 8)))
+
+def synthetic_markdown(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    blocks: list[str] = []
+    total = 0
+    while total < size:
+        value = block(rng)
+        blocks.append(value)
+        total += len(value) + 2
+    return "\n\n".join(blocks)[:size].rsplit("\n", 1)[0] + "\n"
+
+def measure(fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Kitten TTS markdown stripping and chunking")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES))
+    parser.add_argument("--max-chunk-chars", type=int, default=450)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    kitten = load_kitten_script()
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(value) for value in args.sizes.split(",")):
+            input_path = Path(tmp) / f"input-{size}.md"
+            input_path.write_text(synthetic_markdown(size, args.seed), encoding="utf-8")
+
+            def run_legacy():
+                text = input_path.read_text(encoding="utf-8").strip()
+                return legacy_chunk_text(legacy_strip_markdown(text), args.max_chunk_chars)
+
+            def run_streaming():
+                with open(input_path, encoding="utf-8") as handle:
+                    lines = kitten.iter_clean_lines(kitten.trim_lines(kitten.iter_text_lines(handle)))
+                    return [hashlib.sha1(chunk.encode("utf-8")).digest() for chunk in kitten.iter_chunks(lines, max_chars=args.max_chunk_chars)]
+
+            legacy_chunks, legacy_seconds, legacy_peak = measure(run_legacy)
+            legacy_chunks = [hashlib.sha1(chunk.encode("utf-8")).digest() for chunk in legacy_chunks]
+            streaming_chunks, streaming_seconds, streaming_peak = measure(run_streaming)
+            rows.append(
+                {
+                    "bytes": input_path.stat().st_size,
+                    "chunks": len(streaming_chunks),
+                    "identical": legacy_chunks == streaming_chunks,
+                    "legacySeconds": round(legacy_seconds, 4),
+                    "streamingSeconds": round(streaming_seconds, 4),
+                    "legacyPeakBytes": legacy_peak,
+                    "streamingPeakBytes": streaming_peak,
+                }
+            )
+            print(json.dumps(rows[-1]), flush=True)
+
+    if not all(row["identical"] for row in rows):
+        raise SystemExit("streaming chunker output differs from the legacy regex pipeline")
+
+if __name__ == "__main__":
+    main()
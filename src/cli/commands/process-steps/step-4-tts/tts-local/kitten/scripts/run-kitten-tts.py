@@ -1,134 +1,824 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
 import re
 import sys
+from collections import deque
+from itertools import chain
 from pathlib import Path
 
-def strip_markdown(text: str) -> str:
-    text = re.sub(r"```[\s\S]*?```", "", text)
+SAMPLE_RATE = 24000
+CHUNK_GAP_SECONDS = 0.3
+TURN_GAP_SECONDS = 0.6
+KITTEN_VOICES = ("Bella", "Jasper", "Luna", "Bruno", "Rosie", "Hugo", "Kiki", "Leo")
+SFC_UPDATE_HEADER_NOW = 0x1060
+OUTPUT_FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "opus": ("OGG", "OPUS"),
+}
+OUTPUT_FORMAT_EXTENSIONS = {".wav": "wav", ".flac": "flac", ".opus": "opus", ".ogg": "opus"}
+CHUNK_CACHE_SCHEMA_VERSION = 1
+CHUNK_CACHE_PRUNE_EVERY_WRITES = 64
 
-    text = re.sub(r"`[^`]+`", "", text)
+FENCE_PATTERN = re.compile(r"```[\s\S]*?```")
+INLINE_CODE_PATTERN = re.compile(r"`[^`]+`")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+", re.MULTILINE)
+BOLD_PATTERN = re.compile(r"\*{1,3}([^*]+)\*{1,3}")
+UNDERSCORE_PATTERN = re.compile(r"_{1,3}([^_]+)_{1,3}")
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+URL_PATTERN = re.compile(r"https?://\S+")
+RULE_PATTERN = re.compile(r"^[-*_]{3,}\s*$", re.MULTILINE)
+QUOTE_PATTERN = re.compile(r"^>\s*", re.MULTILINE)
+BULLET_PATTERN = re.compile(r"^[\s]*[-*+]\s+", re.MULTILINE)
+NUMBERED_PATTERN = re.compile(r"^[\s]*\d+\.\s+", re.MULTILINE)
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
 
-    text = re.sub(r"^#{1,6}\s+", "", text, flags=re.MULTILINE)
+HEADING_ONLY_PATTERN = re.compile(r"#{1,6}\s*")
+RULE_ONLY_PATTERN = re.compile(r"[-*_]{3,}\s*")
+QUOTE_ONLY_PATTERN = re.compile(r">\s*")
+BULLET_ONLY_PATTERN = re.compile(r"\s*[-*+]\s*")
+NUMBERED_ONLY_PATTERN = re.compile(r"\s*\d+\.\s*")
 
-    text = re.sub(r"\*{1,3}([^*]+)\*{1,3}", r"\1", text)
-    text = re.sub(r"_{1,3}([^_]+)_{1,3}", r"\1", text)
+# Each cleaning stage holds back only the lines a pending cross-line match
+# could still consume, so whole-document regex semantics survive streaming.
 
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+def iter_text_lines(handle):
+    ended_with_newline = False
+    for line in handle:
+        ended_with_newline = line.endswith("\n")
+        yield line[:-1] if ended_with_newline else line
+    if ended_with_newline:
+        yield ""
 
-    text = re.sub(r"https?://\S+", "", text)
+def trim_lines(lines):
+    last = None
+    blank: list[str] = []
+    for line in lines:
+        if not line.strip():
+            if last is not None:
+                blank.append(line)
+            continue
+        if last is None:
+            line = line.lstrip()
+        else:
+            yield last
+            yield from blank
+            blank = []
+        last = line
+    if last is not None:
+        yield last.rstrip()
 
-    text = re.sub(r"^[-*_]{3,}\s*$", "", text, flags=re.MULTILINE)
+def substitute_lines(lines, pattern, repl, is_settled, may_start, may_settle=None):
+    held: list[str] = []
+    for line in lines:
+        if not held:
+            if not may_start(line):
+                yield line
+                continue
+        elif may_settle is not None and not may_settle(line):
+            held.append(line)
+            continue
+        held.append(line)
+        if not is_settled(held):
+            continue
+        yield from pattern.sub(repl, "\n".join(held)).split("\n")
+        held = []
+    if held:
+        yield from pattern.sub(repl, "\n".join(held)).split("\n")
 
-    text = re.sub(r"^>\s*", "", text, flags=re.MULTILINE)
+def fences_settled(held: list[str]) -> bool:
+    text = "\n".join(held)
+    start = text.find("```")
+    while start >= 0:
+        end = text.find("```", start + 3)
+        if end < 0:
+            return False
+        start = text.find("```", end + 3)
+    return True
 
-    text = re.sub(r"^[\s]*[-*+]\s+", "", text, flags=re.MULTILINE)
+def inline_code_settled(held: list[str]) -> bool:
+    text = "\n".join(held)
+    start = text.find("`")
+    while start >= 0:
+        if text.startswith("`", start + 1):
+            start += 1
+            continue
+        end = text.find("`", start + 1)
+        if end < 0:
+            return False
+        start = text.find("`", end + 1)
+    return True
 
-    text = re.sub(r"^[\s]*\d+\.\s+", "", text, flags=re.MULTILINE)
+def paired_runs_settled(char: str):
+    run_pattern = re.compile(re.escape(char) + "+")
 
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text.strip()
+    def settled(held: list[str]) -> bool:
+        open_run = False
+        for line in held:
+            for run in run_pattern.finditer(line):
+                open_run = not open_run or len(run.group()) > 3
+        return not open_run
 
-def chunk_text(text: str, max_chars: int = 450) -> list[str]:
-    paragraphs = [p.strip() for p in re.split(r"\n{2,}", text) if p.strip()]
-    chunks: list[str] = []
+    return settled
+
+def links_settled(held: list[str]) -> bool:
+    text = "\n".join(held)
+    start = text.find("[")
+    while start >= 0:
+        close = text.find("]", start + 1)
+        if close < 0:
+            return False
+        if close > start + 1 and text.startswith("(", close + 1):
+            end = text.find(")", close + 2)
+            if end < 0:
+                return False
+            if end > close + 2:
+                start = text.find("[", end + 1)
+                continue
+        start = text.find("[", start + 1)
+    return True
+
+def last_content_line(held: list[str]) -> str | None:
+    for line in reversed(held):
+        if line.strip():
+            return line
+    return None
+
+def prefix_settled(only_pattern):
+    def settled(held: list[str]) -> bool:
+        line = last_content_line(held)
+        return line is None or only_pattern.fullmatch(line) is None
+
+    return settled
+
+def list_marker_settled(only_pattern):
+    def settled(held: list[str]) -> bool:
+        return bool(held[-1].strip()) and only_pattern.fullmatch(held[-1]) is None
+
+    return settled
+
+def has_backtick(line: str) -> bool:
+    return "`" in line
+
+def has_link_delimiter(line: str) -> bool:
+    return "[" in line or "]" in line or ")" in line
+
+def may_start_list_item(line: str) -> bool:
+    head = line.lstrip()[:1]
+    return not head or head in "-*+"
 
-    for para in paragraphs:
+def may_start_numbered_item(line: str) -> bool:
+    head = line.lstrip()[:1]
+    return not head or head.isdigit()
+
+def iter_clean_lines(lines):
+    lines = substitute_lines(lines, FENCE_PATTERN, "", fences_settled, has_backtick, has_backtick)
+    lines = substitute_lines(lines, INLINE_CODE_PATTERN, "", inline_code_settled, has_backtick, has_backtick)
+    lines = substitute_lines(lines, HEADING_PATTERN, "", prefix_settled(HEADING_ONLY_PATTERN), lambda line: line.startswith("#"))
+    lines = substitute_lines(lines, BOLD_PATTERN, r"\1", paired_runs_settled("*"), lambda line: "*" in line, lambda line: "*" in line)
+    lines = substitute_lines(lines, UNDERSCORE_PATTERN, r"\1", paired_runs_settled("_"), lambda line: "_" in line, lambda line: "_" in line)
+    lines = substitute_lines(lines, LINK_PATTERN, r"\1", links_settled, lambda line: "[" in line, has_link_delimiter)
+    lines = (URL_PATTERN.sub("", line) if "http" in line else line for line in lines)
+    lines = substitute_lines(lines, RULE_PATTERN, "", prefix_settled(RULE_ONLY_PATTERN), lambda line: line.startswith(("-", "*", "_")))
+    lines = substitute_lines(lines, QUOTE_PATTERN, "", prefix_settled(QUOTE_ONLY_PATTERN), lambda line: line.startswith(">"))
+    lines = substitute_lines(lines, BULLET_PATTERN, "", list_marker_settled(BULLET_ONLY_PATTERN), may_start_list_item)
+    lines = substitute_lines(lines, NUMBERED_PATTERN, "", list_marker_settled(NUMBERED_ONLY_PATTERN), may_start_numbered_item)
+    return lines
+
+def strip_markdown(text: str) -> str:
+    cleaned = "\n".join(iter_clean_lines(trim_lines(text.split("\n"))))
+    return re.sub(r"\n{3,}", "\n\n", cleaned).strip()
+
+def iter_paragraphs(lines):
+    paragraph: list[str] = []
+    for line in lines:
+        if line:
+            paragraph.append(line)
+            continue
+        text = "\n".join(paragraph).strip()
+        paragraph = []
+        if text:
+            yield text
+    text = "\n".join(paragraph).strip()
+    if text:
+        yield text
+
+def split_long_sentence(sentence: str, max_chars: int):
+    current = ""
+    for word in sentence.split():
+        while len(word) > max_chars:
+            if current:
+                yield current
+                current = ""
+            yield word[:max_chars]
+            word = word[max_chars:]
+        if not current:
+            current = word
+        elif len(current) + len(word) + 1 <= max_chars:
+            current = f"{current} {word}"
+        else:
+            yield current
+            current = word
+    if current:
+        yield current
+
+def iter_chunks(lines, max_chars: int = 450):
+    for para in iter_paragraphs(lines):
         if len(para) <= max_chars:
-            chunks.append(para)
+            yield para
             continue
 
-        sentences = re.split(r"(?<=[.!?])\s+", para)
         current = ""
-        for sent in sentences:
+        for sent in SENTENCE_SPLIT_PATTERN.split(para):
             sent = sent.strip()
             if not sent:
                 continue
-            if len(current) + len(sent) + 1 <= max_chars:
-                current = f"{current} {sent}".strip() if current else sent
-            else:
-                if current:
-                    chunks.append(current)
-                current = sent
+            pieces = split_long_sentence(sent, max_chars) if len(sent) > max_chars else (sent,)
+            for piece in pieces:
+                if current and len(current) + len(piece) + 1 <= max_chars:
+                    current = f"{current} {piece}"
+                else:
+                    if current:
+                        yield current
+                    current = piece
         if current:
-            chunks.append(current)
+            yield current
 
-    return [c for c in chunks if c]
+def chunk_text(text: str, max_chars: int = 450) -> list[str]:
+    return list(iter_chunks(text.split("\n"), max_chars))
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Kitten TTS inference script")
-    parser.add_argument("--model", required=True, help="HuggingFace model ID")
-    parser.add_argument("--input", required=True, help="Path to input text file")
-    parser.add_argument("--output", required=True, help="Path for output WAV file")
-    parser.add_argument(
-        "--voice", default="Jasper", help="Voice name (default: Jasper)"
-    )
-    parser.add_argument(
-        "--max-chunk-chars", type=int, default=450, help="Max chars per TTS chunk"
-    )
-    args = parser.parse_args()
+def load_model(models: dict, model_id: str):
+    if model_id not in models:
+        print(
+            f"[kitten-tts] loading model {model_id}...",
+            file=sys.stderr,
+            flush=True,
+        )
+        from kittentts import KittenTTS
 
-    raw_text = Path(args.input).read_text(encoding="utf-8").strip()
-    if not raw_text:
-        print(json.dumps({"error": "Input file is empty"}), file=sys.stderr)
-        sys.exit(1)
+        models[model_id] = KittenTTS(model_id)
+        print(f"[kitten-tts] model loaded", file=sys.stderr, flush=True)
+    return models[model_id]
 
-    clean_text = strip_markdown(raw_text)
-    chunks = chunk_text(clean_text, max_chars=args.max_chunk_chars)
-    if not chunks:
-        print(json.dumps({"error": "No text chunks after processing"}), file=sys.stderr)
-        sys.exit(1)
+def parse_workers(value) -> int:
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
 
-    import numpy as np
+_worker_model = None
 
-    print(
-        f"[kitten-tts] loading model {args.model}...",
-        file=sys.stderr,
-        flush=True,
-    )
+def cap_onnx_threads(threads: int) -> None:
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return
+
+    base_session = ort.InferenceSession
+
+    class ThreadCappedSession(base_session):
+        def __init__(self, path_or_bytes, sess_options=None, *args, **kwargs):
+            sess_options = sess_options or ort.SessionOptions()
+            sess_options.intra_op_num_threads = threads
+            super().__init__(path_or_bytes, sess_options, *args, **kwargs)
+
+    ort.InferenceSession = ThreadCappedSession
+
+def init_chunk_worker(model_id: str, threads: int) -> None:
+    global _worker_model
+    cap_onnx_threads(threads)
     from kittentts import KittenTTS
 
-    model = KittenTTS(args.model)
-    print(f"[kitten-tts] model loaded", file=sys.stderr, flush=True)
+    _worker_model = KittenTTS(model_id)
+
+def generate_chunk(chunk: str, voice: str):
+    import numpy as np
+
+    return np.asarray(_worker_model.generate(chunk, voice=voice), dtype=np.float32)
 
-    all_wavs: list = []
-    sr: int = 24000
+def get_pool(pools: dict, model_id: str, workers: int):
+    key = (model_id, workers)
+    if key not in pools:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
 
-    for i, chunk in enumerate(chunks):
         print(
-            f"[kitten-tts] chunk {i + 1}/{len(chunks)}: {chunk[:60]}...",
+            f"[kitten-tts] starting {workers} synthesis workers for {model_id}...",
             file=sys.stderr,
+            flush=True,
+        )
+        threads = max(1, (os.cpu_count() or workers) // workers)
+        pools[key] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_chunk_worker,
+            initargs=(model_id, threads),
+        )
+    return pools[key]
+
+def close_pools(pools: dict) -> None:
+    for pool in pools.values():
+        pool.shutdown(cancel_futures=True)
+    pools.clear()
+
+def iter_chunk_audio(models: dict, pools: dict, model_id: str, chunks: list[str], voices: list[str], workers: int):
+    if workers <= 1 or len(chunks) <= 1:
+        import numpy as np
+
+        model = load_model(models, model_id)
+        for chunk, voice in zip(chunks, voices):
+            yield np.asarray(model.generate(chunk, voice=voice), dtype=np.float32)
+        return
+
+    pool = get_pool(pools, model_id, workers)
+    remaining = zip(chunks, voices)
+    pending = deque()
+    for chunk, voice in remaining:
+        pending.append(pool.submit(generate_chunk, chunk, voice))
+        if len(pending) >= workers * 2:
+            break
+
+    while pending:
+        audio = pending.popleft().result()
+        next_item = next(remaining, None)
+        if next_item is not None:
+            pending.append(pool.submit(generate_chunk, *next_item))
+        yield audio
+
+def open_chunk_cache() -> dict | None:
+    if os.environ.get("AUTOSHOW_KITTEN_TTS_CACHE", "1").strip().lower() in ("0", "false", "off", "no"):
+        return None
+
+    root = os.environ.get("AUTOSHOW_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "autoshow-cli")
+    try:
+        max_mb = max(1, int(os.environ.get("AUTOSHOW_KITTEN_TTS_CACHE_MAX_MB", "512")))
+    except ValueError:
+        max_mb = 512
+    cache = {
+        "dir": os.path.join(root, "kitten-tts"),
+        "maxBytes": max_mb * 1024 * 1024,
+        "writes": 0,
+    }
+    prune_chunk_cache(cache)
+    return cache
+
+def normalize_chunk_text(chunk: str) -> str:
+    return " ".join(chunk.split())
+
+def chunk_cache_path(cache: dict, model_id: str, voice: str, chunk: str) -> str:
+    key = json.dumps(
+        [CHUNK_CACHE_SCHEMA_VERSION, model_id, voice, SAMPLE_RATE, normalize_chunk_text(chunk)],
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache["dir"], digest[:2], f"{digest}.f32")
+
+def read_cached_chunk(path: str):
+    import numpy as np
+
+    try:
+        audio = np.fromfile(path, dtype=np.float32)
+        os.utime(path, None)
+    except OSError:
+        return None
+    return audio if len(audio) > 0 else None
+
+def cached_chunk_exists(path: str) -> bool:
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+def write_cached_chunk(cache: dict, path: str, audio) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        audio.tofile(temp_path)
+        os.replace(temp_path, path)
+    except OSError as error:
+        print(f"[kitten-tts] chunk cache write failed: {error}", file=sys.stderr)
+        return
+
+    cache["writes"] += 1
+    if cache["writes"] % CHUNK_CACHE_PRUNE_EVERY_WRITES == 0:
+        prune_chunk_cache(cache)
+
+def prune_chunk_cache(cache: dict) -> None:
+    entries = []
+    total_bytes = 0
+    for dir_path, _, file_names in os.walk(cache["dir"]):
+        for file_name in file_names:
+            path = os.path.join(dir_path, file_name)
+            try:
+                stats = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stats.st_mtime, stats.st_size, path))
+            total_bytes += stats.st_size
+
+    if total_bytes <= cache["maxBytes"]:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_bytes -= size
+        if total_bytes <= cache["maxBytes"]:
+            break
+
+def iter_cached_chunk_audio(
+    models: dict,
+    pools: dict,
+    cache: dict | None,
+    model_id: str,
+    chunks: list[str],
+    voices: list[str],
+    workers: int,
+    stats: dict,
+):
+    if cache is None:
+        stats["misses"] += len(chunks)
+        yield from iter_chunk_audio(models, pools, model_id, chunks, voices, workers)
+        return
+
+    paths = [chunk_cache_path(cache, model_id, voice, chunk) for chunk, voice in zip(chunks, voices)]
+    # Only probe the cache here; cached PCM is read one chunk at a time in the
+    # loop below so a mostly-cached render does not hold the whole speech.
+    hits = [cached_chunk_exists(path) for path in paths]
+    misses = [index for index, hit in enumerate(hits) if not hit]
+    synthesized = (
+        iter_chunk_audio(
+            models,
+            pools,
+            model_id,
+            [chunks[index] for index in misses],
+            [voices[index] for index in misses],
+            workers,
+        )
+        if misses
+        else iter(())
+    )
+
+    for index, (path, hit) in enumerate(zip(paths, hits)):
+        audio = read_cached_chunk(path) if hit else None
+        if audio is not None:
+            stats["hits"] += 1
+            yield audio
+            continue
+
+        if hit:
+            # Evicted or unreadable since the probe: synthesize just this chunk.
+            audio = next(iter_chunk_audio(models, pools, model_id, [chunks[index]], [voices[index]], 1))
+        else:
+            audio = next(synthesized)
+        stats["misses"] += 1
+        write_cached_chunk(cache, path, audio)
+        yield audio
+
+def resolve_output_format(output_path: str, output_format: str | None) -> str:
+    value = (output_format or "auto").strip().lower()
+    if value == "auto":
+        return OUTPUT_FORMAT_EXTENSIONS.get(Path(output_path).suffix.lower(), "wav")
+    if value not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format} (expected auto, {', '.join(OUTPUT_FORMATS)})")
+    return value
+
+def update_header(handle) -> None:
+    import soundfile as sf
+
+    try:
+        sf._snd.sf_command(handle._file, SFC_UPDATE_HEADER_NOW, sf._ffi.NULL, 0)
+    except Exception:
+        handle.flush()
+
+def read_text_chunks(input_path: str, max_chunk_chars: int) -> list[str]:
+    with open(input_path, encoding="utf-8") as handle:
+        lines = trim_lines(iter_text_lines(handle))
+        first_line = next(lines, None)
+        if first_line is None:
+            raise ValueError("Input file is empty")
+
+        return list(iter_chunks(iter_clean_lines(chain((first_line,), lines)), max_chars=max_chunk_chars))
+
+def normalize_speaker(speaker: str) -> str:
+    return " ".join(speaker.split()).upper()
+
+def parse_speaker_voices(values) -> dict:
+    speaker_voices = {}
+    for value in values or []:
+        speaker, separator, voice = value.partition("=")
+        if not separator or not speaker.strip() or not voice.strip():
+            raise ValueError(f"Invalid speaker voice mapping (expected SPEAKER=VOICE): {value}")
+        speaker_voices[normalize_speaker(speaker)] = voice.strip()
+    return speaker_voices
+
+def read_dialogue_turns(
+    input_path: str,
+    max_chunk_chars: int,
+    default_voice: str,
+    speaker_voices: dict,
+    turn_gap_seconds: float,
+) -> list[dict]:
+    try:
+        raw_turns = json.loads(Path(input_path).read_text(encoding="utf-8"))
+    except json.JSONDecodeError as error:
+        raise ValueError(f"Dialogue input is not valid JSON: {error}") from error
+    if not isinstance(raw_turns, list) or not raw_turns:
+        raise ValueError("Dialogue input must be a non-empty JSON list of {speaker, text} turns")
+
+    voices = dict(speaker_voices)
+    unused_voices = [voice for voice in dict.fromkeys((default_voice, *KITTEN_VOICES)) if voice not in voices.values()]
+    turns = []
+    for index, raw_turn in enumerate(raw_turns, start=1):
+        if not isinstance(raw_turn, dict) or not isinstance(raw_turn.get("speaker"), str) or not isinstance(raw_turn.get("text"), str):
+            raise ValueError(f"Dialogue turn {index} must be an object with string speaker and text")
+
+        speaker = raw_turn["speaker"].strip()
+        key = normalize_speaker(speaker)
+        if key not in voices:
+            voices[key] = unused_voices.pop(0) if unused_voices else default_voice
+        chunks = list(iter_chunks(iter_clean_lines(trim_lines(raw_turn["text"].split("\n"))), max_chars=max_chunk_chars))
+        if not chunks:
+            raise ValueError(f"Dialogue turn {index} ({speaker}) has no text after processing")
+
+        gap_seconds = raw_turn.get("gapSeconds", turn_gap_seconds)
+        if not isinstance(gap_seconds, (int, float)) or gap_seconds < 0:
+            raise ValueError(f"Dialogue turn {index} has an invalid gapSeconds value")
+
+        turns.append(
+            {
+                "speaker": speaker,
+                "voice": raw_turn.get("voice") or voices[key],
+                "chunks": chunks,
+                "gapSeconds": float(gap_seconds),
+            }
         )
-        audio = model.generate(chunk, voice=args.voice)
-        all_wavs.append(np.array(audio, dtype=np.float32))
+    return turns
 
-    silence = np.zeros(int(sr * 0.3), dtype=np.float32)
-    parts: list = []
-    for idx, wav in enumerate(all_wavs):
-        parts.append(wav)
-        if idx < len(all_wavs) - 1:
-            parts.append(silence)
+def turn_timings_path(output_path: str) -> str:
+    return str(Path(output_path).with_suffix(".turns.json"))
 
-    combined = np.concatenate(parts) if len(parts) > 1 else parts[0]
+def synthesize(
+    models: dict,
+    model_id: str,
+    input_path: str,
+    output_path: str,
+    voice: str,
+    max_chunk_chars: int,
+    on_progress=None,
+    workers: int = 1,
+    pools: dict | None = None,
+    cache: dict | None = None,
+    dialogue: bool = False,
+    speaker_voices: dict | None = None,
+    turn_gap_seconds: float = TURN_GAP_SECONDS,
+    output_format: str | None = None,
+) -> dict:
+    resolved_format = resolve_output_format(output_path, output_format)
+    if dialogue:
+        turns = read_dialogue_turns(input_path, max_chunk_chars, voice, speaker_voices or {}, turn_gap_seconds)
+    else:
+        turns = [{"voice": voice, "chunks": read_text_chunks(input_path, max_chunk_chars), "gapSeconds": 0.0}]
 
+    chunks = [chunk for turn in turns for chunk in turn["chunks"]]
+    if not chunks:
+        raise ValueError("No text chunks after processing")
+    voices = [turn["voice"] for turn in turns for _ in turn["chunks"]]
+    gaps = [
+        turn["gapSeconds"] if chunk_index == 0 else CHUNK_GAP_SECONDS
+        for turn in turns
+        for chunk_index in range(len(turn["chunks"]))
+    ]
+    turn_indexes = [turn_index for turn_index, turn in enumerate(turns) for _ in turn["chunks"]]
+
+    import numpy as np
     import soundfile as sf
 
-    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
-    sf.write(args.output, combined, sr)
+    sr = SAMPLE_RATE
+    silences: dict = {}
+    frames = 0
+    turn_frames = [[None, None] for _ in turns]
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    container, subtype = OUTPUT_FORMATS[resolved_format]
+    with sf.SoundFile(output_path, "w", samplerate=sr, channels=1, format=container, subtype=subtype) as handle:
+        cache_stats = {"hits": 0, "misses": 0}
+        audio_chunks = iter_cached_chunk_audio(
+            models,
+            pools if pools is not None else {},
+            cache,
+            model_id,
+            chunks,
+            voices,
+            workers,
+            cache_stats,
+        )
+        for i, (chunk, audio) in enumerate(zip(chunks, audio_chunks)):
+            print(
+                f"[kitten-tts] chunk {i + 1}/{len(chunks)}: {chunk[:60]}...",
+                file=sys.stderr,
+            )
+            if i > 0:
+                if gaps[i] not in silences:
+                    silences[gaps[i]] = np.zeros(int(sr * gaps[i]), dtype=np.float32)
+                handle.write(silences[gaps[i]])
+                frames += len(silences[gaps[i]])
+            span = turn_frames[turn_indexes[i]]
+            if span[0] is None:
+                span[0] = frames
+            handle.write(audio)
+            frames += len(audio)
+            span[1] = frames
+            if container == "WAV":
+                update_header(handle)
 
-    duration = len(combined) / sr
+            if on_progress is not None:
+                on_progress(
+                    {
+                        "event": "chunk",
+                        "chunk": i + 1,
+                        "chunkCount": len(chunks),
+                        "durationSeconds": round(frames / sr, 2),
+                    }
+                )
 
-    print(
-        json.dumps(
+    output = {
+        "format": resolved_format,
+        "sampleRate": sr,
+        "chunkCount": len(chunks),
+        "durationSeconds": round(frames / sr, 2),
+        "cacheHits": cache_stats["hits"],
+        "cacheMisses": cache_stats["misses"],
+    }
+    if dialogue:
+        timings_path = turn_timings_path(output_path)
+        timings = [
             {
-                "sampleRate": sr,
-                "chunkCount": len(chunks),
-                "durationSeconds": round(duration, 2),
+                "turn": turn_index + 1,
+                "speaker": turn["speaker"],
+                "voice": turn["voice"],
+                "startSeconds": round(start / sr, 3),
+                "endSeconds": round(end / sr, 3),
+                "chunkCount": len(turn["chunks"]),
             }
+            for turn_index, (turn, (start, end)) in enumerate(zip(turns, turn_frames))
+        ]
+        Path(timings_path).write_text(
+            json.dumps({"sampleRate": sr, "durationSeconds": output["durationSeconds"], "turns": timings}, indent=2) + "\n",
+            encoding="utf-8",
         )
+        output["turnCount"] = len(turns)
+        output["timingsPath"] = timings_path
+    return output
+
+def write_message(stream, message: dict) -> None:
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+def run_server(
+    default_model: str | None,
+    default_voice: str,
+    default_max_chunk_chars: int,
+    default_workers: int,
+    default_turn_gap_seconds: float,
+    default_format: str | None,
+) -> None:
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    models: dict = {}
+    pools: dict = {}
+    cache = open_chunk_cache()
+
+    if default_model and default_workers <= 1:
+        load_model(models, default_model)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except Exception as error:
+            write_message(protocol_out, {"id": None, "error": f"Invalid server request: {error}"})
+            continue
+
+        request_id = request.get("id")
+        try:
+            model_id = request.get("model") or default_model
+            if not model_id:
+                raise ValueError("Request is missing a model")
+            output = synthesize(
+                models,
+                model_id,
+                request["input"],
+                request["output"],
+                request.get("voice") or default_voice,
+                int(request.get("maxChunkChars") or default_max_chunk_chars),
+                lambda progress: write_message(protocol_out, {**progress, "id": request_id}),
+                parse_workers(request.get("workers") or default_workers),
+                pools,
+                cache,
+                bool(request.get("dialogue")),
+                parse_speaker_voices(f"{speaker}={voice}" for speaker, voice in (request.get("speakerVoices") or {}).items()),
+                float(request.get("turnGapSeconds", default_turn_gap_seconds)),
+                request.get("format") or default_format,
+            )
+        except Exception as error:
+            output = {"error": f"{type(error).__name__}: {error}"}
+
+        output["id"] = request_id
+        sys.stderr.flush()
+        write_message(protocol_out, output)
+
+    close_pools(pools)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Kitten TTS inference script")
+    parser.add_argument("--model", help="HuggingFace model ID")
+    parser.add_argument("--input", help="Path to input text file")
+    parser.add_argument("--output", help="Path for output WAV file")
+    parser.add_argument(
+        "--voice", default="Jasper", help="Voice name (default: Jasper)"
+    )
+    parser.add_argument(
+        "--max-chunk-chars", type=int, default=450, help="Max chars per TTS chunk"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=parse_workers(os.environ.get("AUTOSHOW_KITTEN_TTS_WORKERS")),
+        help="Synthesize chunks across this many worker processes (default: 1)",
     )
+    parser.add_argument(
+        "--dialogue",
+        action="store_true",
+        help="Treat --input as a JSON list of {speaker, text} turns",
+    )
+    parser.add_argument(
+        "--speaker-voice",
+        action="append",
+        default=[],
+        metavar="SPEAKER=VOICE",
+        help="Voice for a dialogue speaker (repeatable); unmapped speakers get distinct voices",
+    )
+    parser.add_argument(
+        "--turn-gap-seconds",
+        type=float,
+        default=TURN_GAP_SECONDS,
+        help=f"Silence between dialogue turns (default: {TURN_GAP_SECONDS})",
+    )
+    parser.add_argument(
+        "--format",
+        default="auto",
+        choices=["auto", *OUTPUT_FORMATS],
+        help="Output encoding: 16-bit PCM wav, flac, or Ogg opus (default: from the --output extension)",
+    )
+    parser.add_argument(
+        "--server",
+        action="store_true",
+        help="Serve JSON-line synthesis jobs on stdin, keeping models loaded",
+    )
+    args = parser.parse_args()
+
+    if args.server:
+        run_server(args.model, args.voice, args.max_chunk_chars, parse_workers(args.workers), args.turn_gap_seconds, args.format)
+        return
+
+    if not args.model or not args.input or not args.output:
+        parser.error("--model, --input and --output are required unless --server is set")
+
+    pools: dict = {}
+    try:
+        output = synthesize(
+            {},
+            args.model,
+            args.input,
+            args.output,
+            args.voice,
+            args.max_chunk_chars,
+            lambda progress: write_message(sys.stdout, progress),
+            parse_workers(args.workers),
+            pools,
+            open_chunk_cache(),
+            args.dialogue,
+            parse_speaker_voices(args.speaker_voice),
+            args.turn_gap_seconds,
+            args.format,
+        )
+    except ValueError as error:
+        print(json.dumps({"error": str(error)}), file=sys.stderr)
+        sys.exit(1)
+    finally:
+        close_pools(pools)
+
+    print(json.dumps(output))
 
 if __name__ == "__main__":
     main()
@@ -145,6 +145,8 @@ export type FinalizeTtsRunOptions = {
   speaker?: string | undefined
   audioPath: string
   chunkCount: number
+  chunkCacheHits?: number | undefined
+  chunkCacheMisses?: number | undefined
   startTime: number
 }
 
@@ -9,6 +9,8 @@ export const finalizeTtsRun = ({
   speaker,
   audioPath,
   chunkCount,
+  chunkCacheHits,
+  chunkCacheMisses,
   startTime
 }: FinalizeTtsRunOptions): { audioPath: string, metadata: Step4Metadata } => {
   const processingTime = Date.now() - startTime
@@ -34,7 +36,9 @@ export const finalizeTtsRun = ({
       processingTime,
       audioFileName: 'speech.wav',
       audioFileSize: audioFile.size,
-      chunkCount
+      chunkCount,
+      ...(chunkCacheHits !== undefined ? { chunkCacheHits } : {}),
+      ...(chunkCacheMisses !== undefined ? { chunkCacheMisses } : {})
     }
   }
 }
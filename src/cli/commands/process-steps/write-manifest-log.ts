@@ -561,7 +561,8 @@ const buildPromptUsage = (
     const characterCount = resolveTtsCharacterCount(metadata, index)
     const usage = [
       typeof characterCount === 'number' ? formatCount(characterCount, 'char', 'chars') : null,
-      formatCount(entry.chunkCount, 'chunk', 'chunks')
+      formatCount(entry.chunkCount, 'chunk', 'chunks'),
+      typeof entry.chunkCacheHits === 'number' ? `${entry.chunkCacheHits} cached` : null
     ].filter((value): value is string => typeof value === 'string' && value.length > 0).join(' / ')
     rows.push({
       step: 'TTS',
@@ -7,7 +7,7 @@ import { createHumanTable, logKeyValueTable, logSingleRowTable } from '~/utils/l
 import { SUPPORTED_LLAMA_MODELS, SUPPORTED_KITTEN_TTS_MODELS } from '~/cli/commands/setup-and-utilities/models/model-options'
 import { withRetry } from '~/utils/retries'
 import { setupYtDependencies } from '~/cli/commands/setup-and-utilities/setup/setup-download/dl-audio/audio'
-import { setupWhisper, downloadWhisperModel } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/whisper/whisper'
+import { setupWhisper, downloadWhisperModel, refreshCoremlEncoders } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/whisper/whisper'
 import { checkLlamaInstalled, runLlamaSetup } from '~/cli/commands/process-steps/step-3-write/write-local/llama/llama'
 import { setupReverb } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/reverb/reverb'
 import { defuddleRuntimeDir, setupDefuddleCli } from '~/cli/commands/process-steps/step-2-extract/step-2-url/url-local/defuddle/defuddle-cli'
@@ -284,7 +284,10 @@ const runFullSetup = async (): Promise<void> => {
 
   await withCompactSetup(runLlamaSetup)
 
-  await withCompactSetup(async () => { await downloadWhisperModel(defaultWhisperModel) })
+  await withCompactSetup(async () => {
+    await downloadWhisperModel(defaultWhisperModel)
+    await refreshCoremlEncoders()
+  })
 
   if (await checkLlamaInstalled()) {
     await withCompactSetup(async () => { await ensureLlamaModelDownloaded(defaultLlamaModel) })
@@ -556,7 +559,7 @@ const executeStepOnce = async (step: SetupStepId): Promise<void> => {
     case 'uv': await setupUv(); return
     case 'yt-dlp': await setupYtDependencies(); return
     case 'whisper-binary': await setupWhisper(); return
-    case 'whisper-model': await downloadWhisperModel(defaultWhisperModel); return
+    case 'whisper-model': await downloadWhisperModel(defaultWhisperModel); await refreshCoremlEncoders(); return
     case 'llama-binary': await runLlamaSetup(); return
     case 'reverb': await setupReverb(); return
     case 'defuddle': await setupDefuddleCli(); return
@@ -10,6 +10,8 @@ export type Step4Metadata = {
   audioFileName: string
   audioFileSize: number
   chunkCount: number
+  chunkCacheHits?: number | undefined
+  chunkCacheMisses?: number | undefined
   clonedVoiceId?: string | undefined
   cloneCostCents?: number | undefined
 }
@@ -17,7 +19,9 @@ export type Step4Metadata = {
 export const TtsScriptOutputSchema = v.object({
   sampleRate: v.number(),
   chunkCount: v.number(),
-  durationSeconds: v.number()
+  durationSeconds: v.number(),
+  cacheHits: v.optional(v.number(), undefined),
+  cacheMisses: v.optional(v.number(), undefined)
 })
 
 export type Step5Metadata = {
@@ -194,6 +194,15 @@ export const ReverbOutputSchema = v.object({
   speakers: v.optional(v.array(v.string()), undefined)
 })
 
+export const ReverbCompactSegmentSchema = v.object({
+  start: v.number(),
+  end: v.number(),
+  speaker: v.string(),
+  starts: v.array(v.number()),
+  ends: v.array(v.number()),
+  words: v.array(v.string())
+})
+
 export const ElevenLabsTimestampSchema = v.union([v.number(), v.string()])
 
 export const ElevenLabsWordSchema = v.object({
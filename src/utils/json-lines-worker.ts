@@ -0,0 +1,282 @@
+import * as l from '~/utils/logger'
+
+const OUTPUT_TAIL_CHARS = 16_000
+const WORKER_STOP_TIMEOUT_MS = 5_000
+const DEFAULT_WORKER_IDLE_MS = 60_000
+
+export type JsonLinesWorkerResponse = {
+  id: number | null
+  error?: string | undefined
+}
+
+export type JsonLinesWorkerOutput = {
+  stdout: string
+  stderr: string
+}
+
+export type JsonLinesWorkerOptions<TResponse extends JsonLinesWorkerResponse, TResult> = {
+  name: string
+  command: string[]
+  env?: Record<string, string | undefined> | undefined
+  unref?: boolean | undefined
+  parseResponse: (line: string) => TResponse | undefined
+  // Returns undefined for progress responses that leave the request pending
+  toResult: (response: TResponse, output: JsonLinesWorkerOutput) => TResult | undefined
+  toFailure: (message: string, exitCode: number, output: JsonLinesWorkerOutput) => TResult
+  // Returns true when the line was handled and should stay out of the stderr tail
+  onStderrLine?: ((line: string) => boolean) | undefined
+}
+
+export type JsonLinesWorker<TRequest, TResult> = {
+  pid: number
+  isAlive: () => boolean
+  run: (request: TRequest) => Promise<TResult>
+  close: () => Promise<void>
+}
+
+export const appendOutputTail = (tail: string, chunk: string): string => {
+  const next = tail + chunk
+  return next.length > OUTPUT_TAIL_CHARS ? next.slice(next.length - OUTPUT_TAIL_CHARS) : next
+}
+
+export async function* readStreamLines(stream: ReadableStream<Uint8Array>): AsyncGenerator<string> {
+  const reader = stream.getReader()
+  const decoder = new TextDecoder()
+  let pending = ''
+
+  try {
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) {
+        break
+      }
+
+      pending += decoder.decode(value, { stream: true })
+      let lineBreakIndex = pending.indexOf('\n')
+      while (lineBreakIndex >= 0) {
+        yield pending.slice(0, lineBreakIndex).replace(/\r$/, '')
+        pending = pending.slice(lineBreakIndex + 1)
+        lineBreakIndex = pending.indexOf('\n')
+      }
+    }
+
+    pending += decoder.decode()
+    if (pending.length > 0) {
+      yield pending
+    }
+  } finally {
+    reader.releaseLock()
+  }
+}
+
+const waitForExit = async (exited: Promise<number>, timeoutMs: number): Promise<boolean> => {
+  let timer: ReturnType<typeof setTimeout> | undefined
+  try {
+    return await Promise.race([
+      exited.then(() => true).catch(() => true),
+      new Promise<boolean>((resolve) => {
+        timer = setTimeout(() => resolve(false), timeoutMs)
+      })
+    ])
+  } finally {
+    if (timer) {
+      clearTimeout(timer)
+    }
+  }
+}
+
+export const startJsonLinesWorker = <TRequest extends object, TResponse extends JsonLinesWorkerResponse, TResult>(
+  options: JsonLinesWorkerOptions<TResponse, TResult>
+): JsonLinesWorker<TRequest, TResult> => {
+  const { name, parseResponse, toResult, toFailure, onStderrLine } = options
+  const proc = Bun.spawn(options.command, {
+    stdin: 'pipe',
+    stdout: 'pipe',
+    stderr: 'pipe',
+    ...(options.env ? { env: options.env } : {})
+  })
+  if (options.unref) {
+    proc.unref()
+  }
+
+  const pending = new Map<number, (result: TResult) => void>()
+  const output: JsonLinesWorkerOutput = { stdout: '', stderr: '' }
+  let nextRequestId = 1
+  let exitCode: number | undefined
+
+  const failureFor = (message: string, code: number): TResult => toFailure(message, code, output)
+
+  const readLines = async (stream: ReadableStream<Uint8Array>, onLine: (line: string) => void): Promise<void> => {
+    for await (const line of readStreamLines(stream)) {
+      onLine(line)
+    }
+  }
+
+  const stdoutDone = readLines(proc.stdout, (line) => {
+    const response = parseResponse(line)
+    if (!response) {
+      if (line.trim().length > 0) {
+        output.stdout = appendOutputTail(output.stdout, `${line}\n`)
+      }
+      return
+    }
+
+    if (response.id === null) {
+      l.debug(`${name} rejected a request: ${response.error ?? 'unknown error'}`)
+      return
+    }
+
+    const resolveRequest = pending.get(response.id)
+    if (!resolveRequest) {
+      return
+    }
+
+    const result = toResult(response, output)
+    if (result === undefined) {
+      return
+    }
+    pending.delete(response.id)
+    resolveRequest(result)
+  }).catch(() => undefined)
+
+  const stderrDone = readLines(proc.stderr, (line) => {
+    if (onStderrLine?.(line)) {
+      return
+    }
+    output.stderr = appendOutputTail(output.stderr, `${line}\n`)
+  }).catch(() => undefined)
+
+  void proc.exited.then(async (code) => {
+    exitCode = code
+    await Promise.all([stdoutDone, stderrDone])
+    for (const [id, resolveRequest] of pending) {
+      pending.delete(id)
+      resolveRequest(failureFor(`${name} exited before answering`, code === 0 ? 1 : code))
+    }
+  })
+
+  const run = async (request: TRequest): Promise<TResult> => {
+    if (exitCode !== undefined) {
+      return failureFor(`${name} is not running`, exitCode === 0 ? 1 : exitCode)
+    }
+
+    const id = nextRequestId++
+    const result = new Promise<TResult>((resolve) => {
+      pending.set(id, resolve)
+    })
+
+    try {
+      proc.stdin.write(`${JSON.stringify({ id, ...request })}\n`)
+      await proc.stdin.flush()
+    } catch (error) {
+      pending.delete(id)
+      const detail = error instanceof Error ? error.message : String(error)
+      return failureFor(`Failed to send request to ${name}: ${detail}`, exitCode ?? 1)
+    }
+
+    return await result
+  }
+
+  const close = async (): Promise<void> => {
+    if (exitCode !== undefined) {
+      return
+    }
+
+    try {
+      await proc.stdin.end()
+    } catch {}
+
+    if (await waitForExit(proc.exited, WORKER_STOP_TIMEOUT_MS)) {
+      return
+    }
+
+    proc.kill('SIGTERM')
+    if (await waitForExit(proc.exited, WORKER_STOP_TIMEOUT_MS)) {
+      return
+    }
+
+    proc.kill('SIGKILL')
+    await waitForExit(proc.exited, WORKER_STOP_TIMEOUT_MS)
+  }
+
+  return {
+    pid: proc.pid,
+    isAlive: () => exitCode === undefined,
+    run,
+    close
+  }
+}
+
+export type SharedJsonLinesWorker<TRequest, TResult> = {
+  run: (key: string, start: () => JsonLinesWorker<TRequest, TResult>, request: TRequest) => Promise<TResult>
+  close: () => Promise<void>
+}
+
+// One worker process shared by every caller: requests are queued, the worker is
+// replaced when its key changes, and it is closed after an idle period read from
+// idleMsEnvKey on each request.
+export const createSharedJsonLinesWorker = <TRequest, TResult>(idleMsEnvKey: string): SharedJsonLinesWorker<TRequest, TResult> => {
+  let worker: JsonLinesWorker<TRequest, TResult> | undefined
+  let workerKey: string | undefined
+  let queue: Promise<unknown> = Promise.resolve()
+  let idleTimer: ReturnType<typeof setTimeout> | undefined
+
+  const readIdleMs = (): number => {
+    const value = Number.parseInt(process.env[idleMsEnvKey] ?? '', 10)
+    return Number.isFinite(value) && value >= 0 ? value : DEFAULT_WORKER_IDLE_MS
+  }
+
+  const clearIdleTimer = (): void => {
+    if (idleTimer) {
+      clearTimeout(idleTimer)
+      idleTimer = undefined
+    }
+  }
+
+  const close = async (): Promise<void> => {
+    clearIdleTimer()
+    const current = worker
+    worker = undefined
+    workerKey = undefined
+    await current?.close()
+  }
+
+  const scheduleIdleClose = (): void => {
+    clearIdleTimer()
+    idleTimer = setTimeout(() => {
+      idleTimer = undefined
+      void close()
+    }, readIdleMs())
+    ;(idleTimer as { unref?: () => void }).unref?.()
+  }
+
+  const run = async (
+    key: string,
+    start: () => JsonLinesWorker<TRequest, TResult>,
+    request: TRequest
+  ): Promise<TResult> => {
+    const queued = queue.then(async () => {
+      clearIdleTimer()
+
+      if (worker && workerKey !== key) {
+        await worker.close()
+        worker = undefined
+      }
+
+      if (!worker?.isAlive()) {
+        worker = start()
+        workerKey = key
+      }
+
+      try {
+        return await worker.run(request)
+      } finally {
+        scheduleIdleClose()
+      }
+    })
+    queue = queued.catch(() => undefined)
+    return await queued
+  }
+
+  return { run, close }
+}
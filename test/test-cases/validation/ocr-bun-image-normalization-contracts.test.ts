@@ -4,13 +4,13 @@ import { tmpdir } from 'node:os'
 import { join } from 'node:path'
 import {
   isBunImagePngNormalizableFormat,
-  normalizeImageToPngWithBun
+  normalizeImageToPngWithBun,
+  readImageDimensionsWithBun
 } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-utils/bun-image-utils'
 import {
   normalizeHostedDirectImageInput,
   resolveHostedDirectImageInputStrategy
 } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/hosted-ocr'
-import { readPaddleImageDimensions } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-local/paddle-ocr/run-paddle-ocr'
 import type { HostedExtractOcrEngine } from '~/types'
 
 const pngSignature = new Uint8Array([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a])
@@ -155,12 +155,12 @@ describe('OCR Bun.Image normalization contracts', () => {
     }
   })
 
-  test('PaddleOCR dimension helper reads image dimensions with Bun.Image metadata', async () => {
+  test('Image dimension helper reads image dimensions with Bun.Image metadata', async () => {
     const dir = await mkdtemp(join(tmpdir(), 'autoshow-paddle-bun-metadata-'))
     try {
       const inputPath = await writeImageFixture(dir, 'source.png', redDotPng)
 
-      await expect(readPaddleImageDimensions(inputPath)).resolves.toEqual({ width: 1, height: 1 })
+      await expect(readImageDimensionsWithBun(inputPath)).resolves.toEqual({ width: 1, height: 1 })
     } finally {
       await rm(dir, { recursive: true, force: true })
     }
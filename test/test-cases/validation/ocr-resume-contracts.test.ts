@@ -18,12 +18,20 @@ import {
 } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-structured-response-error'
 import { resolvePrimaryOcrTarget } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-targets'
 import {
-  buildPaddlePreparedImagePath,
-  extractPaddleOcrJsonLine,
   isPaddleNativeCrashExitCode,
-  parsePaddleImageDimensions,
+  resolvePaddleRunAttempts,
   summarizePaddleFailure
 } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-local/paddle-ocr/run-paddle-ocr'
+import {
+  parsePaddleOcrWorkerResponse,
+  type PaddleOcrWorker,
+  type PaddleOcrWorkerResult
+} from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-local/paddle-ocr/paddle-ocr-worker'
+import {
+  createPaddleOcrWorkerPool,
+  parseProcStatusRssBytes,
+  resolvePaddleOcrWorkerCount
+} from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-local/paddle-ocr/paddle-ocr-worker-pool'
 import { writeAwsTextractSyncDocumentFile } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-services/aws-textract/run-aws-textract'
 import { runHostedOcrWithPdfChunkFallback } from '~/cli/commands/process-steps/step-2-extract/step-2-ocr/ocr-utils/pdf-chunk-fallback'
 import type { DocumentMetadata, HostedOcrRun, OcrProviderState, OcrTarget, PageResult } from '~/types'
@@ -434,12 +442,69 @@ describe('OCR resume contracts', () => {
     })
   })
 
-  test('Paddle JSON extraction ignores noisy stdout after the payload', () => {
-    expect(extractPaddleOcrJsonLine([
-      'Checking connectivity to the model hosters',
-      '{"text":"hello","confidence":0.9}',
-      'Creating model: PP-OCRv5'
-    ].join('\n'))).toBe('{"text":"hello","confidence":0.9}')
+  test('Paddle worker responses ignore log noise and keep request ids', () => {
+    expect(parsePaddleOcrWorkerResponse('Creating model: PP-OCRv5_mobile_det')).toBeUndefined()
+    expect(parsePaddleOcrWorkerResponse('{"text":"no id"}')).toBeUndefined()
+    expect(parsePaddleOcrWorkerResponse('{"text": "hello", "confidence": 0.9, "id": 3}')).toEqual({
+      id: 3,
+      text: 'hello',
+      confidence: 0.9,
+      error: undefined
+    })
+    expect(parsePaddleOcrWorkerResponse('{"error": "ValueError: boom", "id": 4}')?.error).toBe('ValueError: boom')
+    expect(parsePaddleOcrWorkerResponse(
+      '{"text": "", "id": 5, "prepared": {"sourceWidth": 4000, "sourceHeight": 3000, "width": 1000, "height": 750}}'
+    )?.prepared).toEqual({ sourceWidth: 4000, sourceHeight: 3000, width: 1000, height: 750 })
+  })
+
+  test('Paddle tiered profile escalates first and falls back to mobile', () => {
+    expect(resolvePaddleRunAttempts('tiered').map((attempt) => attempt.modelProfile)).toEqual(['tiered', 'mobile'])
+    expect(resolvePaddleRunAttempts(undefined).map((attempt) => attempt.modelProfile)).toEqual(['auto', 'mobile'])
+    expect(parsePaddleOcrWorkerResponse(
+      '{"text": "a\\nB", "id": 6, "escalated": [{"line": 1, "mobileText": "b", "mobileScore": 0.4, "serverText": "B", "serverScore": 0.95, "replaced": true}]}'
+    )?.escalated?.[0]?.serverText).toBe('B')
+  })
+
+  test('Paddle worker pool reads RSS and clamps worker counts', () => {
+    expect(parseProcStatusRssBytes('Name:\tpython\nVmPeak:\t  900000 kB\nVmRSS:\t  524288 kB\n')).toBe(512 * 1024 * 1024)
+    expect(parseProcStatusRssBytes('Name:\tpython\n')).toBeUndefined()
+    expect(resolvePaddleOcrWorkerCount(3)).toBe(3)
+    expect(resolvePaddleOcrWorkerCount(0)).toBe(1)
+  })
+
+  test('Paddle worker pool rejects queued runs once closed', async () => {
+    const pendingRuns: Array<(result: PaddleOcrWorkerResult) => void> = []
+    let started = 0
+    const startWorker = (options: { modelProfile: PaddleOcrWorker['modelProfile'] }): PaddleOcrWorker => {
+      started++
+      let alive = true
+      return {
+        modelProfile: options.modelProfile,
+        pid: 0,
+        isAlive: () => alive,
+        run: async () => await new Promise<PaddleOcrWorkerResult>((resolve) => {
+          pendingRuns.push(resolve)
+        }),
+        close: async () => {
+          alive = false
+          for (const resolve of pendingRuns.splice(0)) {
+            resolve({ ok: false, failure: { stdout: '', stderr: '', exitCode: 1 } })
+          }
+        }
+      }
+    }
+    const pool = createPaddleOcrWorkerPool({ maxWorkers: 1, memoryReserveBytes: 0, startWorker })
+    const attempt = { modelProfile: 'mobile' as const, maxImageSidePx: 1000 }
+
+    const running = pool.run(attempt, 'page-1.png')
+    const queued = pool.run(attempt, 'page-2.png').catch((error: unknown) => error)
+    await pool.close()
+
+    expect(await queued).toBeInstanceOf(Error)
+    expect(String(await queued)).toContain('PaddleOCR worker pool is closed')
+    expect((await running).ok).toBe(false)
+    await expect(pool.run(attempt, 'page-3.png')).rejects.toThrow('PaddleOCR worker pool is closed')
+    expect(started).toBe(1)
   })
 
   test('Paddle log-only failures are ANSI-stripped', () => {
@@ -478,17 +543,6 @@ describe('OCR resume contracts', () => {
     expect(isPaddleNativeCrashExitCode(1)).toBe(false)
   })
 
-  test('Paddle prepared image paths include the max-side attempt size', () => {
-    expect(buildPaddlePreparedImagePath('/tmp/source/document.jpg', '/tmp/work', 2400)).toBe('/tmp/work/document-paddle-2400.jpg')
-    expect(buildPaddlePreparedImagePath('/tmp/source/document', '/tmp/work', 1800)).toBe('/tmp/work/document-paddle-1800.jpg')
-  })
-
-  test('Paddle image dimensions parse ImageMagick identify output', () => {
-    expect(parsePaddleImageDimensions('3923 4656')).toEqual({ width: 3923, height: 4656 })
-    expect(parsePaddleImageDimensions('0 4656')).toBeUndefined()
-    expect(parsePaddleImageDimensions('not dimensions')).toBeUndefined()
-  })
-
   test('AWS Textract sync document payload is written through file URI', async () => {
     const tempDir = await mkdtemp(join(tmpdir(), 'autoshow-ocr-resume-contracts-'))
     try {
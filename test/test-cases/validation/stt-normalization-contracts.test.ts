@@ -4,6 +4,8 @@ import { tmpdir } from 'node:os'
 import { join } from 'node:path'
 import { parseDeapiTimestampedTranscript, stripDeapiTimestampMarkers } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-services/deapi/deapi-transcript-parser'
 import { parseWhisperJson, extractWhisperWords } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/whisper/parse-whisper-output'
+import { collectDiarizedTranscript, parseCompactDiarizedSegment } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/reverb/run-reverb-diarization'
+import { parseReverbDiarizationBatchResponse, reverbDiarizationProfileArgs, reverbDiarizationWindowArgs } from '~/cli/commands/process-steps/step-2-extract/step-2-stt/stt-local/reverb/reverb-diarization-worker'
 import {
   detectCompressedTimingCoverage,
   repairZeroDurationMonotonicSegments
@@ -26,6 +28,28 @@ const writeJson = async (path: string, value: unknown): Promise<void> => {
   await writeFile(path, `${JSON.stringify(value, null, 2)}\n`)
 }
 
+const withEnv = async (
+  updates: Record<string, string>,
+  fn: () => Promise<void>
+): Promise<void> => {
+  const previous = Object.fromEntries(
+    Object.keys(updates).map((key) => [key, process.env[key]])
+  )
+
+  try {
+    Object.assign(process.env, updates)
+    await fn()
+  } finally {
+    for (const [key, value] of Object.entries(previous)) {
+      if (value === undefined) {
+        delete process.env[key]
+      } else {
+        process.env[key] = value
+      }
+    }
+  }
+}
+
 const deprecatedTierSplitKey = 'tier' + 'Split'
 const deprecatedOverallTierKey = 'overall' + 'Tier'
 
@@ -98,6 +122,67 @@ describe('STT normalization contracts', () => {
     expect(parsed.segments.at(-1)?.end).toBe('00:00:10')
   })
 
+  test('expands compact Reverb diarization NDJSON into word-level segments', async () => {
+    const lines = async function* (): AsyncGenerator<string> {
+      yield '{"start":0.1,"end":0.9,"speaker":"SPEAKER_00","starts":[0.1,0.5],"ends":[0.4,0.9],"words":["hello","there"]}'
+      yield ''
+      yield '{"start":1.2,"end":1.5,"speaker":"UNKNOWN","starts":[1.2],"ends":[1.5],"words":["um"]}'
+    }
+
+    const transcript = await collectDiarizedTranscript(lines())
+
+    expect(transcript.text).toBe('hello there um')
+    expect(transcript.speakers).toEqual(['SPEAKER_00'])
+    expect(transcript.segments[0]?.text).toBe('hello there')
+    expect(transcript.segments[0]?.words[1]).toEqual({ start: 0.5, end: 0.9, word: 'there', speaker: 'SPEAKER_00' })
+    expect(parseCompactDiarizedSegment('{"start":0,"end":1,"speaker":"A","starts":[0],"ends":[],"words":["x"]}')).toBeUndefined()
+  })
+
+  test('parses Reverb diarization batch worker responses', () => {
+    expect(parseReverbDiarizationBatchResponse('{"rttmPath": "/tmp/a.rttm", "segments": 12, "speakers": 2, "id": 3}')).toEqual({
+      id: 3,
+      rttmPath: '/tmp/a.rttm',
+      outputPath: undefined,
+      segments: 12,
+      speakers: 2,
+      cached: undefined,
+      error: undefined
+    })
+    expect(parseReverbDiarizationBatchResponse('{"outputPath": "/tmp/a.ndjson", "segments": 4, "speakers": 2, "cached": true, "id": 4}')?.cached).toBe(true)
+    expect(parseReverbDiarizationBatchResponse('{"id": null, "error": "Invalid batch request"}')?.error).toBe('Invalid batch request')
+    expect(parseReverbDiarizationBatchResponse('[DIARIZATION] Pipeline loaded successfully')).toBeUndefined()
+  })
+
+  test('passes windowed Reverb diarization settings from the environment', async () => {
+    await withEnv({
+      AUTOSHOW_REVERB_DIARIZATION_WINDOW_SECONDS: '0',
+      AUTOSHOW_REVERB_DIARIZATION_WINDOW_OVERLAP_SECONDS: ''
+    }, async () => {
+      expect(reverbDiarizationWindowArgs()).toEqual([])
+      process.env['AUTOSHOW_REVERB_DIARIZATION_WINDOW_SECONDS'] = '600'
+      expect(reverbDiarizationWindowArgs()).toEqual(['--window-seconds', '600'])
+      process.env['AUTOSHOW_REVERB_DIARIZATION_WINDOW_OVERLAP_SECONDS'] = '20'
+      expect(reverbDiarizationWindowArgs()).toEqual(['--window-seconds', '600', '--window-overlap-seconds', '20'])
+    })
+  })
+
+  test('passes the Reverb diarization CPU profile from the environment', async () => {
+    await withEnv({
+      AUTOSHOW_REVERB_DIARIZATION_PROFILE: '',
+      AUTOSHOW_REVERB_DIARIZATION_CPU_THREADS: '',
+      AUTOSHOW_REVERB_DIARIZATION_INTEROP_THREADS: '',
+      AUTOSHOW_REVERB_DIARIZATION_QUANTIZE: '',
+      AUTOSHOW_REVERB_DIARIZATION_EMBEDDING_BATCH_SIZE: ''
+    }, async () => {
+      expect(reverbDiarizationProfileArgs()).toEqual([])
+      process.env['AUTOSHOW_REVERB_DIARIZATION_PROFILE'] = 'cpu'
+      process.env['AUTOSHOW_REVERB_DIARIZATION_CPU_THREADS'] = '8'
+      process.env['AUTOSHOW_REVERB_DIARIZATION_QUANTIZE'] = 'off'
+      process.env['AUTOSHOW_REVERB_DIARIZATION_EMBEDDING_BATCH_SIZE'] = '0'
+      expect(reverbDiarizationProfileArgs()).toEqual(['--profile', 'cpu', '--cpu-threads', '8', '--no-quantize'])
+    })
+  })
+
   test('reference report includes quality warnings, segment stats, and duplicate groups', async () => {
     const runDir = await makeTempRoot()
     const providersDir = join(runDir, 'providers')
@@ -15,6 +15,10 @@ import { runMistralTts } from '~/cli/commands/process-steps/step-4-tts/tts-servi
 import { runOpenAITts } from '~/cli/commands/process-steps/step-4-tts/tts-services/openai/run-openai-tts'
 import { runSpeechifyTts } from '~/cli/commands/process-steps/step-4-tts/tts-services/speechify/run-speechify-tts'
 import { splitTextIntoUtf8ByteChunks } from '~/cli/commands/process-steps/step-4-tts/tts-utils/audio-utils'
+import {
+  parseKittenTtsChunkProgress,
+  parseKittenTtsServerResponse
+} from '~/cli/commands/process-steps/step-4-tts/tts-local/kitten/kitten-tts-worker'
 
 const tempDirs: string[] = []
 const originalFetch = globalThis.fetch
@@ -1245,6 +1249,35 @@ describe('TTS provider service contracts', () => {
     expect(calls).toHaveLength(0)
   })
 
+  test('Kitten TTS server responses ignore log noise and keep request ids', () => {
+    expect(parseKittenTtsServerResponse('[kitten-tts] model loaded')).toBeUndefined()
+    expect(parseKittenTtsServerResponse('{"chunkCount": 2}')).toBeUndefined()
+    expect(parseKittenTtsServerResponse('{"sampleRate": 24000, "chunkCount": 2, "durationSeconds": 1.5, "id": 4}')).toEqual({
+      id: 4,
+      sampleRate: 24000,
+      chunkCount: 2,
+      durationSeconds: 1.5,
+      error: undefined
+    })
+    expect(parseKittenTtsServerResponse(
+      '{"sampleRate": 24000, "chunkCount": 3, "durationSeconds": 2.1, "cacheHits": 2, "cacheMisses": 1, "id": 6}'
+    )).toMatchObject({ chunkCount: 3, cacheHits: 2, cacheMisses: 1 })
+    expect(parseKittenTtsServerResponse(
+      '{"sampleRate": 24000, "chunkCount": 4, "durationSeconds": 2.2, "turnCount": 4, "timingsPath": "out/speech.turns.json", "id": 7}'
+    )).toMatchObject({ turnCount: 4, timingsPath: 'out/speech.turns.json' })
+    expect(parseKittenTtsServerResponse('{"error": "ValueError: Input file is empty", "id": 5}')?.error).toBe('ValueError: Input file is empty')
+  })
+
+  test('Kitten TTS chunk progress lines are distinguished from the final result line', () => {
+    expect(parseKittenTtsChunkProgress('{"event": "chunk", "chunk": 2, "chunkCount": 3, "durationSeconds": 0.32}')).toEqual({
+      event: 'chunk',
+      chunk: 2,
+      chunkCount: 3,
+      durationSeconds: 0.32
+    })
+    expect(parseKittenTtsChunkProgress('{"sampleRate": 24000, "chunkCount": 3, "durationSeconds": 0.62}')).toBeUndefined()
+  })
+
   test('UTF-8 byte chunking respects multi-byte characters and hard byte limits', () => {
     const chunks = splitTextIntoUtf8ByteChunks(`${'é'.repeat(6)} ${'🙂'.repeat(3)}`, 12)
 